@@ -1,10 +1,124 @@
 import asyncio
 import json
 import logging
-from typing import Callable, Any
+import os
+import random
+from collections import deque
+from typing import Callable, Any, Dict, Optional
+from pydantic_ai.exceptions import ModelHTTPError
 
 logger = logging.getLogger(__name__)
 
+TOKEN_WINDOW_SECONDS = 60.0
+# Rough prompt size in tokens; corrected from the reported usage afterwards.
+CHARS_PER_TOKEN = 4
+
+
+def get_llm_limiter_config() -> dict:
+    return {
+        "max_in_flight": int(os.getenv("LLM_MAX_IN_FLIGHT", 16)),
+        "tokens_per_minute": int(os.getenv("LLM_TOKENS_PER_MINUTE", 400000)),
+        "request_token_overhead": int(os.getenv("LLM_REQUEST_TOKEN_OVERHEAD", 1500)),
+        "max_rate_limit_retries": int(os.getenv("LLM_MAX_RATE_LIMIT_RETRIES", 4)),
+        "rate_limit_backoff": float(os.getenv("LLM_RATE_LIMIT_BACKOFF", 2.0)),
+        "max_rate_limit_backoff": float(os.getenv("LLM_MAX_RATE_LIMIT_BACKOFF", 60.0)),
+    }
+
+
+class LLMRateLimiter:
+    """Admission control for one model: at most ``max_in_flight`` requests
+    at once and ``tokens_per_minute`` over a sliding minute.
+
+    Waiters are admitted in arrival order, so a burst from one ICP cannot
+    starve the others. After a 429 every caller of the model holds off until
+    ``backoff_until``.
+    """
+
+    def __init__(self, max_in_flight: int, tokens_per_minute: int):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.backoff_until = 0.0
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._admission = asyncio.Lock()
+        self._window: deque = deque()
+        self._tokens_in_window = 0
+
+    def _expire(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= TOKEN_WINDOW_SECONDS:
+            self._tokens_in_window -= self._window.popleft()[1]
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        if self.backoff_until > now:
+            return self.backoff_until - now
+        if (
+            not self.tokens_per_minute
+            or not self._window
+            or self._tokens_in_window + tokens <= self.tokens_per_minute
+        ):
+            return 0.0
+        return self._window[0][0] + TOKEN_WINDOW_SECONDS - now
+
+    async def acquire(self, tokens: int) -> list:
+        """Wait for a free slot and token budget; returns the reservation to
+        pass to ``release``."""
+        await self._slots.acquire()
+        try:
+            async with self._admission:
+                while True:
+                    now = self._loop.time()
+                    self._expire(now)
+                    wait = self._wait_time(tokens, now)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                reservation = [now, tokens]
+                self._window.append(reservation)
+                self._tokens_in_window += tokens
+                return reservation
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, reservation: list, used_tokens: Optional[int] = None) -> None:
+        if (
+            used_tokens is not None
+            and self._loop.time() - reservation[0] < TOKEN_WINDOW_SECONDS
+        ):
+            self._tokens_in_window += used_tokens - reservation[1]
+            reservation[1] = used_tokens
+        self._slots.release()
+
+    def back_off(self, delay: float) -> None:
+        self.backoff_until = max(self.backoff_until, self._loop.time() + delay)
+
+
+_llm_limiters: Dict[str, LLMRateLimiter] = {}
+
+
+def get_llm_limiter(model_name: str) -> LLMRateLimiter:
+    """Shared limiter for ``model_name`` on the running event loop."""
+    limiter = _llm_limiters.get(model_name)
+    if limiter is None or limiter._loop is not asyncio.get_running_loop():
+        config = get_llm_limiter_config()
+        limiter = LLMRateLimiter(config["max_in_flight"], config["tokens_per_minute"])
+        _llm_limiters[model_name] = limiter
+    return limiter
+
+
+def _model_name(agent_func: Callable) -> str:
+    agent = getattr(agent_func, "__self__", None)
+    model = getattr(agent, "model", None)
+    return getattr(model, "model_name", None) or "default"
+
+
+def _used_tokens(result: Any) -> Optional[int]:
+    try:
+        usage = result.usage()
+        return usage.input_tokens + usage.output_tokens
+    except Exception:
+        return None
+
 
 async def run_agent(
     agent_func: Callable,
@@ -14,10 +128,23 @@ async def run_agent(
     default_return: Any = None,
     context: str = "",
 ) -> Any:
-    """Centralized agent runner with retry logic, timeout handling, and error management."""
-    for attempt in range(2):
+    """Centralized agent runner with retry logic, timeout handling, and error management.
+
+    Calls go through the model's shared limiter; ``timeout`` covers the call
+    itself, not the time spent queued. A 429 backs off exponentially instead
+    of using up the retry.
+    """
+    config = get_llm_limiter_config()
+    limiter = get_llm_limiter(_model_name(agent_func))
+    estimated_tokens = len(prompt) // CHARS_PER_TOKEN + config["request_token_overhead"]
+    attempt = 0
+    rate_limited = 0
+    while attempt < 2:
+        reservation = await limiter.acquire(estimated_tokens)
+        used_tokens = None
         try:
             result = await asyncio.wait_for(agent_func(prompt), timeout=timeout)
+            used_tokens = _used_tokens(result)
             logger.info(
                 f"{operation_name} completed successfully{f' for {context[:50]}...' if context else ''}"
             )
@@ -27,18 +154,38 @@ async def run_agent(
                 logger.warning(
                     f"{operation_name} timed out after {timeout}s{f' for {context[:50]}...' if context else ''} (attempt {attempt + 1}/2)"
                 )
+                attempt += 1
                 continue
             logger.error(
                 f"{operation_name} timed out after {timeout}s{f' for {context[:50]}...' if context else ''} (final attempt)"
             )
             return default_return
         except Exception as e:
+            if (
+                isinstance(e, ModelHTTPError)
+                and e.status_code == 429
+                and rate_limited < config["max_rate_limit_retries"]
+            ):
+                delay = min(
+                    config["rate_limit_backoff"] * 2**rate_limited,
+                    config["max_rate_limit_backoff"],
+                ) * random.uniform(1.0, 1.5)
+                rate_limited += 1
+                limiter.back_off(delay)
+                logger.warning(
+                    f"{operation_name} rate limited{f' for {context[:50]}...' if context else ''}, backing off {delay:.1f}s ({rate_limited}/{config['max_rate_limit_retries']})"
+                )
+                continue
             if attempt == 0:
                 logger.warning(
                     f"Error during {operation_name.lower()}{f' for {context[:50]}...' if context else ''}: {e} (attempt {attempt + 1}/2)"
                 )
+                attempt += 1
                 continue
             logger.error(
                 f"Error during {operation_name.lower()}{f' for {context[:50]}...' if context else ''}: {e} (final attempt)"
             )
             return default_return
+        finally:
+            limiter.release(reservation, used_tokens)
+    return default_return
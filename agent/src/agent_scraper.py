@@ -1,10 +1,29 @@
 import asyncio
-from typing import List, Set
-from src.db.db import ScraperDatabaseManager
-from src.lead_scoring.scoreing import score_post
-from src.reddit.client import RedditClient
-from src.models.db_models import ICPModel
-from src.embeddings.openai_embeddings_service import embeddings_service
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from src.db.async_db import AsyncScraperDatabaseManager
+from src.lead_scoring.cascade_thresholds import get_icp_thresholds
+from src.lead_scoring.lexical_filter import LexicalDecision, get_lexical_matcher
+from src.lead_scoring.scoreing import score_posts
+from src.lead_scoring.score_cache import get_score_cache
+from src.reddit.client import RedditClient, RedditPriority, reddit_request_priority
+from src.reddit.cycle_planner import build_subreddit_plan, get_subreddits_for_icp
+from src.reddit.listings import (
+    advance_watermark,
+    demux_by_subreddit,
+    fetch_new_posts,
+    group_subreddits,
+    is_past_watermark,
+    is_watermark_post,
+    listing_page_size,
+    newest_watermark,
+)
+from src.reddit.polling import select_due_subreddits
+from src.models.agent_models import LeadIntentResponse
+from src.models.db_models import ICPModel, SubredditWatermark
+from src.embeddings.embedding_backend import get_embedding_backend
+from src.embeddings.icp_index import icp_similarity_matrix, retain_icps
 from src.utils.text_utils import condense_reddit_post
 from asyncpraw.models import Submission
 
@@ -14,17 +33,29 @@ from src.reddit.post import build_post_data
 
 logger = logging.getLogger("agent_scraper")
 
+# Similarity recorded for lexically fast-tracked pairs, which are never
+# embedded: they count as a full match, so they also qualify for
+# speculative strong-model scoring.
+FAST_TRACK_SIMILARITY = 100.0
+
 _shared_db_manager = None
 _shared_reddit_client = None
 
 
-def get_shared_db_manager() -> ScraperDatabaseManager:
+def get_shared_db_manager() -> AsyncScraperDatabaseManager:
     global _shared_db_manager
     if _shared_db_manager is None:
-        _shared_db_manager = ScraperDatabaseManager()
+        _shared_db_manager = AsyncScraperDatabaseManager()
     return _shared_db_manager
 
 
+async def close_shared_db_manager() -> None:
+    global _shared_db_manager
+    if _shared_db_manager is not None:
+        await _shared_db_manager.close()
+        _shared_db_manager = None
+
+
 def get_shared_reddit_client() -> RedditClient:
     global _shared_reddit_client
     if _shared_reddit_client is None:
@@ -34,97 +65,279 @@ def get_shared_reddit_client() -> RedditClient:
 
 def get_scraper_config() -> dict:
     return {
+        "mode": os.getenv("SCRAPER_MODE", "polling"),
         "polling_interval": 1800,
+        "poll_tick_interval": int(os.getenv("SCRAPER_POLL_TICK", 300)),
+        "min_poll_interval": int(os.getenv("SCRAPER_MIN_POLL_INTERVAL", 300)),
+        "max_poll_interval": int(os.getenv("SCRAPER_MAX_POLL_INTERVAL", 6 * 3600)),
+        "target_posts_per_poll": 20,
+        "poll_requests_per_hour": int(os.getenv("REDDIT_POLL_REQUESTS_PER_HOUR", 1800)),
         "confidence_threshold": 30,
         "initial_seeding_posts_per_subreddit": 25,
         "error_retry_delay": 60,
+        "lexical_prefilter": os.getenv("LEXICAL_PREFILTER", "true").lower() == "true",
+        "lexical_reject": os.getenv("LEXICAL_REJECT", "false").lower() == "true",
+        "lexical_fast_track_hits": 2,
+        "lexical_min_terms": 3,
+        "stream_refresh_interval": 300,
+        "stream_max_in_flight": 5,
+        "stream_batch_size": 10,
+        "stream_watermark_interval": 60,
+        "stream_poll_seconds": 60,
     }
 
 
-def get_active_icps(db_manager: ScraperDatabaseManager) -> list:
-    icps = db_manager.get_icps()
+async def get_active_icps(db_manager: AsyncScraperDatabaseManager) -> list:
+    icps = await db_manager.get_icps()
     logger.info(f"Loaded {len(icps)} ICPs")
     return icps
 
 
 async def handle_initial_seeding(
-    db_manager: ScraperDatabaseManager, icp_id: int
+    db_manager: AsyncScraperDatabaseManager, icp_id: int
 ) -> None:
     logger.info(f"Starting initial seeding for ICP {icp_id}")
-    icp = db_manager.get_icp_by_id(icp_id)
-    db_manager.mark_icp_as_seeded(icp_id)
-    await collect_initial_posts_for_icp(icp, db_manager)
+    icp = await db_manager.get_icp_by_id(icp_id)
+    await db_manager.mark_icp_as_seeded(icp_id)
+    try:
+        with reddit_request_priority(RedditPriority.LOW):
+            await collect_initial_posts_for_icp(icp, db_manager)
+    finally:
+        await db_manager.flush_pending_leads()
     logger.info(f"Initial seeding completed for ICP {icp_id}")
 
 
 async def handle_regular_collection(
-    icps: list, db_manager: ScraperDatabaseManager
+    icps: list, db_manager: AsyncScraperDatabaseManager, force: bool = False
 ) -> None:
     if not icps:
         logger.info("No ICPs found")
         return
 
-    tasks = []
-    for icp in icps:
-        task = asyncio.create_task(collect_new_posts_for_icp(icp, db_manager))
-        tasks.append(task)
+    config = get_scraper_config()
+    retain_icps(icp.id for icp in icps)
+    plan = build_subreddit_plan(icps)
+    watermarks = await db_manager.get_subreddit_watermarks(list(plan))
+    now = time.time()
+    if force:
+        due = list(plan)
+    else:
+        due = select_due_subreddits(list(plan), watermarks, config, now)
+    if not due:
+        logger.info(f"No subreddits due this tick ({len(plan)} tracked)")
+        return
+
+    groups = group_subreddits(due, watermarks, config["polling_interval"], now=now)
+    logger.info(
+        f"Listing {len(due)} of {len(plan)} subreddits due this tick in {len(groups)} combined requests"
+    )
+
+    tasks = [
+        asyncio.create_task(
+            process_subreddit_group(
+                group, plan, db_manager, watermarks, config["polling_interval"], now
+            )
+        )
+        for group in groups
+    ]
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
-    for i, result in enumerate(results):
+    for group, result in zip(groups, results):
         if isinstance(result, Exception):
-            logger.error(f"Error during collection for ICP {icps[i].id}: {result}")
+            logger.error(f"Error during collection for r/{'+'.join(group)}: {result}")
 
     logger.info("Collection cycle completed")
 
 
-def get_subreddits_for_icp(icp: ICPModel) -> Set[str]:
-    subreddits = set()
-    if not icp.data or not icp.data.subreddits:
-        return subreddits
-    for subreddit in icp.data.subreddits:
-        clean_subreddit = subreddit.strip() if subreddit else ""
-        if clean_subreddit:
-            subreddits.add(clean_subreddit)
-    logger.info(f"ICPID {icp.id} subreddits: {subreddits}")
-    return subreddits
+async def process_subreddit_group(
+    subreddit_names: List[str],
+    plan: Dict[str, List[ICPModel]],
+    db_manager: AsyncScraperDatabaseManager,
+    watermarks: Dict[str, SubredditWatermark],
+    cycle_seconds: float,
+    now: Optional[float] = None,
+):
+    reddit_client = get_shared_reddit_client()
+    subreddit = await reddit_client.get_subreddit("+".join(subreddit_names))
+    group_watermarks = {
+        name: watermarks[name] for name in subreddit_names if name in watermarks
+    }
 
+    listed_posts = await fetch_new_posts(
+        subreddit,
+        group_watermarks,
+        page_size=listing_page_size(subreddit_names, watermarks, cycle_seconds, now),
+    )
+    posts_by_subreddit = demux_by_subreddit(listed_posts, subreddit_names)
 
-async def process_subreddit_posts(
-    subreddit_name: str,
+    active = [name for name, posts in posts_by_subreddit.items() if posts]
+    for subreddit_name, posts in posts_by_subreddit.items():
+        logger.info(
+            f"Fetched {len(posts)} new posts from r/{subreddit_name} for {len(plan[subreddit_name])} ICPs"
+        )
+    results = await asyncio.gather(
+        *[
+            dispatch_posts_to_icps(
+                posts_by_subreddit[subreddit_name], plan[subreddit_name], db_manager
+            )
+            for subreddit_name in active
+        ],
+        return_exceptions=True,
+    )
+    leads_by_subreddit = {}
+    failed = set()
+    for subreddit_name, result in zip(active, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error during collection for r/{subreddit_name}: {result}")
+            failed.add(subreddit_name)
+            continue
+        leads_by_subreddit[subreddit_name], ok = result
+        if not ok:
+            failed.add(subreddit_name)
+    if failed:
+        logger.warning(
+            f"Keeping watermarks for r/{', r/'.join(sorted(failed))}: some posts were not processed"
+        )
+
+    await db_manager.set_subreddit_watermarks(
+        [
+            advance_watermark(
+                subreddit_name,
+                posts,
+                watermarks.get(subreddit_name),
+                leads=leads_by_subreddit.get(subreddit_name, 0),
+            )
+            for subreddit_name, posts in posts_by_subreddit.items()
+            if subreddit_name not in failed
+        ]
+    )
+
+
+async def dispatch_posts_to_icps(
+    posts: List[Submission],
+    icps: List[ICPModel],
+    db_manager: AsyncScraperDatabaseManager,
+) -> Tuple[int, bool]:
+    """Run the listing through every interested ICP; returns leads queued and
+    whether every ICP processed the listing without errors.
+
+    Each distinct post is embedded once and compared with every interested
+    ICP in a single matrix multiply before the per-ICP scoring starts."""
+    results = await asyncio.gather(
+        *[select_candidate_posts(posts, icp, db_manager) for icp in icps],
+        return_exceptions=True,
+    )
+    ok = True
+    candidates: Dict[int, List[Submission]] = {}
+    for icp, result in zip(icps, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error during collection for ICP {icp.id}: {result}")
+            ok = False
+        elif result:
+            candidates[icp.id] = result
+    if not candidates:
+        return 0, ok
+
+    candidate_icps = [icp for icp in icps if icp.id in candidates]
+    distinct_posts = list(
+        {post.id: post for posts in candidates.values() for post in posts}.values()
+    )
+    try:
+        prefilter_results = await embeddings_prefilter_batch(
+            distinct_posts, candidate_icps
+        )
+    except Exception as e:
+        logger.error(f"Error prefiltering {len(distinct_posts)} posts: {e}")
+        return 0, False
+
+    results = await asyncio.gather(
+        *[
+            process_posts_in_batches(
+                candidates[icp.id], icp, db_manager, prefilter_results[icp.id]
+            )
+            for icp in candidate_icps
+        ],
+        return_exceptions=True,
+    )
+    leads = 0
+    for icp, result in zip(candidate_icps, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error during collection for ICP {icp.id}: {result}")
+            ok = False
+        else:
+            leads += result[0]
+            ok = ok and result[1]
+    return leads, ok
+
+
+async def select_candidate_posts(
+    posts: List[Submission],
     icp: ICPModel,
-    db_manager: ScraperDatabaseManager,
-    limit: int = 100,
-):
-    reddit_client = get_shared_reddit_client()
-    subreddit = await reddit_client.get_subreddit(subreddit_name)
+    db_manager: AsyncScraperDatabaseManager,
+) -> List[Submission]:
+    if not posts:
+        return []
 
-    can_add_lead = db_manager.can_user_add_lead(icp.userId)
+    can_add_lead = await db_manager.can_user_add_lead(icp.userId)
     if not can_add_lead:
         logger.info(f"SKIPPED: User {icp.userId} has reached their lead limit")
-        return
-
-    posts_to_process = []
-    async for post in subreddit.new(limit=limit):
-        processed = db_manager.post_processed_for_icp(icp.id, post.id)
-        if not processed:
-            posts_to_process.append(post)
+        return []
 
-    await process_posts_in_batches(posts_to_process, icp, db_manager)
+    return await filter_unprocessed_posts(posts, icp, db_manager)
 
 
 async def process_posts_in_batches(
     posts: List[Submission],
     icp: ICPModel,
-    db_manager: ScraperDatabaseManager,
+    db_manager: AsyncScraperDatabaseManager,
+    prefilter_results: Optional[Dict[str, Tuple[bool, float]]] = None,
     batch_size: int = 25,
-):
+) -> Tuple[int, bool]:
+    """Claim, score and queue ``posts`` for one ICP; returns leads queued and
+    whether every post was processed. Claims on posts that could not be
+    scored are released so a later cycle retries them."""
+    if not posts:
+        return 0, True
+    if prefilter_results is None:
+        prefilter_results = (await embeddings_prefilter_batch(posts, [icp]))[icp.id]
+
+    leads = 0
+    failed_ids: List[str] = []
+    claim_failed = False
     for i in range(0, len(posts), batch_size):
         batch = posts[i : i + batch_size]
-        tasks = []
-        for post in batch:
-            task = asyncio.create_task(process_post_for_icp(post, icp, db_manager))
-            tasks.append(task)
-
+        claimed_ids = await db_manager.mark_posts_processed(
+            icp.id, [post.id for post in batch]
+        )
+        if claimed_ids is None:
+            claim_failed = True
+            continue
+        batch = [
+            post
+            for post in batch
+            if post.id in claimed_ids
+            and passes_embeddings_filter(post, *prefilter_results[post.id])
+        ]
+        if not batch:
+            continue
+
+        try:
+            scores = await score_posts(
+                batch,
+                icp,
+                {post.id: prefilter_results[post.id][1] for post in batch},
+            )
+        except Exception as e:
+            logger.warning(f"Exception scoring {len(batch)} posts for ICP {icp.id}: {e}")
+            failed_ids.extend(post.id for post in batch)
+            continue
+
+        tasks = [
+            asyncio.create_task(
+                queue_qualified_lead(post, icp, db_manager, scores.get(post.id))
+            )
+            for post in batch
+        ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         for j, result in enumerate(results):
             if isinstance(result, Exception):
@@ -132,94 +345,160 @@ async def process_posts_in_batches(
                 logger.warning(
                     f"Exception processing post {post_id} for ICP {icp.id}: {result}"
                 )
+                failed_ids.append(post_id)
+            elif result:
+                leads += 1
 
-
-async def collect_new_posts_for_icp(icp: ICPModel, db_manager: ScraperDatabaseManager):
-    logger.info(f"Collecting posts for ICP {icp.id}")
-    subreddits = get_subreddits_for_icp(icp)
-
-    if not subreddits:
-        logger.info(f"No subreddits configured for ICP {icp.id}")
-        return
-
-    tasks = [
-        process_subreddit_posts(subreddit_name, icp, db_manager)
-        for subreddit_name in subreddits
-    ]
-    await asyncio.gather(*tasks, return_exceptions=True)
+    if failed_ids:
+        await db_manager.release_processed_posts(icp.id, failed_ids)
+    return leads, not (claim_failed or failed_ids)
 
 
 async def collect_initial_posts_for_icp(
     icp: ICPModel,
-    db_manager: ScraperDatabaseManager,
+    db_manager: AsyncScraperDatabaseManager,
 ):
     subreddits = get_subreddits_for_icp(icp)
     reddit_client = get_shared_reddit_client()
     await collect_initial_posts(icp, subreddits, reddit_client, db_manager)
 
 
-def should_process_post(
-    post: Submission, icp: ICPModel, db_manager: ScraperDatabaseManager
-) -> bool:
-    processed = db_manager.post_processed_for_icp(icp.id, post.id)
-    if processed:
+async def filter_unprocessed_posts(
+    posts: List[Submission], icp: ICPModel, db_manager: AsyncScraperDatabaseManager
+) -> List[Submission]:
+    unprocessed_ids = await db_manager.get_unprocessed_submission_ids(
+        icp.id, [post.id for post in posts]
+    )
+    skipped = len(posts) - len(unprocessed_ids)
+    if skipped:
         logger.info(
-            f"SKIPPED DUPLICATE: Post {post.id} already processed for ICP {icp.id}"
+            f"SKIPPED DUPLICATE: {skipped} posts already processed for ICP {icp.id}"
         )
-        return False
+    return [post for post in posts if post.id in unprocessed_ids]
 
-    can_add_lead = db_manager.can_user_add_lead(icp.userId)
-    if not can_add_lead:
-        logger.info(
-            f"SKIPPED LEAD LIMIT: User {icp.userId} has reached their lead limit"
-        )
-        return False
 
-    return True
+def lexical_prefilter(
+    posts: List[Submission], post_texts: List[str], icps: List[ICPModel]
+) -> Dict[int, Dict[str, LexicalDecision]]:
+    """Match every post against each ICP's compiled keywords and pain points.
+    Decided pairs skip the embedding comparison. Zero-overlap posts are only
+    rejected with LEXICAL_REJECT=true."""
+    config = get_scraper_config()
+    decisions: Dict[int, Dict[str, LexicalDecision]] = {}
+    for icp in icps:
+        matcher = get_lexical_matcher(icp)
+        icp_decisions = decisions[icp.id] = {}
+        for post, post_text in zip(posts, post_texts):
+            if not config["lexical_prefilter"] or not post_text:
+                icp_decisions[post.id] = LexicalDecision.UNDECIDED
+                continue
+            decision, lexical_match = matcher.decide(
+                post_text,
+                config["lexical_fast_track_hits"],
+                config["lexical_min_terms"],
+                reject=config["lexical_reject"],
+            )
+            icp_decisions[post.id] = decision
+            if decision != LexicalDecision.UNDECIDED:
+                logger.info(
+                    f"LEXICAL {decision.value.upper()}: Post {post.id} ICP {icp.id} ({lexical_match.keyword_hits} keywords, {lexical_match.pain_hits} pain terms)"
+                )
+    return decisions
 
 
-def embeddings_prefilter(
-    post: Submission, icp: ICPModel, threshold: float = 25.0
-) -> tuple[bool, float]:
-    """Use OpenAI embeddings to prefilter posts before expensive LLM scoring"""
-    try:
-        post_text = condense_reddit_post(post.title, post.selftext or "")
-        icp_description = (
-            icp.data.description if icp.data and icp.data.description else ""
+async def embeddings_prefilter_batch(
+    posts: List[Submission],
+    icps: List[ICPModel],
+    threshold: Optional[float] = None,
+) -> Dict[int, Dict[str, Tuple[bool, float]]]:
+    """Use embeddings to prefilter posts before expensive LLM scoring.
+
+    The lexical stage decides the obvious pairs first. The remaining posts
+    are embedded together (cached by content across cycles) and compared
+    with every ICP description in one matrix multiply. Without an explicit
+    ``threshold`` each ICP uses its calibrated one, or else the configured
+    backend's. Returns ``{icp_id: {post_id: (passes, similarity)}}``."""
+    embedding_backend = get_embedding_backend()
+    icp_thresholds = {
+        icp.id: threshold
+        if threshold is not None
+        else get_icp_thresholds(icp.id, embedding_backend.model).get(
+            "prefilter_threshold", embedding_backend.prefilter_threshold
         )
+        for icp in icps
+    }
+    results = {icp.id: {post.id: (False, 0.0) for post in posts} for icp in icps}
 
-        if not post_text or not icp_description:
-            logger.warning(
-                f"Missing text for embeddings check: post={bool(post_text)}, icp={bool(icp_description)}"
-            )
-            return False, 0.0
+    post_texts = [condense_reddit_post(post.title, post.selftext or "") for post in posts]
+    for post, post_text in zip(posts, post_texts):
+        if not post_text:
+            logger.warning(f"Missing text for embeddings check: post {post.id}")
 
-        passes_filter, similarity_score = embeddings_service.check_similarity(
-            post_text, icp_description, threshold
-        )
+    decisions = lexical_prefilter(posts, post_texts, icps)
+    for icp in icps:
+        for post in posts:
+            if decisions[icp.id][post.id] == LexicalDecision.FAST_TRACK:
+                results[icp.id][post.id] = (True, FAST_TRACK_SIMILARITY)
 
-        logger.info(
-            f"EMBEDDING SCORE: Post {post.id} similarity {similarity_score:.1f}% (threshold: {threshold}%) - {'PASS' if passes_filter else 'FAIL'}"
+    described_icps = []
+    for icp in icps:
+        if not (icp.data and icp.data.description):
+            logger.warning(f"Missing ICP description for embeddings check: ICP {icp.id}")
+        elif any(
+            decision == LexicalDecision.UNDECIDED
+            for decision in decisions[icp.id].values()
+        ):
+            described_icps.append(icp)
+    embedded = [
+        (post, post_text)
+        for post, post_text in zip(posts, post_texts)
+        if post_text
+        and any(
+            decisions[icp.id][post.id] == LexicalDecision.UNDECIDED
+            for icp in described_icps
         )
-        return passes_filter, similarity_score
+    ]
+    if not embedded or not described_icps:
+        return results
+    logger.info(
+        f"Embedding {len(embedded)} of {len(posts)} posts for {len(described_icps)} ICPs after lexical prefilter"
+    )
 
+    try:
+        scores = await icp_similarity_matrix(
+            embedding_backend,
+            [post_text for _, post_text in embedded],
+            described_icps,
+            min(icp_thresholds[icp.id] for icp in described_icps),
+        )
     except Exception as e:
-        logger.warning(f"Error in embeddings prefilter for post {post.id}: {e}")
-        return True, 0.0
-
-
-async def process_post_for_icp(
-    post: Submission,
-    icp: ICPModel,
-    db_manager: ScraperDatabaseManager,
-):
-    db_manager.mark_post_processed(icp.id, post.id)
+        logger.warning(f"Error in embeddings prefilter: {e}")
+        scores = None
+    if scores is None:
+        # Fail closed: without similarities every undecided pair would go to
+        # the LLM unfiltered.
+        logger.warning(
+            f"Embeddings unavailable, rejecting {len(embedded)} undecided posts for {len(described_icps)} ICPs"
+        )
+        return results
+
+    for column, icp in enumerate(described_icps):
+        icp_threshold = icp_thresholds[icp.id]
+        for row, (post, _) in enumerate(embedded):
+            if decisions[icp.id][post.id] != LexicalDecision.UNDECIDED:
+                continue
+            similarity_score = float(scores[row, column])
+            passes = similarity_score >= icp_threshold
+            results[icp.id][post.id] = (passes, similarity_score)
+            logger.info(
+                f"EMBEDDING SCORE: Post {post.id} ICP {icp.id} similarity {similarity_score:.1f}% (threshold: {icp_threshold}%) - {'PASS' if passes else 'FAIL'}"
+            )
+    return results
 
-    embeddings_task = asyncio.create_task(
-        asyncio.to_thread(embeddings_prefilter, post, icp)
-    )
 
-    passes_embeddings, similarity_score = await embeddings_task
+def passes_embeddings_filter(
+    post: Submission, passes_embeddings: bool, similarity_score: float
+) -> bool:
     logger.info(
         f"EMBEDDING FILTER: Post {post.id} similarity {similarity_score:.1f}% - {'PASS' if passes_embeddings else 'FAIL'}"
     )
@@ -227,28 +506,35 @@ async def process_post_for_icp(
         logger.info(
             f"SKIPPED EMBEDDING FILTER: Post {post.id} filtered out (similarity: {similarity_score:.1f}%)"
         )
-        return
+    return passes_embeddings
 
-    result = await score_post(post, icp)
 
+async def queue_qualified_lead(
+    post: Submission,
+    icp: ICPModel,
+    db_manager: AsyncScraperDatabaseManager,
+    result: Optional[LeadIntentResponse],
+) -> bool:
     if not result:
         logger.info(f"SKIPPED: Post {post.id} - no score result")
-        return
+        return False
 
     logger.info(f"AGENT SCORE: Post {post.id} final_score {result.final_score}")
 
     config = get_scraper_config()
-    threshold = config["confidence_threshold"]
+    threshold = get_icp_thresholds(icp.id).get(
+        "confidence_threshold", config["confidence_threshold"]
+    )
 
     if result.final_score <= threshold:
         logger.info(
             f"SKIPPED: Post {post.id} score {result.final_score} below threshold {threshold}"
         )
-        return
+        return False
 
     post_data = build_post_data(post, icp, result)
-    db_manager.insert_reddit_post(post_data)
-    db_manager.increment_user_qualified_leads(icp.userId)
+    await db_manager.queue_lead(post_data, icp.userId)
+    return True
 
 
 async def fetch_posts_from_time_period(
@@ -256,28 +542,37 @@ async def fetch_posts_from_time_period(
     time_filter: str,
     limit: int,
     icp: ICPModel,
-    db_manager: ScraperDatabaseManager,
+    db_manager: AsyncScraperDatabaseManager,
 ):
     posts = []
     try:
         if time_filter == "hot":
             async for post in subreddit.hot(limit=limit):
-                if should_process_post(post, icp, db_manager):
-                    posts.append(post)
+                posts.append(post)
         else:
             async for post in subreddit.top(time_filter=time_filter, limit=limit):
-                if should_process_post(post, icp, db_manager):
-                    posts.append(post)
+                posts.append(post)
     except Exception as e:
         logger.warning(f"Error fetching {time_filter} posts: {e}")
-    return posts
+
+    if not posts:
+        return []
+
+    can_add_lead = await db_manager.can_user_add_lead(icp.userId)
+    if not can_add_lead:
+        logger.info(
+            f"SKIPPED LEAD LIMIT: User {icp.userId} has reached their lead limit"
+        )
+        return []
+
+    return await filter_unprocessed_posts(posts, icp, db_manager)
 
 
 async def process_initial_subreddit_posts(
     subreddit_name: str,
     icp: ICPModel,
     reddit_client: RedditClient,
-    db_manager: ScraperDatabaseManager,
+    db_manager: AsyncScraperDatabaseManager,
     limit: int,
 ):
     subreddit = await reddit_client.get_subreddit(subreddit_name)
@@ -306,7 +601,7 @@ async def collect_initial_posts(
     icp: ICPModel,
     subreddits: Set[str],
     reddit_client: RedditClient,
-    db_manager: ScraperDatabaseManager,
+    db_manager: AsyncScraperDatabaseManager,
 ):
     config = get_scraper_config()
     limit = config["initial_seeding_posts_per_subreddit"]
@@ -320,19 +615,238 @@ async def collect_initial_posts(
     await asyncio.gather(*tasks, return_exceptions=True)
 
 
-async def run_collection_cycle() -> None:
+async def stream_multireddit_posts(
+    subreddit_names: List[str],
+    plan: Dict[str, List[ICPModel]],
+    db_manager: AsyncScraperDatabaseManager,
+    watermarks: Dict[str, SubredditWatermark],
+    refresh_interval: float,
+    max_in_flight: int,
+    batch_size: int = 10,
+    watermark_interval: float = 60,
+) -> None:
+    """Follow a combined r/a+b+c submission stream for ``refresh_interval``
+    seconds. New posts are collected per subreddit and fed to the ICPs
+    watching it in micro-batches of up to ``batch_size`` posts (sooner when
+    the stream runs dry), with at most ``max_in_flight`` batches in flight.
+    Watermarks, with their posts-per-hour and lead-yield estimates, are
+    advanced at most every ``watermark_interval`` seconds and when the
+    stream ends."""
+    reddit_client = get_shared_reddit_client()
+    multireddit = await reddit_client.get_subreddit("+".join(subreddit_names))
+    watermarks = dict(watermarks)
+    # Newest post seen per subreddit, so posts the stream repeats are skipped.
+    cursors: Dict[str, Optional[SubredditWatermark]] = dict(watermarks)
+    # Posts (once dispatched) and leads since each subreddit's watermark was
+    # last advanced.
+    arrivals: Dict[str, List[Submission]] = {}
+    leads_since: Dict[str, int] = {}
+    batches: Dict[str, List[Submission]] = {}
+    batch_starts: Dict[str, Optional[SubredditWatermark]] = {}
+    # Subreddits with a batch that failed processing keep the watermark from
+    # before that batch for the rest of the stream; None keeps none at all.
+    pinned_watermarks: Dict[str, Optional[SubredditWatermark]] = {}
+    unsaved_pins: Set[str] = set()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    pending: Set[asyncio.Task] = set()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + refresh_interval
+
+    def pin(subreddit_name: str, previous: Optional[SubredditWatermark]) -> None:
+        if subreddit_name in pinned_watermarks:
+            pinned = pinned_watermarks[subreddit_name]
+            if pinned is None or (
+                previous is not None and pinned.created_utc <= previous.created_utc
+            ):
+                previous = pinned
+        pinned_watermarks[subreddit_name] = previous
+        unsaved_pins.add(subreddit_name)
+
+    async def dispatch(
+        posts: List[Submission],
+        subreddit_name: str,
+        previous: Optional[SubredditWatermark],
+    ) -> None:
+        try:
+            leads, ok = await dispatch_posts_to_icps(
+                posts, plan[subreddit_name], db_manager
+            )
+        except Exception as e:
+            logger.error(f"Error during collection for r/{subreddit_name}: {e}")
+            leads, ok = 0, False
+        finally:
+            in_flight.release()
+        arrivals.setdefault(subreddit_name, []).extend(posts)
+        leads_since[subreddit_name] = leads_since.get(subreddit_name, 0) + leads
+        if not ok:
+            logger.warning(
+                f"Keeping r/{subreddit_name} watermark before {len(posts)} posts: they were not processed"
+            )
+            pin(subreddit_name, previous)
+
+    async def flush_batch(subreddit_name: str) -> None:
+        posts = batches.pop(subreddit_name)
+        previous = batch_starts.pop(subreddit_name)
+        logger.info(f"STREAM: {len(posts)} posts in r/{subreddit_name}")
+        await in_flight.acquire()
+        task = asyncio.create_task(dispatch(posts, subreddit_name, previous))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    async def save_watermarks(final: bool = False) -> None:
+        now = time.time()
+        saved = []
+        for subreddit_name in set(arrivals) | unsaved_pins:
+            previous = watermarks.get(subreddit_name)
+            if subreddit_name in arrivals and (
+                final
+                or previous is None
+                or not previous.checked_at
+                or now - previous.checked_at >= watermark_interval
+            ):
+                watermarks[subreddit_name] = advance_watermark(
+                    subreddit_name,
+                    arrivals.pop(subreddit_name),
+                    previous,
+                    now=now,
+                    leads=leads_since.pop(subreddit_name, 0),
+                )
+            elif subreddit_name not in unsaved_pins:
+                continue
+            unsaved_pins.discard(subreddit_name)
+            watermark = pinned_watermarks.get(
+                subreddit_name, watermarks.get(subreddit_name)
+            )
+            if watermark is not None:
+                saved.append(watermark)
+        if saved:
+            await db_manager.set_subreddit_watermarks(saved)
+
+    try:
+        async for post in multireddit.stream.submissions(pause_after=0):
+            if post is None:
+                for subreddit_name in list(batches):
+                    await flush_batch(subreddit_name)
+                await save_watermarks()
+                await db_manager.flush_pending_leads()
+                if loop.time() >= deadline:
+                    break
+                continue
+
+            subreddit_name = post.subreddit.display_name.lower()
+            cursor = cursors.get(subreddit_name)
+            if cursor is not None and (
+                is_past_watermark(post, cursor) or is_watermark_post(post, cursor)
+            ):
+                continue
+            cursors[subreddit_name] = newest_watermark(subreddit_name, [post], cursor)
+
+            if not plan.get(subreddit_name):
+                arrivals.setdefault(subreddit_name, []).append(post)
+                continue
+            if subreddit_name not in batches:
+                batches[subreddit_name] = []
+                batch_starts[subreddit_name] = cursor
+            batches[subreddit_name].append(post)
+            if len(batches[subreddit_name]) >= batch_size:
+                await flush_batch(subreddit_name)
+
+            if loop.time() >= deadline:
+                break
+        for subreddit_name in list(batches):
+            await flush_batch(subreddit_name)
+    finally:
+        # Batches never dispatched (the stream failed or was cancelled) keep
+        # their subreddit's watermark before them.
+        for subreddit_name in list(batches):
+            batches.pop(subreddit_name)
+            pin(subreddit_name, batch_starts.pop(subreddit_name))
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await save_watermarks(final=True)
+        await db_manager.flush_pending_leads()
+
+
+async def run_streaming_ingest() -> None:
+    """Long-running alternative to polling: follows submission streams and
+    reloads the ICP set every ``stream_refresh_interval`` seconds."""
+    config = get_scraper_config()
+    db_manager = get_shared_db_manager()
+    logger.info("Starting streaming ingest")
+
+    while True:
+        try:
+            icps = await get_active_icps(db_manager)
+            retain_icps(icp.id for icp in icps)
+            plan = build_subreddit_plan(icps)
+            if not plan:
+                logger.info("No subreddits to stream")
+                await asyncio.sleep(config["stream_refresh_interval"])
+                continue
+
+            watermarks = await db_manager.get_subreddit_watermarks(list(plan))
+            groups = group_subreddits(
+                list(plan),
+                watermarks,
+                config["stream_poll_seconds"],
+                isolate_new=False,
+            )
+            results = await asyncio.gather(
+                *[
+                    stream_multireddit_posts(
+                        group,
+                        plan,
+                        db_manager,
+                        watermarks,
+                        config["stream_refresh_interval"],
+                        config["stream_max_in_flight"],
+                        config["stream_batch_size"],
+                        config["stream_watermark_interval"],
+                    )
+                    for group in groups
+                ],
+                return_exceptions=True,
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            for error in errors:
+                logger.error(f"Error in submission stream: {error}")
+            if errors:
+                await asyncio.sleep(config["error_retry_delay"])
+        except asyncio.CancelledError:
+            logger.info("Streaming ingest stopped")
+            raise
+        except Exception as e:
+            logger.error(f"Error in streaming ingest: {e}")
+            await asyncio.sleep(config["error_retry_delay"])
+
+
+async def run_collection_cycle(force: bool = False) -> None:
+    """One scheduler tick. Only subreddits whose adaptive poll interval has
+    elapsed are listed, unless ``force`` is set."""
     logger.info("Starting collection cycle")
     db_manager = get_shared_db_manager()
     try:
-        icps = get_active_icps(db_manager)
-        await handle_regular_collection(icps, db_manager)
+        icps = await get_active_icps(db_manager)
+        await handle_regular_collection(icps, db_manager, force)
+        score_cache = get_score_cache()
+        if score_cache is not None:
+            logger.info(f"Score cache stats: {score_cache.stats()}")
     except Exception as e:
         logger.error(f"Error in collection cycle: {e}")
         raise
+    finally:
+        await db_manager.flush_pending_leads()
+
+
+async def _run_standalone_collection_cycle() -> None:
+    try:
+        await run_collection_cycle(force=True)
+    finally:
+        await close_shared_db_manager()
 
 
 def run_collection_cycle_sync() -> None:
-    asyncio.run(run_collection_cycle())
+    asyncio.run(_run_standalone_collection_cycle())
 
 
 if __name__ == "__main__":
@@ -4,10 +4,12 @@ from contextlib import asynccontextmanager
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from src.logging_config import setup_logging
 from src.agent_scraper import (
-    run_collection_cycle_sync,
+    run_collection_cycle,
+    run_streaming_ingest,
     get_scraper_config,
     handle_initial_seeding,
     get_shared_db_manager,
+    close_shared_db_manager,
 )
 from src.services.find_subreddits import find_relevant_subreddits_by_keywords
 from src.services.generate_descriptions import generate_icp_and_pain_points_combined
@@ -30,9 +32,9 @@ import asyncio
 logger = setup_logging()
 
 
-def scraper_job():
+async def scraper_job(force: bool = False):
     try:
-        run_collection_cycle_sync()
+        await run_collection_cycle(force)
     except Exception as e:
         logger.error(f"Error in scheduled scraper job: {e}")
 
@@ -43,24 +45,34 @@ scheduler = AsyncIOScheduler()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     config = get_scraper_config()
-    interval_seconds = config["polling_interval"]
-    scheduler.add_job(
-        scraper_job,
-        "interval",
-        seconds=interval_seconds,
-        id="reddit_scraper",
-        name="Reddit Post Collection",
-        max_instances=1,
-    )
+    streaming_task = None
+    if config["mode"] == "streaming":
+        streaming_task = asyncio.create_task(run_streaming_ingest())
+        logger.info("Streaming ingest started")
+    else:
+        interval_seconds = config["poll_tick_interval"]
+        scheduler.add_job(
+            scraper_job,
+            "interval",
+            seconds=interval_seconds,
+            id="reddit_scraper",
+            name="Reddit Post Collection",
+            max_instances=1,
+        )
+        logger.info(
+            f"Scheduler started - scraper will check due subreddits every {interval_seconds} seconds"
+        )
     scheduler.start()
-    logger.info(
-        f"Scheduler started - scraper will run every {interval_seconds} seconds"
-    )
     try:
         yield
     finally:
+        if streaming_task is not None:
+            streaming_task.cancel()
+            await asyncio.gather(streaming_task, return_exceptions=True)
         scheduler.shutdown()
         logger.info("Scheduler shutdown")
+        await close_shared_db_manager()
+        logger.info("Database connection pool closed")
 
 
 app = FastAPI(title="SubLead Server", version="1.0.0", lifespan=lifespan)
@@ -176,7 +188,7 @@ async def trigger_initial_seeding(request: InitialSeedingRequest):
 async def trigger_scrape():
     try:
         logger.info("Manual scrape collection cycle trigger requested")
-        asyncio.create_task(asyncio.to_thread(run_collection_cycle_sync))
+        asyncio.create_task(scraper_job(force=True))
         return {
             "message": "Scrape collection cycle triggered",
             "status": "started",
@@ -189,6 +201,11 @@ async def trigger_scrape():
 
 @app.get("/scheduler/next-scrape-time")
 async def get_next_scrape_time():
+    if get_scraper_config()["mode"] == "streaming":
+        return {
+            "next_run_time": datetime.now().astimezone().isoformat(),
+            "seconds_until_next_run": 0,
+        }
     try:
         job = scheduler.get_job("reddit_scraper")
         if job is None:
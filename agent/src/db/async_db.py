@@ -0,0 +1,468 @@
+import os
+import json
+import asyncio
+import asyncpg
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Tuple
+from upstash_redis.asyncio import Redis as AsyncRedis
+from ..models.db_models import ICPModel, ICPDataModel, SubredditWatermark
+from .db import FREE_LEAD_LIMIT, get_pool_config, subreddit_watermark_key
+from .write_buffer import AsyncLeadWriteBuffer, get_write_buffer_config
+
+
+async def _init_connection(conn) -> None:
+    await conn.set_type_codec(
+        "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+    )
+
+
+class _PooledConnection(asyncpg.Connection):
+    """Connection that remembers when it was opened and last checked."""
+
+    __slots__ = ("opened_at", "checked_at")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened_at = time.monotonic()
+        self.checked_at = self.opened_at
+
+
+class _UnhealthyConnection(Exception):
+    """Raised from the pool's setup hook to discard a connection on acquire."""
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class AsyncScraperDatabaseManager:
+    """asyncpg-backed database access for the scraper, awaitable so scraper
+    and FastAPI code never blocks the event loop on I/O.
+
+    The pool is created lazily on the running loop. On acquire, connections
+    older than DB_POOL_MAX_CONNECTION_AGE seconds are discarded and ones idle
+    for DB_POOL_HEALTH_CHECK_INTERVAL seconds are pinged with SELECT 1; a
+    failed check closes the connection and acquire retries with a fresh one.
+    """
+
+    def __init__(self):
+        self.database_url = os.getenv("DATABASE_URL")
+        if not self.database_url:
+            raise ValueError("DATABASE_URL environment variable is required")
+
+        self.pool_config = get_pool_config()
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+        redis_url = os.getenv("UPSTASH_REDIS_REST_URL")
+        redis_token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+        if not redis_token:
+            raise ValueError("REDIS_TOKEN environment variable is required for Upstash")
+
+        self.redis_client = AsyncRedis(url=redis_url, token=redis_token)
+        self.lead_buffer = AsyncLeadWriteBuffer(self, **get_write_buffer_config())
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.database_url,
+                        min_size=self.pool_config["min_size"],
+                        max_size=self.pool_config["max_size"],
+                        init=_init_connection,
+                        setup=self._check_connection,
+                        connection_class=_PooledConnection,
+                    )
+        return self._pool
+
+    async def _check_connection(self, conn) -> None:
+        now = time.monotonic()
+        if now - conn.opened_at > self.pool_config["max_connection_age"]:
+            raise _UnhealthyConnection("connection exceeded max age")
+        if now - conn.checked_at >= self.pool_config["health_check_interval"]:
+            try:
+                await conn.fetchval("SELECT 1")
+            except Exception as e:
+                raise _UnhealthyConnection(f"health check failed: {e}") from e
+        conn.checked_at = now
+
+    @asynccontextmanager
+    async def _connection(self):
+        """Acquire a healthy pooled connection, replacing stale ones."""
+        pool = await self._get_pool()
+        attempts = self.pool_config["max_size"] + 1
+        for attempt in range(attempts):
+            try:
+                conn = await pool.acquire()
+                break
+            except _UnhealthyConnection as e:
+                print(f"Discarding pooled connection: {e}")
+                if attempt == attempts - 1:
+                    raise
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    async def close(self) -> None:
+        await self.lead_buffer.close()
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        self._pool_lock = None
+        await self.redis_client.close()
+
+    @staticmethod
+    def _row_to_icp(row) -> ICPModel:
+        row_dict = dict(row)
+        if row_dict.get("data"):
+            row_dict["data"] = ICPDataModel(**row_dict["data"])
+        return ICPModel(**row_dict)
+
+    async def get_icps(self) -> List[ICPModel]:
+        async with self._connection() as conn:
+            rows = await conn.fetch('SELECT * FROM "ICP"')
+        return [self._row_to_icp(row) for row in rows]
+
+    async def get_icp_by_id(self, icp_id: int) -> Optional[ICPModel]:
+        async with self._connection() as conn:
+            row = await conn.fetchrow('SELECT * FROM "ICP" WHERE id = $1', icp_id)
+        if not row:
+            return None
+        return self._row_to_icp(row)
+
+    async def mark_icp_as_seeded(self, icp_id: int) -> bool:
+        try:
+            async with self._connection() as conn:
+                status = await conn.execute(
+                    'UPDATE "ICP" SET seeded = true, "updatedAt" = NOW() WHERE id = $1',
+                    icp_id,
+                )
+            return status != "UPDATE 0"
+        except Exception as e:
+            print(f"Error marking ICP {icp_id} as seeded: {e}")
+            return False
+
+    async def insert_reddit_post(
+        self, post_data: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        try:
+            async with self._connection() as conn:
+                status = await conn.execute(
+                    """INSERT INTO "RedditPost"
+                       ("icpId", "submissionId", subreddit, title, content, url, "leadQuality", "analysisData",
+                        "redditCreatedAt")
+                       VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                       ON CONFLICT ("submissionId") DO NOTHING""",
+                    post_data["icp_id"],
+                    post_data["submission_id"],
+                    post_data["subreddit"],
+                    post_data["title"],
+                    post_data["content"],
+                    post_data["url"],
+                    post_data["lead_quality"],
+                    post_data["analysis_data"],
+                    _parse_timestamp(post_data["reddit_created_at"]),
+                )
+            if status == "INSERT 0 0":
+                print(
+                    f"Post {post_data['submission_id']} already exists, skipping duplicate insert"
+                )
+        except Exception as e:
+            print(f"Failed to insert reddit post: {e}")
+            print("Fetching all ICPs as fallback...")
+            return await self.get_icps()
+        return None
+
+    async def post_processed_for_icp(self, icp_id: int, submission_id: str) -> bool:
+        try:
+            async with self._connection() as conn:
+                count = await conn.fetchval(
+                    'SELECT COUNT(*) FROM "ProcessedPost" WHERE "icpId" = $1 AND "submissionId" = $2',
+                    icp_id,
+                    submission_id,
+                )
+            return count > 0
+        except Exception as e:
+            print(f"Error checking if post processed for ICP {icp_id}: {e}")
+            return False
+
+    async def get_unprocessed_submission_ids(
+        self, icp_id: int, submission_ids: List[str]
+    ) -> Set[str]:
+        if not submission_ids:
+            return set()
+        try:
+            async with self._connection() as conn:
+                rows = await conn.fetch(
+                    'SELECT "submissionId" FROM "ProcessedPost" WHERE "icpId" = $1 AND "submissionId" = ANY($2::varchar[])',
+                    icp_id,
+                    list(submission_ids),
+                )
+            processed = {row["submissionId"] for row in rows}
+            return set(submission_ids) - processed
+        except Exception as e:
+            print(f"Error checking processed posts for ICP {icp_id}: {e}")
+            return set(submission_ids)
+
+    async def mark_post_processed(self, icp_id: int, submission_id: str) -> bool:
+        try:
+            async with self._connection() as conn:
+                await conn.execute(
+                    """INSERT INTO "ProcessedPost" ("icpId", "submissionId")
+                       VALUES ($1, $2)
+                       ON CONFLICT DO NOTHING""",
+                    icp_id,
+                    submission_id,
+                )
+            return True
+        except Exception as e:
+            print(
+                f"Error marking post {submission_id} as processed for ICP {icp_id}: {e}"
+            )
+            return False
+
+    async def mark_posts_processed(
+        self, icp_id: int, submission_ids: List[str]
+    ) -> Optional[Set[str]]:
+        """Claim posts for an ICP in one statement and return the ids this call
+        claimed; ids already claimed by an earlier cycle are left out. Returns
+        None if the claim failed."""
+        if not submission_ids:
+            return set()
+        try:
+            async with self._connection() as conn:
+                rows = await conn.fetch(
+                    """INSERT INTO "ProcessedPost" ("icpId", "submissionId")
+                       SELECT $1, v."submissionId"
+                       FROM unnest($2::varchar[]) AS v ("submissionId")
+                       WHERE NOT EXISTS (
+                           SELECT 1 FROM "ProcessedPost" p
+                           WHERE p."icpId" = $1 AND p."submissionId" = v."submissionId"
+                       )
+                       ON CONFLICT DO NOTHING
+                       RETURNING "submissionId"
+                    """,
+                    icp_id,
+                    list(set(submission_ids)),
+                )
+            return {row["submissionId"] for row in rows}
+        except Exception as e:
+            print(f"Error marking {len(submission_ids)} posts as processed for ICP {icp_id}: {e}")
+            return None
+
+    async def release_processed_posts(
+        self, icp_id: int, submission_ids: List[str]
+    ) -> bool:
+        """Drop claims taken by ``mark_posts_processed`` for posts that could
+        not be scored, so the next cycle picks them up again."""
+        if not submission_ids:
+            return True
+        try:
+            async with self._connection() as conn:
+                await conn.execute(
+                    """DELETE FROM "ProcessedPost"
+                       WHERE "icpId" = $1 AND "submissionId" = ANY($2::varchar[])""",
+                    icp_id,
+                    list(set(submission_ids)),
+                )
+            return True
+        except Exception as e:
+            print(f"Error releasing {len(submission_ids)} processed posts for ICP {icp_id}: {e}")
+            return False
+
+    async def write_leads(
+        self, leads: List[Tuple[Dict[str, Any], str]]
+    ) -> Optional[List[str]]:
+        """Insert RedditPost rows and bump UsageTracking for the rows actually
+        inserted, all in one transaction. ``leads`` pairs each post with the
+        user who owns its ICP; quota is charged to that user only when the
+        (submission, ICP) row is the one that got inserted. Returns the
+        inserted submission ids, or None if the transaction failed."""
+        if not leads:
+            return []
+        posts = [post_data for post_data, _ in leads]
+        user_by_lead = {
+            (post_data["submission_id"], post_data["icp_id"]): user_id
+            for post_data, user_id in leads
+        }
+        try:
+            now = datetime.now()
+            async with self._connection() as conn:
+                async with conn.transaction():
+                    rows = await conn.fetch(
+                        """INSERT INTO "RedditPost"
+                           ("icpId", "submissionId", subreddit, title, content, url, "leadQuality", "analysisData",
+                            "redditCreatedAt")
+                           SELECT * FROM unnest(
+                               $1::integer[], $2::varchar[], $3::varchar[], $4::text[], $5::text[],
+                               $6::text[], $7::integer[], $8::jsonb[], $9::timestamp[]
+                           )
+                           ON CONFLICT ("submissionId") DO NOTHING
+                           RETURNING "submissionId", "icpId"
+                        """,
+                        [post_data["icp_id"] for post_data in posts],
+                        [post_data["submission_id"] for post_data in posts],
+                        [post_data["subreddit"] for post_data in posts],
+                        [post_data["title"] for post_data in posts],
+                        [post_data["content"] for post_data in posts],
+                        [post_data["url"] for post_data in posts],
+                        [post_data["lead_quality"] for post_data in posts],
+                        [post_data["analysis_data"] for post_data in posts],
+                        [
+                            _parse_timestamp(post_data["reddit_created_at"])
+                            for post_data in posts
+                        ],
+                    )
+                    inserted_ids = [row["submissionId"] for row in rows]
+
+                    lead_counts: Dict[str, int] = {}
+                    for row in rows:
+                        user_id = user_by_lead[(row["submissionId"], row["icpId"])]
+                        lead_counts[user_id] = lead_counts.get(user_id, 0) + 1
+
+                    if lead_counts:
+                        user_ids = list(lead_counts)
+                        counts = [lead_counts[user_id] for user_id in user_ids]
+                        await conn.execute(
+                            """UPDATE "UsageTracking" AS u
+                               SET "qualifiedLeads" = u."qualifiedLeads" + v.count, "updatedAt" = NOW()
+                               FROM unnest($1::varchar[], $2::integer[]) AS v ("userId", count)
+                               WHERE u."userId" = v."userId" AND u.month = $3 AND u.year = $4""",
+                            user_ids,
+                            counts,
+                            now.month,
+                            now.year,
+                        )
+                        await conn.execute(
+                            """INSERT INTO "UsageTracking" ("userId", month, year, "qualifiedLeads", "updatedAt")
+                               SELECT v."userId", $3, $4, v.count, NOW()
+                               FROM unnest($1::varchar[], $2::integer[]) AS v ("userId", count)
+                               WHERE NOT EXISTS (
+                                   SELECT 1 FROM "UsageTracking" u
+                                   WHERE u."userId" = v."userId" AND u.month = $3 AND u.year = $4
+                               )""",
+                            user_ids,
+                            counts,
+                            now.month,
+                            now.year,
+                        )
+
+                    return inserted_ids
+        except Exception as e:
+            print(f"Failed to write {len(posts)} leads: {e}")
+            return None
+
+    async def queue_lead(self, post_data: Dict[str, Any], user_id: str) -> None:
+        await self.lead_buffer.add_lead(post_data, user_id)
+
+    async def flush_pending_leads(self) -> int:
+        return await self.lead_buffer.flush()
+
+    async def get_subreddit_watermarks(
+        self, subreddit_names: List[str]
+    ) -> Dict[str, SubredditWatermark]:
+        if not subreddit_names:
+            return {}
+        try:
+            values = await self.redis_client.mget(
+                *[subreddit_watermark_key(name) for name in subreddit_names]
+            )
+            return {
+                name: SubredditWatermark.model_validate_json(value)
+                for name, value in zip(subreddit_names, values)
+                if value
+            }
+        except Exception as e:
+            print(f"Error loading subreddit watermarks: {e}")
+            return {}
+
+    async def set_subreddit_watermarks(self, watermarks: List[SubredditWatermark]) -> None:
+        if not watermarks:
+            return
+        try:
+            await self.redis_client.mset(
+                {
+                    subreddit_watermark_key(watermark.subreddit): watermark.model_dump_json()
+                    for watermark in watermarks
+                }
+            )
+        except Exception as e:
+            print(f"Error saving {len(watermarks)} subreddit watermarks: {e}")
+
+    async def is_user_subscribed(self, user_id: str) -> bool:
+        try:
+            customer_id = await self.redis_client.get(
+                f"user:{user_id}:stripe-customer-id"
+            )
+            if not customer_id:
+                return False
+
+            sub_data = await self.redis_client.get(
+                f"stripe:customer:{customer_id}:sub-status"
+            )
+            if not sub_data:
+                return False
+
+            if isinstance(sub_data, (bytes, str)):
+                if isinstance(sub_data, bytes):
+                    sub_data = sub_data.decode()
+                sub_data = json.loads(sub_data)
+
+            return sub_data.get("status") == "active"
+        except Exception as e:
+            print(f"Error checking subscription for user {user_id}: {e}")
+            return False
+
+    async def get_user_monthly_qualified_leads(self, user_id: str) -> int:
+        try:
+            now = datetime.now()
+            async with self._connection() as conn:
+                result = await conn.fetchval(
+                    'SELECT "qualifiedLeads" FROM "UsageTracking" WHERE "userId" = $1 AND month = $2 AND year = $3',
+                    user_id,
+                    now.month,
+                    now.year,
+                )
+            return result if result is not None else 0
+        except Exception as e:
+            print(f"Error getting monthly qualified leads for user {user_id}: {e}")
+            return 0
+
+    async def increment_user_qualified_leads(self, user_id: str) -> None:
+        try:
+            now = datetime.now()
+            async with self._connection() as conn:
+                async with conn.transaction():
+                    status = await conn.execute(
+                        """UPDATE "UsageTracking"
+                           SET "qualifiedLeads" = "qualifiedLeads" + 1, "updatedAt" = NOW()
+                           WHERE "userId" = $1 AND month = $2 AND year = $3""",
+                        user_id,
+                        now.month,
+                        now.year,
+                    )
+                    if status == "UPDATE 0":
+                        await conn.execute(
+                            """INSERT INTO "UsageTracking" ("userId", month, year, "qualifiedLeads", "updatedAt")
+                               VALUES ($1, $2, $3, 1, NOW())""",
+                            user_id,
+                            now.month,
+                            now.year,
+                        )
+        except Exception as e:
+            print(f"Error incrementing qualified leads for user {user_id}: {e}")
+
+    async def can_user_add_lead(self, user_id: str) -> bool:
+        is_subscribed = await self.is_user_subscribed(user_id)
+        if is_subscribed:
+            return True
+
+        monthly_leads = await self.get_user_monthly_qualified_leads(user_id)
+        pending_leads = self.lead_buffer.pending_leads_for_user(user_id)
+        return monthly_leads + pending_leads < FREE_LEAD_LIMIT
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def get_write_buffer_config() -> dict:
+    return {
+        "max_rows": int(os.getenv("LEAD_BUFFER_MAX_ROWS", 200)),
+        "max_age": float(os.getenv("LEAD_BUFFER_MAX_AGE", 30)),
+        "max_failures": int(os.getenv("LEAD_BUFFER_MAX_FAILURES", 3)),
+    }
+
+
+def _halves(rows: list) -> List[list]:
+    """Halves of ``rows``, first half last so it is popped first."""
+    if len(rows) <= 1:
+        return [rows]
+    middle = len(rows) // 2
+    return [rows[middle:], rows[:middle]]
+
+
+class AsyncLeadWriteBuffer:
+    """Write-behind buffer for qualified leads.
+
+    RedditPost rows and their UsageTracking increments are collected here and
+    written in a single transaction once the buffer reaches ``max_rows``, its
+    oldest row is older than ``max_age`` seconds, or ``flush`` is called at the
+    end of a cycle / on shutdown. A background timer flushes aged rows even
+    when no more leads arrive. ProcessedPost claims are not buffered: they
+    are committed before scoring so a crash can never cause a post to be
+    scored twice.
+
+    A failed flush is requeued. After ``max_failures`` failures in a row the
+    batch is bisected so a single bad row is logged and dropped instead of
+    blocking every lead queued behind it.
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        max_rows: int = 200,
+        max_age: float = 30.0,
+        max_failures: int = 3,
+    ):
+        self.db_manager = db_manager
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.max_failures = max_failures
+        self._rows: List[Tuple[Dict[str, Any], str]] = []
+        self._oldest_at = None
+        self._failures = 0
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def add_lead(self, post_data: Dict[str, Any], user_id: str) -> None:
+        if not self._rows:
+            self._oldest_at = time.monotonic()
+        self._rows.append((post_data, user_id))
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_when_due())
+        if len(self._rows) >= self.max_rows or (
+            time.monotonic() - self._oldest_at >= self.max_age
+        ):
+            await self.flush()
+
+    def pending_leads_for_user(self, user_id: str) -> int:
+        return sum(1 for _, row_user_id in self._rows if row_user_id == user_id)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def _flush_when_due(self) -> None:
+        while self._rows:
+            delay = self._oldest_at + self.max_age - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                await self.flush()
+
+    async def close(self) -> int:
+        flushed = await self.flush()
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        return flushed
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            self._oldest_at = None
+            if not rows:
+                return 0
+
+            try:
+                inserted_ids = await self.db_manager.write_leads(rows)
+                if inserted_ids is None:
+                    self._failures += 1
+                    if self._failures < self.max_failures:
+                        logger.error(
+                            f"Failed to flush {len(rows)} buffered leads, requeueing ({self._failures}/{self.max_failures})"
+                        )
+                        self._requeue(rows)
+                        return 0
+                    inserted_ids = await self._write_isolating(rows)
+            except asyncio.CancelledError:
+                self._requeue(rows)
+                raise
+            self._failures = 0
+            if inserted_ids is None:
+                logger.error(
+                    f"Failed to flush {len(rows)} buffered leads row by row, requeueing"
+                )
+                self._requeue(rows)
+                return 0
+
+            logger.info(
+                f"Flushed {len(inserted_ids)} leads ({len(rows) - len(inserted_ids)} duplicates or failed rows skipped)"
+            )
+            return len(inserted_ids)
+
+    def _requeue(self, rows: List[Tuple[Dict[str, Any], str]]) -> None:
+        self._rows = rows + self._rows
+        self._oldest_at = time.monotonic()
+
+    async def _write_isolating(
+        self, rows: List[Tuple[Dict[str, Any], str]]
+    ) -> Optional[List[str]]:
+        """Write the halves of a failing batch, splitting again until the
+        failing rows are isolated, then drop those. Returns None when no write
+        succeeded at all, which points at the database rather than at a row."""
+        inserted_ids: List[str] = []
+        failed_rows: List[Tuple[Dict[str, Any], str]] = []
+        succeeded = False
+        pending = _halves(rows)
+        while pending:
+            batch = pending.pop()
+            batch_ids = await self.db_manager.write_leads(batch)
+            if batch_ids is not None:
+                succeeded = True
+                inserted_ids.extend(batch_ids)
+            elif len(batch) == 1:
+                failed_rows.extend(batch)
+            else:
+                pending += _halves(batch)
+
+        if not succeeded:
+            return None
+        for post_data, user_id in failed_rows:
+            logger.error(
+                f"Dropping lead {post_data.get('submission_id')} for ICP {post_data.get('icp_id')} (user {user_id}): write keeps failing"
+            )
+        return inserted_ids
@@ -0,0 +1,220 @@
+import asyncio
+import math
+import os
+import re
+import zlib
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+import numpy as np
+from src.embeddings.quantization import normalize
+from src.embeddings.embedding_cache import (
+    EmbeddingCache,
+    get_shared_embedding_cache,
+    get_shared_post_embedding_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_embedding_backend_config() -> dict:
+    threshold = os.getenv("EMBEDDING_PREFILTER_THRESHOLD")
+    return {
+        "backend": os.getenv("EMBEDDING_BACKEND", "openai").lower(),
+        "prefilter_threshold": float(threshold) if threshold else None,
+        "local_dim": int(os.getenv("LOCAL_EMBEDDING_DIM", 1024)),
+    }
+
+
+class EmbeddingBackend(ABC):
+    """Async embedding provider used by the scraper's prefilter.
+
+    Subclasses only implement ``get_embeddings``; caching, normalization and
+    the posts x targets similarity matrix are shared. Vectors are cached
+    under ``model``, so switching backends never mixes vector spaces.
+    """
+
+    model: str
+    # Cosine similarity (in percent) a post needs to reach LLM scoring.
+    # Scales differ between vector spaces, so each backend has its own.
+    default_threshold: float = 25.0
+
+    def __init__(
+        self,
+        cache: Optional[EmbeddingCache] = None,
+        post_cache: Optional[EmbeddingCache] = None,
+        prefilter_threshold: Optional[float] = None,
+    ):
+        self.cache = cache if cache is not None else get_shared_embedding_cache()
+        self.post_cache = (
+            post_cache if post_cache is not None else get_shared_post_embedding_cache()
+        )
+        self.prefilter_threshold = (
+            prefilter_threshold
+            if prefilter_threshold is not None
+            else self.default_threshold
+        )
+
+    @abstractmethod
+    async def get_embeddings(
+        self, texts: List[str], model: Optional[str] = None
+    ) -> Optional[List]:
+        """Raw embeddings for ``texts`` in order, or None on failure"""
+
+    async def embed_texts(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> Optional[np.ndarray]:
+        """Embed texts and return an L2-normalized float32 matrix with one row
+        per text. Only texts missing from ``cache`` are requested; cached
+        vectors are already normalized."""
+        model = model or self.model
+        if cache is not None and texts:
+            cached = cache.get_many(model, texts)
+            if cached is not None:
+                return cached
+
+        vectors = {}
+        if cache is not None:
+            for text in texts:
+                if text not in vectors:
+                    vector = cache.get(model, text)
+                    if vector is not None:
+                        vectors[text] = vector
+
+        missing = list(dict.fromkeys(text for text in texts if text not in vectors))
+        if missing:
+            embeddings = await self.get_embeddings(missing, model=model)
+            if embeddings is None or len(embeddings) != len(missing):
+                return None
+            if cache is not None:
+                embeddings = await cache.aput_many(model, missing, embeddings)
+            else:
+                embeddings = [normalize(embedding) for embedding in embeddings]
+            vectors.update(zip(missing, embeddings))
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[text] for text in texts])
+
+    async def embed_targets(
+        self, target_texts: List[str], target_owners=None, model: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """Normalized matrix of target (ICP) embeddings, served from the cache
+        where possible"""
+        model = model or self.model
+        owned = [
+            (owner, text)
+            for text, owner in zip(target_texts, target_owners or [])
+            if owner is not None
+        ]
+        if owned:
+            # A changed ICP text deletes its old vector from the disk store.
+            await asyncio.to_thread(self._track_owners, model, owned)
+        return await self.embed_texts(target_texts, model=model, cache=self.cache)
+
+    def _track_owners(self, model: str, owned: List[Tuple[str, str]]) -> None:
+        for owner, text in owned:
+            self.cache.track(owner, model, text)
+
+    async def similarity_matrix(
+        self, post_texts: List[str], target_texts: List[str], target_owners=None
+    ) -> Optional[np.ndarray]:
+        """Cosine similarity of every post against every target, as a
+        posts x targets matrix of percentages computed with one matmul"""
+        targets, posts = await asyncio.gather(
+            self.embed_targets(target_texts, target_owners),
+            self.embed_texts(post_texts, cache=self.post_cache),
+        )
+        if targets is None or posts is None:
+            return None
+        if not len(post_texts):
+            return np.zeros((0, len(target_texts)), dtype=np.float32)
+        return posts @ targets.T * 100
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+class HashedNgramEmbeddingBackend(EmbeddingBackend):
+    """CPU-only embeddings from signed feature hashing of word unigrams,
+    word bigrams and character trigrams, with sublinear term frequency.
+
+    No network, no model files and deterministic across processes, so it
+    can prefilter offline and run the pipeline in tests and benchmarks.
+    It captures lexical overlap only, which is enough to drop the bulk of
+    obviously irrelevant posts.
+    """
+
+    default_threshold = 10.0
+    # Batches larger than this are hashed in a worker thread.
+    INLINE_BATCH_LIMIT = 64
+
+    def __init__(self, dim: int = 1024, **kwargs):
+        self.dim = dim
+        self.model = f"hashed-ngram-{dim}"
+        super().__init__(**kwargs)
+
+    def _features(self, text: str) -> List[str]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        features = list(tokens)
+        features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        for token in tokens:
+            padded = f"<{token}>"
+            features.extend(f"#{padded[i : i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed_one(self, text: str) -> np.ndarray:
+        counts = {}
+        for feature in self._features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            index = digest % self.dim
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            counts[index] = counts.get(index, 0.0) + sign
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for index, count in counts.items():
+            vector[index] = math.copysign(1 + math.log(abs(count)), count) if count else 0.0
+        return vector
+
+    def _embed_all(self, texts: List[str]) -> List[np.ndarray]:
+        return [self.embed_one(text) for text in texts]
+
+    async def get_embeddings(
+        self, texts: List[str], model: Optional[str] = None
+    ) -> Optional[List]:
+        if len(texts) > self.INLINE_BATCH_LIMIT:
+            return await asyncio.to_thread(self._embed_all, texts)
+        return self._embed_all(texts)
+
+
+_shared_embedding_backend = None
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Backend selected by EMBEDDING_BACKEND ("openai" or "local"), built on
+    first use so importing the scraper does not require OPENAI_API_KEY."""
+    global _shared_embedding_backend
+    if _shared_embedding_backend is None:
+        config = get_embedding_backend_config()
+        if config["backend"] == "local":
+            _shared_embedding_backend = HashedNgramEmbeddingBackend(
+                dim=config["local_dim"],
+                prefilter_threshold=config["prefilter_threshold"],
+            )
+        elif config["backend"] == "openai":
+            from src.embeddings.openai_embeddings_service import (
+                AsyncOpenAIEmbeddingsService,
+                get_async_embeddings_config,
+            )
+
+            _shared_embedding_backend = AsyncOpenAIEmbeddingsService(
+                prefilter_threshold=config["prefilter_threshold"],
+                **get_async_embeddings_config(),
+            )
+        else:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND {config['backend']}")
+        logger.info(f"Using embedding backend {_shared_embedding_backend.model}")
+    return _shared_embedding_backend
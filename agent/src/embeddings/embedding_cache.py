@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import os
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.embeddings.quantization import QuantizedVectors, normalize
+from src.embeddings.vector_store import MemmapVectorStore
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+def get_embedding_cache_config() -> dict:
+    return {
+        "max_entries": int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 10000)),
+        "cache_dir": os.getenv("EMBEDDING_CACHE_DIR") or None,
+        "dtype": os.getenv("EMBEDDING_STORE_DTYPE", "float32"),
+        "store_max_entries": int(os.getenv("EMBEDDING_STORE_MAX_ENTRIES", 20000)),
+        "precision": os.getenv("EMBEDDING_CACHE_PRECISION", "float32"),
+    }
+
+
+def get_post_embedding_cache_config() -> dict:
+    cache_dir = os.getenv("EMBEDDING_CACHE_DIR")
+    return {
+        "max_entries": int(os.getenv("POST_EMBEDDING_CACHE_MAX_ENTRIES", 50000)),
+        "cache_dir": os.path.join(cache_dir, "posts") if cache_dir else None,
+        "dtype": os.getenv("EMBEDDING_STORE_DTYPE", "float32"),
+        "store_max_entries": int(
+            os.getenv("POST_EMBEDDING_STORE_MAX_ENTRIES", 200000)
+        ),
+        # int8 moves similarities (about 0.1 percentage points on random
+        # 1536-d vectors), which can flip pairs sitting on a calibrated
+        # prefilter threshold; opt in only after recalibrating.
+        "precision": os.getenv("POST_EMBEDDING_CACHE_PRECISION", "float32"),
+    }
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """LRU cache of embedding vectors keyed by (model, content hash).
+
+    Vectors are stored L2-normalized in a contiguous ``QuantizedVectors``
+    slab per model at ``precision`` (float32, float16 or int8), so cached
+    vectors can be compared with a plain dot product.
+    With ``cache_dir`` set, vectors are also appended to a memory-mapped
+    ``MemmapVectorStore`` per model (float32, or float16 to halve disk and
+    page cache) so they survive restarts; the in-memory LRU is checked
+    first. The store keeps at most ``store_max_entries`` vectors (0 for no
+    limit), dropping the oldest written when it compacts. Owners
+    (e.g. an ICP) can be tracked so the vector for their previous text is
+    dropped as soon as the text changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        cache_dir: Optional[str] = None,
+        dtype: str = "float32",
+        precision: str = "float32",
+        store_max_entries: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.dtype = dtype
+        self.store_max_entries = store_max_entries
+        self.precision = precision
+        self._stores: Dict[str, MemmapVectorStore] = {}
+        self._slabs: Dict[str, QuantizedVectors] = {}
+        self._entries: "OrderedDict[CacheKey, int]" = OrderedDict()
+        self._owners: Dict[str, CacheKey] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def store(self, model: str) -> Optional[MemmapVectorStore]:
+        """Backing store for ``model``, or None without a ``cache_dir``."""
+        if not self.cache_dir:
+            return None
+        with self._lock:
+            if model not in self._stores:
+                self._stores[model] = MemmapVectorStore(
+                    os.path.join(self.cache_dir, model),
+                    self.dtype,
+                    max_entries=self.store_max_entries,
+                )
+            return self._stores[model]
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Normalized float32 vector for ``text``, or None."""
+        key = (model, content_hash(text))
+        with self._lock:
+            row = self._entries.get(key)
+            if row is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._slabs[model].get(row)
+
+        store = self.store(model)
+        if store is not None:
+            vector = store.get(key[1])
+            if vector is not None:
+                vector = normalize(vector)
+                with self._lock:
+                    self.hits += 1
+                    self._store(key, vector)
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get_many(self, model: str, texts: List[str]) -> Optional[np.ndarray]:
+        """Matrix of cached vectors for ``texts`` dequantized in one pass, or
+        None unless every text is in memory."""
+        keys = [(model, content_hash(text)) for text in texts]
+        with self._lock:
+            rows = [self._entries.get(key) for key in keys]
+            if any(row is None for row in rows):
+                return None
+            for key in keys:
+                self._entries.move_to_end(key)
+            self.hits += len(keys)
+            return self._slabs[model].get_rows(rows)
+
+    def put(self, model: str, text: str, vector) -> np.ndarray:
+        """Cache ``vector`` and return it normalized."""
+        return self.put_many(model, [text], [vector])[0]
+
+    def put_many(self, model: str, texts: List[str], vectors) -> List[np.ndarray]:
+        """Cache ``vectors`` for ``texts`` and return them normalized."""
+        keys, normalized = self._put_in_memory(model, texts, vectors)
+        self._persist(model, keys, normalized)
+        return normalized
+
+    async def aput_many(self, model: str, texts: List[str], vectors) -> List[np.ndarray]:
+        """``put_many`` that appends to the disk store (and compacts it when
+        due) in a worker thread, so the event loop never waits on file I/O."""
+        keys, normalized = self._put_in_memory(model, texts, vectors)
+        if self.cache_dir:
+            await asyncio.to_thread(self._persist, model, keys, normalized)
+        return normalized
+
+    def _put_in_memory(
+        self, model: str, texts: List[str], vectors
+    ) -> Tuple[List[CacheKey], List[np.ndarray]]:
+        keys = [(model, content_hash(text)) for text in texts]
+        normalized = [normalize(vector) for vector in vectors]
+        with self._lock:
+            for key, vector in zip(keys, normalized):
+                self._store(key, vector)
+        return keys, normalized
+
+    def _persist(
+        self, model: str, keys: List[CacheKey], vectors: List[np.ndarray]
+    ) -> None:
+        store = self.store(model)
+        if store is None:
+            return
+        items = {
+            key[1]: vector for key, vector in zip(keys, vectors) if key[1] not in store
+        }
+        try:
+            store.append_many(list(items.items()))
+        except Exception as e:
+            logger.warning(f"Failed to persist {len(items)} {model} embeddings: {e}")
+
+    def _store(self, key: CacheKey, vector: np.ndarray) -> None:
+        model = key[0]
+        slab = self._slabs.get(model)
+        if slab is None:
+            slab = self._slabs[model] = QuantizedVectors(self.precision)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            slab.release(previous)
+        self._entries[key] = slab.add(vector)
+        while len(self._entries) > self.max_entries:
+            (evicted_model, _), row = self._entries.popitem(last=False)
+            self._slabs[evicted_model].release(row)
+
+    def invalidate(self, model: str, text: str) -> None:
+        self._evict((model, content_hash(text)))
+
+    def _evict(self, key: CacheKey) -> None:
+        with self._lock:
+            row = self._entries.pop(key, None)
+            if row is not None:
+                self._slabs[key[0]].release(row)
+        store = self.store(key[0])
+        if store is not None:
+            store.delete(key[1])
+
+    def track(self, owner: str, model: str, text: str) -> None:
+        """Record that ``owner`` now embeds ``text``; if it embedded
+        something else before, that vector is evicted."""
+        key = (model, content_hash(text))
+        with self._lock:
+            previous = self._owners.get(owner)
+            self._owners[owner] = key
+        if previous is not None and previous != key:
+            logger.info(f"Embedding text changed for {owner}, invalidating cached vector")
+            self._evict(previous)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_shared_embedding_cache = None
+_shared_post_embedding_cache = None
+
+
+def get_shared_embedding_cache() -> EmbeddingCache:
+    global _shared_embedding_cache
+    if _shared_embedding_cache is None:
+        _shared_embedding_cache = EmbeddingCache(**get_embedding_cache_config())
+    return _shared_embedding_cache
+
+
+def get_shared_post_embedding_cache() -> EmbeddingCache:
+    """Separate cache for Reddit posts so the high churn of post vectors
+    never evicts the ICP vectors reused on every comparison."""
+    global _shared_post_embedding_cache
+    if _shared_post_embedding_cache is None:
+        _shared_post_embedding_cache = EmbeddingCache(
+            **get_post_embedding_cache_config()
+        )
+    return _shared_post_embedding_cache
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import os
+import logging
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from src.models.db_models import ICPModel
+
+logger = logging.getLogger(__name__)
+
+# Guards the upper bound against float rounding so pruning stays exact.
+BOUND_EPSILON = 1e-5
+# Similarity reported for pruned pairs: the lowest cosine similarity, so it
+# is below any threshold that can prune and never mistaken for a score.
+PRUNED_SIMILARITY = -1.0
+
+
+def get_icp_index_config() -> dict:
+    return {
+        "min_icps": int(os.getenv("ICP_INDEX_MIN_ICPS", 64)),
+        "rebuild_drift": float(os.getenv("ICP_INDEX_REBUILD_DRIFT", 0.25)),
+        "kmeans_iterations": 10,
+        "recall_sample": int(os.getenv("ICP_INDEX_RECALL_SAMPLE", 32)),
+    }
+
+
+class IcpVectorIndex:
+    """Partitioned (IVF-style) index over normalized ICP vectors.
+
+    ICPs are clustered with k-means into about sqrt(n) cells. Each cell keeps
+    its centroid ``c`` and radius ``r = max ||x - c||``, so for a unit query
+    ``q`` every member satisfies ``q.x <= q.c + r``. Cells whose bound is
+    below the threshold are skipped without losing any ICP that could pass,
+    and only members of the remaining cells are scored exactly.
+
+    Upserts assign new or changed ICPs to their nearest cell and widen its
+    radius; the clustering is rebuilt once changes since the last build
+    exceed ``rebuild_drift`` of the index. ``recall_pending`` is set by each
+    rebuild until the caller checks the new clustering against brute force.
+    """
+
+    def __init__(self, rebuild_drift: float = 0.25, kmeans_iterations: int = 10, seed: int = 0):
+        self.rebuild_drift = rebuild_drift
+        self.kmeans_iterations = kmeans_iterations
+        self._rng = np.random.default_rng(seed)
+        self._ids: List[int] = []
+        self._rows: Dict[int, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int64)
+        self._centroids: Optional[np.ndarray] = None
+        self._radii = np.zeros(0, dtype=np.float32)
+        self._changes = 0
+        self.recall_pending = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, vectors: Dict[int, np.ndarray]) -> None:
+        changed = 0
+        for icp_id, vector in vectors.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            row = self._rows.get(icp_id)
+            if row is not None:
+                if np.array_equal(self._vectors[row], vector):
+                    continue
+                self._vectors[row] = vector
+            else:
+                row = len(self._ids)
+                self._ids.append(icp_id)
+                self._rows[icp_id] = row
+                if self._vectors is None:
+                    self._vectors = vector[None, :].copy()
+                else:
+                    self._vectors = np.vstack([self._vectors, vector])
+                self._assignments = np.append(self._assignments, 0)
+            self._assign(row)
+            changed += 1
+
+        self._changes += changed
+        if self._centroids is None or self._changes > self.rebuild_drift * len(self._ids):
+            self.rebuild()
+
+    def retain(self, icp_ids: Iterable[int]) -> None:
+        """Drop ICPs that no longer exist. Radii are left as they are, which
+        keeps the bounds valid until the next rebuild tightens them."""
+        keep = set(icp_ids)
+        removed = [icp_id for icp_id in self._ids if icp_id not in keep]
+        if not removed:
+            return
+        rows = [self._rows[icp_id] for icp_id in self._ids if icp_id in keep]
+        self._ids = [self._ids[row] for row in rows]
+        self._rows = {icp_id: row for row, icp_id in enumerate(self._ids)}
+        self._vectors = self._vectors[rows] if rows else None
+        self._assignments = self._assignments[rows]
+        self._changes += len(removed)
+        if not self._ids:
+            self._centroids = None
+            self._radii = np.zeros(0, dtype=np.float32)
+            self._changes = 0
+        elif self._changes > self.rebuild_drift * len(self._ids):
+            self.rebuild()
+
+    def _assign(self, row: int) -> None:
+        if self._centroids is None:
+            return
+        vector = self._vectors[row]
+        distances = np.linalg.norm(self._centroids - vector, axis=1)
+        cell = int(np.argmin(distances))
+        self._assignments[row] = cell
+        self._radii[cell] = max(self._radii[cell], distances[cell])
+
+    def _squared_distances(self, centroids: np.ndarray) -> np.ndarray:
+        """||x - c||^2 for every vector/centroid pair without materializing
+        the n x k x d differences."""
+        squared = (
+            np.sum(self._vectors**2, axis=1)[:, None]
+            + np.sum(centroids**2, axis=1)[None, :]
+            - 2 * self._vectors @ centroids.T
+        )
+        return np.maximum(squared, 0.0)
+
+    def rebuild(self) -> None:
+        """Re-cluster every vector with k-means (k ~ sqrt(n))."""
+        n = len(self._ids)
+        self._changes = 0
+        if n == 0:
+            self._centroids = None
+            return
+        k = max(1, int(math.sqrt(n)))
+        centroids = self._vectors[self._rng.choice(n, size=k, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmin(self._squared_distances(centroids), axis=1)
+            for cell in range(k):
+                members = self._vectors[assignments == cell]
+                if len(members):
+                    centroids[cell] = members.mean(axis=0)
+        distances = np.sqrt(self._squared_distances(centroids))
+        self._assignments = np.argmin(distances, axis=1)
+        self._centroids = centroids.astype(np.float32)
+        self._radii = np.zeros(k, dtype=np.float32)
+        np.maximum.at(
+            self._radii, self._assignments, distances[np.arange(n), self._assignments]
+        )
+        self.recall_pending = True
+        logger.info(f"Rebuilt ICP index: {n} ICPs in {k} cells")
+
+    def search(
+        self, queries: np.ndarray, min_similarity: float, icp_ids: List[int]
+    ) -> np.ndarray:
+        """Cosine similarity of each query against ``icp_ids`` (all indexed).
+
+        Pairs in pruned cells are not computed; they hold
+        ``PRUNED_SIMILARITY``, which is below ``min_similarity``."""
+        columns = np.array([self._rows[icp_id] for icp_id in icp_ids], dtype=np.int64)
+        column_cells = self._assignments[columns]
+        bounds = queries @ self._centroids.T + self._radii + BOUND_EPSILON
+        live = bounds >= min_similarity
+        result = np.full(
+            (len(queries), len(columns)), PRUNED_SIMILARITY, dtype=np.float32
+        )
+        for cell in np.unique(column_cells):
+            query_rows = np.nonzero(live[:, cell])[0]
+            if not len(query_rows):
+                continue
+            cell_columns = np.nonzero(column_cells == cell)[0]
+            result[np.ix_(query_rows, cell_columns)] = (
+                queries[query_rows] @ self._vectors[columns[cell_columns]].T
+            )
+        return result
+
+    def recall_check(
+        self, queries: np.ndarray, min_similarity: float, icp_ids: Optional[List[int]] = None
+    ) -> float:
+        """Fraction of brute-force matches above ``min_similarity`` that
+        ``search`` also returns. Should always be 1.0."""
+        icp_ids = icp_ids if icp_ids is not None else list(self._ids)
+        exact = queries @ self._vectors[[self._rows[icp_id] for icp_id in icp_ids]].T
+        expected = exact >= min_similarity
+        found = self.search(queries, min_similarity, icp_ids) >= min_similarity
+        if not expected.any():
+            return 1.0
+        return float((expected & found).sum() / expected.sum())
+
+
+_icp_indexes: Dict[str, IcpVectorIndex] = {}
+
+
+def get_icp_index(model: str) -> IcpVectorIndex:
+    """One index per embedding model, since vector spaces differ."""
+    if model not in _icp_indexes:
+        config = get_icp_index_config()
+        _icp_indexes[model] = IcpVectorIndex(
+            rebuild_drift=config["rebuild_drift"],
+            kmeans_iterations=config["kmeans_iterations"],
+        )
+    return _icp_indexes[model]
+
+
+def retain_icps(icp_ids: Iterable[int]) -> None:
+    icp_ids = set(icp_ids)
+    for index in _icp_indexes.values():
+        index.retain(icp_ids)
+
+
+async def icp_similarity_matrix(
+    embedding_backend, post_texts: List[str], icps: List[ICPModel], threshold: float
+) -> Optional[np.ndarray]:
+    """posts x ICPs similarity in percent. Small ICP sets are compared by
+    brute force; from ``ICP_INDEX_MIN_ICPS`` on, the ICP index prunes cells
+    that cannot reach ``threshold`` (those pairs read -100). After a rebuild
+    the index is checked against brute force, which is used instead until
+    the check passes."""
+    descriptions = [icp.data.description for icp in icps]
+    owners = [f"icp:{icp.id}" for icp in icps]
+    if len(icps) < get_icp_index_config()["min_icps"]:
+        return await embedding_backend.similarity_matrix(post_texts, descriptions, owners)
+
+    targets, posts = await asyncio.gather(
+        embedding_backend.embed_targets(descriptions, owners),
+        embedding_backend.embed_texts(post_texts, cache=embedding_backend.post_cache),
+    )
+    if targets is None or posts is None:
+        return None
+    index = get_icp_index(embedding_backend.model)
+    icp_ids = [icp.id for icp in icps]
+    index.upsert(dict(zip(icp_ids, targets)))
+    if index.recall_pending:
+        recall = check_recall(index, posts, threshold / 100, icp_ids)
+        if recall < 1.0:
+            return posts @ targets.T * 100
+        index.recall_pending = False
+    return index.search(posts, threshold / 100, icp_ids) * 100
+
+
+def check_recall(
+    index: IcpVectorIndex, posts: np.ndarray, min_similarity: float, icp_ids: List[int]
+) -> float:
+    """Compare the index with brute force on a sample of ``posts``; returns
+    the recall and warns if pruning lost any match."""
+    sample_size = min(len(posts), get_icp_index_config()["recall_sample"])
+    sample = np.random.default_rng().choice(len(posts), size=sample_size, replace=False)
+    recall = index.recall_check(posts[sample], min_similarity, icp_ids)
+    if recall < 1.0:
+        logger.warning(
+            f"ICP index recall {recall:.3f} below 1.0 on {sample_size} posts after rebuild, using brute force"
+        )
+    return recall
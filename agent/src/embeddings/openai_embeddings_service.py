@@ -1,47 +1,162 @@
-from openai import OpenAI
-import numpy as np
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
 from dotenv import load_dotenv
+import asyncio
 import os
+import random
 import logging
+from typing import Dict, List, Optional, Set, Tuple
+from src.embeddings.embedding_backend import EmbeddingBackend
+from src.embeddings.embedding_cache import EmbeddingCache
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 
-class OpenAIEmbeddingsService:
-    def __init__(self):
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+# The embeddings endpoint accepts up to 2048 inputs per request; stay well
+# below that so one request stays within its token limit.
+DEFAULT_EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 256))
+# Rate limits, 5xx responses, timeouts (an APIConnectionError subclass) and
+# dropped connections are retried with backoff.
+RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+
+def get_async_embeddings_config() -> dict:
+    return {
+        "max_concurrency": int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 4)),
+        "batch_window": float(os.getenv("EMBEDDING_BATCH_WINDOW", 0.05)),
+        "max_retries": int(os.getenv("EMBEDDING_MAX_RETRIES", 5)),
+    }
+
+
+class AsyncOpenAIEmbeddingsService(EmbeddingBackend):
+    """OpenAI embeddings client for the asyncio scraper.
+
+    Texts requested within ``batch_window`` seconds of each other are
+    coalesced into one request (up to ``batch_size`` inputs), at most
+    ``max_concurrency`` requests are in flight, and a 429, 5xx, timeout or
+    connection error pauses every request until the backoff (or the
+    server's retry-after) has passed.
+    """
+
+    BACKOFF_BASE = 1.0
+    BACKOFF_MAX = 60.0
+    model = DEFAULT_EMBEDDING_MODEL
+
+    def __init__(
+        self,
+        cache: Optional[EmbeddingCache] = None,
+        post_cache: Optional[EmbeddingCache] = None,
+        prefilter_threshold: Optional[float] = None,
+        max_concurrency: int = 4,
+        batch_window: float = 0.05,
+        max_retries: int = 5,
+        batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+    ):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
-        self.client = OpenAI(api_key=api_key)
+        super().__init__(cache, post_cache, prefilter_threshold)
+        # Retries are handled here so a 429 slows down every caller.
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._flush_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._backoff_until = 0.0
 
-    def get_embeddings(self, texts, model="text-embedding-3-small"):
+    async def get_embeddings(self, texts, model=None):
         """Get embeddings for a list of texts"""
+        model = model or self.model
+        loop = asyncio.get_running_loop()
+        futures = [self._enqueue(text, model, loop) for text in texts]
         try:
-            response = self.client.embeddings.create(input=texts, model=model)
-            embeddings = [embedding.embedding for embedding in response.data]
-            return embeddings
+            return list(await asyncio.gather(*futures))
         except Exception as e:
             logger.error(f"Error getting embeddings: {e}")
             return None
 
-    def cosine_similarity(self, a, b):
-        """Calculate cosine similarity between two vectors"""
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    def _enqueue(
+        self, text: str, model: str, loop: asyncio.AbstractEventLoop
+    ) -> asyncio.Future:
+        future = loop.create_future()
+        pending = self._pending.setdefault(model, [])
+        pending.append((text, future))
+        if len(pending) >= self.batch_size:
+            self._flush(model)
+        elif model not in self._flush_handles:
+            self._flush_handles[model] = loop.call_later(
+                self.batch_window, self._flush, model
+            )
+        return future
 
-    def check_similarity(self, post_text, target_text, threshold=35.0):
-        """Check if post text is similar enough to target text based on threshold"""
-        embeddings = self.get_embeddings([post_text, target_text])
-        if not embeddings or len(embeddings) != 2:
-            logger.warning("Failed to get embeddings for similarity check")
-            return False, 0.0
+    def _flush(self, model: str) -> None:
+        handle = self._flush_handles.pop(model, None)
+        if handle is not None:
+            handle.cancel()
+        pending = self._pending.pop(model, [])
+        if pending:
+            task = asyncio.ensure_future(self._send(model, pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
 
-        embedding1, embedding2 = embeddings[0], embeddings[1]
-        similarity = self.cosine_similarity(embedding1, embedding2)
-        similarity_percentage = similarity * 100
+    async def _send(self, model: str, pending: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in pending))
+        try:
+            embeddings = await self._request(texts, model)
+            if len(embeddings) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+                )
+            by_text = dict(zip(texts, embeddings))
+            for text, future in pending:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
 
-        logger.debug(f"Similarity: {similarity_percentage:.1f}%")
-        return similarity_percentage >= threshold, similarity_percentage
+    async def _request(self, texts: List[str], model: str) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            delay = self._backoff_until - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with self._semaphore:
+                try:
+                    response = await self.client.embeddings.create(
+                        input=texts, model=model
+                    )
+                    return [embedding.embedding for embedding in response.data]
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._retry_delay(e, attempt)
+                    self._backoff_until = max(self._backoff_until, loop.time() + delay)
+                    logger.warning(
+                        f"Embeddings request failed ({type(e).__name__}), retrying {len(texts)} texts in {delay:.1f}s"
+                    )
+                    attempt += 1
 
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        # Connection errors and timeouts carry no response.
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response else None
+        try:
+            if retry_after is not None:
+                return float(retry_after)
+        except ValueError:
+            pass
+        delay = min(self.BACKOFF_BASE * 2**attempt, self.BACKOFF_MAX)
+        return delay * (1 + random.random() * 0.25)
 
-embeddings_service = OpenAIEmbeddingsService()
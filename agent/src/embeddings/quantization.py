@@ -0,0 +1,90 @@
+from typing import List, Optional
+import numpy as np
+
+SUPPORTED_PRECISIONS = ("float32", "float16", "int8")
+INT8_MAX = 127
+
+
+def normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QuantizedVectors:
+    """Contiguous slab of unit vectors in float32, float16 or int8.
+
+    int8 rows use a symmetric per-row scale (``max |x| / 127``), so a row
+    costs ``dim + 4`` bytes instead of ``4 * dim``. Rows freed by eviction
+    are reused before the slab grows. Reads dequantize to float32 so the
+    similarity itself stays a single BLAS matmul.
+    """
+
+    def __init__(self, precision: str = "float32", initial_capacity: int = 256):
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Unsupported vector precision {precision}")
+        self.precision = precision
+        self.dtype = np.dtype(precision)
+        self.dim: Optional[int] = None
+        self._capacity = initial_capacity
+        self._data: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._free: List[int] = []
+        self._size = 0
+
+    def _allocate(self, dim: int) -> None:
+        self.dim = dim
+        self._data = np.zeros((self._capacity, dim), dtype=self.dtype)
+        self._scales = np.ones(self._capacity, dtype=np.float32)
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        data = np.zeros((self._capacity, self.dim), dtype=self.dtype)
+        data[: self._size] = self._data[: self._size]
+        scales = np.ones(self._capacity, dtype=np.float32)
+        scales[: self._size] = self._scales[: self._size]
+        self._data, self._scales = data, scales
+
+    def add(self, vector) -> int:
+        """Store ``vector`` normalized and quantized; returns its row."""
+        vector = normalize(vector)
+        if self.dim is None:
+            self._allocate(vector.shape[0])
+        if vector.shape[0] != self.dim:
+            raise ValueError(
+                f"Vector of dimension {vector.shape[0]} does not fit slab of dimension {self.dim}"
+            )
+
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._size
+            self._size += 1
+
+        if self.precision == "int8":
+            peak = float(np.max(np.abs(vector))) or 1.0
+            scale = peak / INT8_MAX
+            self._data[row] = np.round(vector / scale).astype(np.int8)
+            self._scales[row] = scale
+        else:
+            self._data[row] = vector
+        return row
+
+    def release(self, row: int) -> None:
+        self._free.append(row)
+
+    def get(self, row: int) -> np.ndarray:
+        return self._data[row].astype(np.float32) * self._scales[row]
+
+    def get_rows(self, rows: List[int]) -> np.ndarray:
+        """float32 matrix of the given rows, dequantized in one operation."""
+        return self._data[rows].astype(np.float32) * self._scales[rows, None]
+
+    @property
+    def bytes_per_vector(self) -> int:
+        if self.dim is None:
+            return 0
+        extra = self._scales.itemsize if self.precision == "int8" else 0
+        return self.dim * self.dtype.itemsize + extra
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ("float32", "float16")
+DELETED_ROW = -1
+# Rewrite the live rows once this share of the file is deleted or
+# overwritten rows, and let a capped store overshoot by this much first.
+COMPACT_DEAD_RATIO = 0.5
+COMPACT_MIN_ROWS = 1024
+MAX_ENTRIES_SLACK = 0.1
+# Rows copied per chunk while compacting.
+COMPACT_CHUNK_ROWS = 4096
+
+
+class MemmapVectorStore:
+    """Append-only on-disk store of fixed-width vectors.
+
+    Vectors live back to back in ``vectors.bin`` and are read through a
+    ``np.memmap``, so lookups are zero-copy views into the page cache. The
+    ``index.tsv`` file maps keys to rows, one ``key<TAB>row`` line per write;
+    the last line for a key wins and a row of -1 marks it deleted. A vector
+    is written before its index line, so a crash can leave an unused row but
+    never an index entry pointing at missing data.
+
+    Once deleted and overwritten rows make up ``COMPACT_DEAD_RATIO`` of the
+    file, or there are more than ``max_entries`` live keys, the live rows
+    (the newest ``max_entries`` of them) are copied into a new generation of
+    files. ``meta.json`` is replaced last, so a crash mid-compaction leaves
+    the previous generation in place.
+    """
+
+    def __init__(
+        self, directory: str, dtype: str = "float32", max_entries: Optional[int] = None
+    ):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype}")
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries or None
+        self.dim: Optional[int] = None
+        self.generation = 0
+        self._index: Dict[str, int] = {}
+        self._rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _generation_path(self, name: str, extension: str, generation: int) -> str:
+        suffix = f".{generation}" if generation else ""
+        return os.path.join(self.directory, f"{name}{suffix}.{extension}")
+
+    @property
+    def _data_path(self) -> str:
+        return self._generation_path("vectors", "bin", self.generation)
+
+    @property
+    def _index_path(self) -> str:
+        return self._generation_path("index", "tsv", self.generation)
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        if meta["dtype"] != self.dtype.name:
+            logger.warning(
+                f"Vector store {self.directory} holds {meta['dtype']}, ignoring requested {self.dtype.name}"
+            )
+            self.dtype = np.dtype(meta["dtype"])
+        self.dim = meta["dim"]
+        self.generation = meta.get("generation", 0)
+
+        row_bytes = self.dim * self.dtype.itemsize
+        data_size = os.path.getsize(self._data_path) if os.path.exists(self._data_path) else 0
+        self._rows = data_size // row_bytes
+        if data_size % row_bytes:
+            # Torn write from a crash: drop the partial row.
+            with open(self._data_path, "r+b") as f:
+                f.truncate(self._rows * row_bytes)
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                for line in f:
+                    key, _, row = line.rstrip("\n").rpartition("\t")
+                    if not key or not row.lstrip("-").isdigit():
+                        continue
+                    row = int(row)
+                    if row == DELETED_ROW:
+                        self._index.pop(key, None)
+                    elif row < self._rows:
+                        self._index[key] = row
+        logger.info(f"Loaded {len(self._index)} vectors from {self.directory}")
+
+    def _init_dim(self, dim: int) -> None:
+        self.dim = dim
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta = {"dim": self.dim, "dtype": self.dtype.name, "generation": self.generation}
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _matrix(self) -> np.ndarray:
+        if self._rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=self.dtype)
+        if self._mmap is None or self._mmap.shape[0] < self._rows:
+            self._mmap = np.memmap(
+                self._data_path, dtype=self.dtype, mode="r", shape=(self._rows, self.dim)
+            )
+        return self._mmap
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Read-only view of the stored vector, or None."""
+        with self._lock:
+            row = self._index.get(key)
+            if row is None:
+                return None
+            return self._matrix()[row]
+
+    def get_many(self, keys: List[str]) -> Optional[np.ndarray]:
+        """Stack the vectors for ``keys`` into one matrix, or None if any is
+        missing."""
+        with self._lock:
+            rows = [self._index.get(key) for key in keys]
+            if any(row is None for row in rows):
+                return None
+            return self._matrix()[rows]
+
+    def append(self, key: str, vector) -> None:
+        self.append_many([(key, vector)])
+
+    def append_many(self, items: List[Tuple[str, object]]) -> None:
+        """Append ``(key, vector)`` pairs with one write per file."""
+        if not items:
+            return
+        keys = [key for key, _ in items]
+        matrix = np.stack(
+            [np.asarray(vector, dtype=self.dtype).reshape(-1) for _, vector in items]
+        )
+        with self._lock:
+            if self.dim is None:
+                self._init_dim(matrix.shape[1])
+            if matrix.shape[1] != self.dim:
+                raise ValueError(
+                    f"Vector of dimension {matrix.shape[1]} does not fit store of dimension {self.dim}"
+                )
+            with open(self._data_path, "ab") as f:
+                f.write(matrix.tobytes())
+            with open(self._index_path, "a") as f:
+                f.writelines(
+                    f"{key}\t{self._rows + offset}\n" for offset, key in enumerate(keys)
+                )
+            for offset, key in enumerate(keys):
+                self._index[key] = self._rows + offset
+            self._rows += len(keys)
+            self._maybe_compact()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._index.pop(key, None) is None:
+                return
+            with open(self._index_path, "a") as f:
+                f.write(f"{key}\t{DELETED_ROW}\n")
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        dead_rows = self._rows - len(self._index)
+        over_capacity = self.max_entries is not None and len(self._index) > int(
+            self.max_entries * (1 + MAX_ENTRIES_SLACK)
+        )
+        if over_capacity or (
+            self._rows >= COMPACT_MIN_ROWS and dead_rows >= self._rows * COMPACT_DEAD_RATIO
+        ):
+            self._compact()
+
+    def compact(self) -> None:
+        """Rewrite the store with only its live rows."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        live = sorted(self._index.items(), key=lambda item: item[1])
+        if self.max_entries is not None:
+            live = live[-self.max_entries :]
+        generation = self.generation + 1
+        data_path = self._generation_path("vectors", "bin", generation)
+        index_path = self._generation_path("index", "tsv", generation)
+        matrix = self._matrix()
+        with open(data_path, "wb") as data, open(index_path, "w") as index:
+            for start in range(0, len(live), COMPACT_CHUNK_ROWS):
+                chunk = live[start : start + COMPACT_CHUNK_ROWS]
+                data.write(np.ascontiguousarray(matrix[[row for _, row in chunk]]).tobytes())
+                index.writelines(
+                    f"{key}\t{start + offset}\n" for offset, (key, _) in enumerate(chunk)
+                )
+
+        old_paths = (self._data_path, self._index_path)
+        previous_rows = self._rows
+        self.generation = generation
+        self._write_meta()
+        self._index = {key: row for row, (key, _) in enumerate(live)}
+        self._rows = len(live)
+        self._mmap = None
+        for path in old_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        logger.info(
+            f"Compacted {self.directory} from {previous_rows} to {self._rows} rows"
+        )
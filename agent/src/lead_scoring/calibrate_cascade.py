@@ -0,0 +1,533 @@
+"""Calibrate the lead scoring cascade on a sample of posts.
+
+Usage::
+
+    python -m src.lead_scoring.calibrate_cascade sample.jsonl [--dry-run]
+
+Each line of the sample is one post/ICP pair::
+
+    {"icp_id": 3, "post_id": "1abcde", "title": "...", "content": "...",
+     "icp_description": "...", "icp_pain_points": "...", "icp_keywords": [...],
+     "similarity": 31.2, "weak_score": 40, "strong_score": 55, "is_lead": true}
+
+Every record first goes through the scraper's lexical prefilter; pairs it
+fast-tracks or rejects bypass the similarity cut, as they do in the scraper.
+``similarity``, ``weak_score`` and ``strong_score`` are optional: stages
+missing from a logged sample are replayed through the embedding backend and
+the weak and strong models, with weak scores from the same batched prompt
+the scraper uses (LLM results go through the score cache, so reruns are
+cheap). ``is_lead`` is an optional human label. Without labels, the leads
+the current thresholds produce are taken as the reference.
+
+For every ICP (and pooled over all of them) the tool searches for the
+cheapest thresholds whose lead recall on the sample is no worse than the
+current thresholds', prints what each stage saves and loses, and writes the
+result to the cascade thresholds file the scraper reads.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+from src.agent_scraper import get_scraper_config, lexical_prefilter
+from src.embeddings.embedding_backend import get_embedding_backend
+from src.lead_scoring.cascade_thresholds import (
+    get_cascade_thresholds_config,
+    get_icp_thresholds,
+)
+from src.lead_scoring.lead_scoring_service import (
+    PostToScore,
+    score_lead_intent_detailed,
+    score_lead_intent_initial,
+    score_lead_intent_initial_batch,
+)
+from src.lead_scoring.lexical_filter import LexicalDecision
+from src.lead_scoring.scoreing import get_scoring_config
+from src.models.db_models import ICPDataModel, ICPModel
+from src.utils.text_utils import condense_reddit_post
+
+logger = logging.getLogger(__name__)
+
+# Relative cost of one weak (flash-lite) and one strong (flash) call.
+DEFAULT_WEAK_COST = 1.0
+DEFAULT_STRONG_COST = 5.0
+SCORE_THRESHOLD_STEP = 5
+MAX_PREFILTER_CANDIDATES = 200
+# Lexical decisions as evaluate() takes them.
+FAST_TRACKED = 1
+UNDECIDED = 0
+REJECTED = -1
+_LEXICAL_CODES = {
+    LexicalDecision.FAST_TRACK.value: FAST_TRACKED,
+    LexicalDecision.UNDECIDED.value: UNDECIDED,
+    LexicalDecision.REJECT.value: REJECTED,
+}
+
+
+class Thresholds(NamedTuple):
+    prefilter_threshold: float
+    weak_agent_threshold: int
+    confidence_threshold: int
+
+
+class CascadeOutcome(NamedTuple):
+    thresholds: Thresholds
+    weak_calls: int
+    strong_calls: int
+    leads: int
+    reference_leads_kept: int
+    reference_leads: int
+    lost_at_prefilter: int
+    lost_at_weak: int
+    lost_at_confidence: int
+    cost: float
+
+    @property
+    def recall(self) -> float:
+        return self.reference_leads_kept / self.reference_leads if self.reference_leads else 1.0
+
+    @property
+    def precision(self) -> float:
+        return self.reference_leads_kept / self.leads if self.leads else 1.0
+
+
+def load_sample(path: str) -> List[dict]:
+    records = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                logger.warning(f"Skipping line {line_number} of {path}: {e}")
+    return records
+
+
+def _post_text(record: dict) -> str:
+    return condense_reddit_post(record.get("title", ""), record.get("content") or "")
+
+
+def _record_id(record: dict, index: int) -> str:
+    return str(record.get("post_id") or f"record-{index}")
+
+
+def replay_lexical(records: List[dict]) -> None:
+    """Record the scraper's lexical prefilter decision for every record."""
+    by_icp: Dict[int, List[tuple]] = {}
+    for index, record in enumerate(records):
+        by_icp.setdefault(int(record["icp_id"]), []).append((index, record))
+    for icp_id, icp_records in by_icp.items():
+        first = icp_records[0][1]
+        icp = ICPModel(
+            id=icp_id,
+            userId="",
+            name="",
+            data=ICPDataModel(
+                keywords=first.get("icp_keywords"),
+                painPoints=first.get("icp_pain_points"),
+                description=first["icp_description"],
+            ),
+        )
+        posts = [
+            SimpleNamespace(id=_record_id(record, index)) for index, record in icp_records
+        ]
+        decisions = lexical_prefilter(
+            posts, [_post_text(record) for _, record in icp_records], [icp]
+        )[icp_id]
+        for post, (_, record) in zip(posts, icp_records):
+            record["lexical"] = decisions[post.id].value
+
+
+async def replay_similarity(records: List[dict], embedding_backend) -> None:
+    """Fill in the embedding similarity of records that were not logged with
+    one. Pairs the lexical prefilter decided are never embedded by the
+    scraper, so they are not embedded here either."""
+    for record in records:
+        if record.get("similarity") is None and record.get("lexical") not in (
+            None,
+            LexicalDecision.UNDECIDED.value,
+        ):
+            record["similarity"] = 0.0
+    missing = [record for record in records if record.get("similarity") is None]
+    if not missing:
+        return
+    descriptions = list(dict.fromkeys(record["icp_description"] for record in missing))
+    scores = await embedding_backend.similarity_matrix(
+        [_post_text(record) for record in missing], descriptions
+    )
+    if scores is None:
+        raise RuntimeError("Embedding backend returned no similarities")
+    column = {description: i for i, description in enumerate(descriptions)}
+    for row, record in enumerate(missing):
+        record["similarity"] = float(scores[row, column[record["icp_description"]]])
+
+
+def _score_or_none(response) -> Optional[int]:
+    if response is None or response.category == "error":
+        return None
+    return response.final_score
+
+
+async def replay_weak_scores(records: List[dict]) -> None:
+    """Fill in missing weak scores the way ``score_posts`` produces them:
+    posts of one ICP packed LEAD_SCORING_BATCH_SIZE at a time into the
+    batched prompt, or scored alone when batching is off."""
+    batch_size = get_scoring_config()["batch_size"]
+    missing_weak = [
+        (index, record)
+        for index, record in enumerate(records)
+        if record.get("weak_score") is None
+    ]
+    if batch_size <= 1:
+        weak_results = await asyncio.gather(
+            *[
+                score_lead_intent_initial(
+                    record.get("title", ""),
+                    _post_text(record),
+                    record["icp_description"],
+                    record.get("icp_pain_points", ""),
+                )
+                for _, record in missing_weak
+            ]
+        )
+        for (_, record), result in zip(missing_weak, weak_results):
+            record["weak_score"] = _score_or_none(result)
+        return
+
+    by_icp: Dict[tuple, List[tuple]] = {}
+    for index, record in missing_weak:
+        icp_texts = (record["icp_description"], record.get("icp_pain_points", ""))
+        by_icp.setdefault(icp_texts, []).append((index, record))
+    batches = [
+        (icp_texts, icp_records[i : i + batch_size])
+        for icp_texts, icp_records in by_icp.items()
+        for i in range(0, len(icp_records), batch_size)
+    ]
+    batch_results = await asyncio.gather(
+        *[
+            score_lead_intent_initial_batch(
+                [
+                    PostToScore(
+                        _record_id(record, index),
+                        record.get("title", ""),
+                        _post_text(record),
+                    )
+                    for index, record in batch
+                ],
+                *icp_texts,
+            )
+            for icp_texts, batch in batches
+        ]
+    )
+    for (_, batch), results in zip(batches, batch_results):
+        for index, record in batch:
+            result = results.get(_record_id(record, index))
+            record["weak_score"] = _score_or_none(result)
+
+
+async def replay_llm_scores(records: List[dict]) -> None:
+    """Fill in missing weak and strong scores. Every record gets both, since
+    calibration has to see what the strong model says about posts the
+    current thresholds drop."""
+    await replay_weak_scores(records)
+
+    missing_strong = [record for record in records if record.get("strong_score") is None]
+    strong_results = await asyncio.gather(
+        *[
+            score_lead_intent_detailed(
+                record.get("title", ""), _post_text(record), record["icp_description"]
+            )
+            for record in missing_strong
+        ]
+    )
+    for record, result in zip(missing_strong, strong_results):
+        record["strong_score"] = _score_or_none(result)
+
+
+def _passes_prefilter(
+    similarity: np.ndarray, lexical: Optional[np.ndarray], prefilter_threshold: float
+) -> np.ndarray:
+    passes = similarity >= prefilter_threshold
+    if lexical is None:
+        return passes
+    return (passes & (lexical == UNDECIDED)) | (lexical == FAST_TRACKED)
+
+
+def evaluate(
+    similarity: np.ndarray,
+    weak: np.ndarray,
+    strong: np.ndarray,
+    reference: np.ndarray,
+    thresholds: Thresholds,
+    weak_cost: float = DEFAULT_WEAK_COST,
+    strong_cost: float = DEFAULT_STRONG_COST,
+    lexical: Optional[np.ndarray] = None,
+) -> CascadeOutcome:
+    """Run the sample through the cascade with the scraper's comparisons:
+    lexical fast-track or similarity >= prefilter (lexical rejects never
+    pass), weak > weak threshold, strong > confidence."""
+    passes_prefilter = _passes_prefilter(
+        similarity, lexical, thresholds.prefilter_threshold
+    )
+    passes_weak = passes_prefilter & (weak > thresholds.weak_agent_threshold)
+    is_lead = passes_weak & (strong > thresholds.confidence_threshold)
+    weak_calls = int(passes_prefilter.sum())
+    strong_calls = int(passes_weak.sum())
+    return CascadeOutcome(
+        thresholds=thresholds,
+        weak_calls=weak_calls,
+        strong_calls=strong_calls,
+        leads=int(is_lead.sum()),
+        reference_leads_kept=int((is_lead & reference).sum()),
+        reference_leads=int(reference.sum()),
+        lost_at_prefilter=int((reference & ~passes_prefilter).sum()),
+        lost_at_weak=int((reference & passes_prefilter & ~passes_weak).sum()),
+        lost_at_confidence=int((reference & passes_weak & ~is_lead).sum()),
+        cost=weak_calls * weak_cost + strong_calls * strong_cost,
+    )
+
+
+def _prefilter_candidates(similarity: np.ndarray, current: float) -> List[float]:
+    values = np.unique(np.round(similarity, 1))
+    if len(values) > MAX_PREFILTER_CANDIDATES:
+        values = np.unique(
+            np.round(np.quantile(similarity, np.linspace(0, 1, MAX_PREFILTER_CANDIDATES)), 1)
+        )
+    return sorted(set(float(value) for value in values) | {float(current)})
+
+
+def _score_candidates(current: int) -> List[int]:
+    return sorted(set(range(0, 100, SCORE_THRESHOLD_STEP)) | {int(current)})
+
+
+def calibrate(
+    records: List[dict],
+    current: Thresholds,
+    labelled: bool,
+    recall_tolerance: float = 0.0,
+    weak_cost: float = DEFAULT_WEAK_COST,
+    strong_cost: float = DEFAULT_STRONG_COST,
+) -> Dict[str, CascadeOutcome]:
+    """Baseline and cheapest recall-preserving outcome for ``records``.
+
+    Ties on cost go to the more precise cascade. Thresholds only move for a
+    strict improvement, and then to the lowest values that achieve it,
+    which leave the most headroom on posts the sample did not cover.
+    Without labels the confidence threshold defines the reference leads and
+    is kept as is."""
+    similarity = np.array([record["similarity"] for record in records], dtype=np.float64)
+    weak = np.array([record["weak_score"] for record in records], dtype=np.float64)
+    strong = np.array([record["strong_score"] for record in records], dtype=np.float64)
+    lexical = np.array(
+        [_LEXICAL_CODES[record.get("lexical", "undecided")] for record in records]
+    )
+    if labelled:
+        reference = np.array([bool(record["is_lead"]) for record in records])
+    else:
+        reference = (
+            _passes_prefilter(similarity, lexical, current.prefilter_threshold)
+            & (weak > current.weak_agent_threshold)
+            & (strong > current.confidence_threshold)
+        )
+
+    baseline = evaluate(
+        similarity, weak, strong, reference, current, weak_cost, strong_cost, lexical
+    )
+    target_recall = baseline.recall - recall_tolerance
+    confidence_candidates = (
+        _score_candidates(current.confidence_threshold)
+        if labelled
+        else [current.confidence_threshold]
+    )
+
+    best = baseline
+    undecided = similarity[lexical == UNDECIDED]
+    prefilter_candidates = _prefilter_candidates(undecided, current.prefilter_threshold)
+    for prefilter_threshold in prefilter_candidates:
+        for weak_agent_threshold in _score_candidates(current.weak_agent_threshold):
+            for confidence_threshold in confidence_candidates:
+                outcome = evaluate(
+                    similarity,
+                    weak,
+                    strong,
+                    reference,
+                    Thresholds(prefilter_threshold, weak_agent_threshold, confidence_threshold),
+                    weak_cost,
+                    strong_cost,
+                    lexical,
+                )
+                if outcome.recall < target_recall - 1e-9:
+                    continue
+                if (outcome.cost, -outcome.precision) < (best.cost, -best.precision):
+                    best = outcome
+    return {"baseline": baseline, "calibrated": best}
+
+
+def _describe(thresholds: Thresholds) -> str:
+    return (
+        f"prefilter {thresholds.prefilter_threshold:.1f}% / "
+        f"weak > {thresholds.weak_agent_threshold} / "
+        f"confidence > {thresholds.confidence_threshold}"
+    )
+
+
+def _saved(before: int, after: int) -> str:
+    saved = before - after
+    return f"{saved} ({saved / before:.0%})" if before else f"{saved}"
+
+
+def print_report(name: str, samples: int, outcomes: Dict[str, CascadeOutcome]) -> None:
+    baseline, calibrated = outcomes["baseline"], outcomes["calibrated"]
+    print(f"\n{name}: {samples} posts, {baseline.reference_leads} reference leads")
+    for label, outcome in (("current", baseline), ("calibrated", calibrated)):
+        print(
+            f"  {label:<11} {_describe(outcome.thresholds)}: "
+            f"{outcome.weak_calls} weak calls, {outcome.strong_calls} strong calls, "
+            f"{outcome.leads} leads, recall {outcome.recall:.1%}, precision {outcome.precision:.1%}"
+        )
+    print(
+        f"  prefilter   skips {samples - calibrated.weak_calls} weak calls, "
+        f"loses {calibrated.lost_at_prefilter} leads"
+    )
+    print(
+        f"  weak model  skips {calibrated.weak_calls - calibrated.strong_calls} strong calls, "
+        f"loses {calibrated.lost_at_weak} leads"
+    )
+    print(f"  confidence  loses {calibrated.lost_at_confidence} leads")
+    print(
+        f"  vs current  saves {_saved(baseline.weak_calls, calibrated.weak_calls)} weak calls, "
+        f"{_saved(baseline.strong_calls, calibrated.strong_calls)} strong calls"
+    )
+
+
+def _current_thresholds(icp_id: Optional[int], embedding_backend) -> Thresholds:
+    calibrated = (
+        get_icp_thresholds(icp_id, embedding_backend.model) if icp_id is not None else {}
+    )
+    return Thresholds(
+        calibrated.get("prefilter_threshold", embedding_backend.prefilter_threshold),
+        calibrated.get("weak_agent_threshold", get_scoring_config()["weak_agent_threshold"]),
+        calibrated.get("confidence_threshold", get_scraper_config()["confidence_threshold"]),
+    )
+
+
+def _threshold_entry(outcome: CascadeOutcome, samples: int) -> dict:
+    return {
+        **outcome.thresholds._asdict(),
+        "samples": samples,
+        "reference_leads": outcome.reference_leads,
+        "recall": round(outcome.recall, 4),
+    }
+
+
+async def run_calibration(args: argparse.Namespace) -> dict:
+    embedding_backend = get_embedding_backend()
+    records = [
+        record
+        for record in load_sample(args.sample)
+        if record.get("icp_description") and record.get("icp_id") is not None
+    ]
+    replay_lexical(records)
+    await replay_similarity(records, embedding_backend)
+    if not args.no_llm:
+        await replay_llm_scores(records)
+
+    complete = [
+        record
+        for record in records
+        if record.get("weak_score") is not None and record.get("strong_score") is not None
+    ]
+    if len(complete) < len(records):
+        logger.warning(
+            f"Dropping {len(records) - len(complete)} records without weak and strong scores"
+        )
+    if not complete:
+        raise SystemExit("No complete records to calibrate on")
+    labelled = all(record.get("is_lead") is not None for record in complete)
+    print(
+        f"Calibrating on {len(complete)} records ({'labelled' if labelled else 'unlabelled, reference = current cascade'})"
+    )
+
+    calibration_kwargs = dict(
+        labelled=labelled,
+        recall_tolerance=args.recall_tolerance,
+        weak_cost=args.weak_cost,
+        strong_cost=args.strong_cost,
+    )
+    pooled = calibrate(complete, _current_thresholds(None, embedding_backend), **calibration_kwargs)
+    print_report("All ICPs", len(complete), pooled)
+    output = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": embedding_backend.model,
+        "sample": os.path.basename(args.sample),
+        "default": _threshold_entry(pooled["calibrated"], len(complete)),
+        "icps": {},
+    }
+
+    by_icp: Dict[int, List[dict]] = {}
+    for record in complete:
+        by_icp.setdefault(int(record["icp_id"]), []).append(record)
+    for icp_id, icp_records in sorted(by_icp.items()):
+        outcomes = calibrate(
+            icp_records, _current_thresholds(icp_id, embedding_backend), **calibration_kwargs
+        )
+        if (
+            len(icp_records) < args.min_samples
+            or outcomes["baseline"].reference_leads < args.min_leads
+        ):
+            print(
+                f"\nICP {icp_id}: {len(icp_records)} posts, {outcomes['baseline'].reference_leads} leads, too few to calibrate, using defaults"
+            )
+            continue
+        print_report(f"ICP {icp_id}", len(icp_records), outcomes)
+        output["icps"][str(icp_id)] = _threshold_entry(outcomes["calibrated"], len(icp_records))
+    return output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Calibrate the lead scoring cascade thresholds on a sample of posts"
+    )
+    parser.add_argument("sample", help="JSONL file of post/ICP records")
+    parser.add_argument(
+        "--output",
+        default=get_cascade_thresholds_config()["path"],
+        help="Thresholds file to write (default: the file the scraper reads)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report only, write nothing")
+    parser.add_argument(
+        "--no-llm",
+        action="store_true",
+        help="Do not replay missing LLM scores; drop incomplete records instead",
+    )
+    parser.add_argument(
+        "--recall-tolerance",
+        type=float,
+        default=0.0,
+        help="Recall the calibrated cascade may give up against the current one",
+    )
+    parser.add_argument("--weak-cost", type=float, default=DEFAULT_WEAK_COST)
+    parser.add_argument("--strong-cost", type=float, default=DEFAULT_STRONG_COST)
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--min-leads", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    output = asyncio.run(run_calibration(args))
+    if args.dry_run:
+        return
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+        f.write("\n")
+    print(f"\nWrote thresholds for {len(output['icps'])} ICPs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+import os
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CASCADE_THRESHOLD_KEYS = (
+    "prefilter_threshold",
+    "weak_agent_threshold",
+    "confidence_threshold",
+)
+DEFAULT_THRESHOLDS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "config", "cascade_thresholds.json"
+)
+
+
+def get_cascade_thresholds_config() -> dict:
+    return {
+        "path": os.getenv("CASCADE_THRESHOLDS_PATH", DEFAULT_THRESHOLDS_PATH),
+    }
+
+
+_loaded_thresholds: Dict[str, object] = {"path": None, "mtime": None, "data": {}}
+
+
+def load_cascade_thresholds() -> dict:
+    """Calibrated thresholds written by ``calibrate_cascade``, reloaded when
+    the file changes. Empty when there is no file."""
+    path = get_cascade_thresholds_config()["path"]
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _loaded_thresholds["path"] == path and _loaded_thresholds["mtime"] == mtime:
+        return _loaded_thresholds["data"]
+
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring cascade thresholds in {path}: {e}")
+        data = {}
+    _loaded_thresholds.update(path=path, mtime=mtime, data=data)
+    return data
+
+
+def get_icp_thresholds(
+    icp_id: int, embedding_model: Optional[str] = None
+) -> Dict[str, float]:
+    """Calibrated thresholds for one ICP, falling back to the file's defaults.
+    Keys that were not calibrated are absent, so callers keep their own
+    defaults. The prefilter threshold is dropped when it was calibrated for
+    a different embedding model than ``embedding_model``."""
+    data = load_cascade_thresholds()
+    if not data:
+        return {}
+    thresholds = {
+        key: value
+        for source in (data.get("default", {}), data.get("icps", {}).get(str(icp_id), {}))
+        for key, value in source.items()
+        if key in CASCADE_THRESHOLD_KEYS and value is not None
+    }
+    calibrated_model = data.get("embedding_model")
+    if embedding_model and calibrated_model and calibrated_model != embedding_model:
+        thresholds.pop("prefilter_threshold", None)
+    return thresholds
@@ -1,16 +1,29 @@
 from src.agents.agents import load_agent_config
 from ..agent.agent_models import gemini_flash_lite_model, gemini_flash_model
-from ..models.agent_models import LeadIntentResponse
+from ..models.agent_models import BatchLeadIntentResponse, LeadIntentResponse
 from pydantic_ai import Agent
 
+# Bump when the prompt construction changes in a way the config files do not
+# show, so cached scores from the old prompt are no longer served.
+LEAD_SCORING_PROMPT_VERSION = "1"
+
+lead_scoring_system_prompt = load_agent_config("lead_scoring_agent_config.xml")
+lead_scoring_batch_prompt = load_agent_config("lead_scoring_batch_agent_config.xml")
+
 lead_score_agent_weak = Agent(
     gemini_flash_lite_model,
     output_type=LeadIntentResponse,
-    system_prompt=load_agent_config("lead_scoring_agent_config.xml"),
+    system_prompt=lead_scoring_system_prompt,
 )
 
 lead_score_agent_strong = Agent(
     gemini_flash_model,
     output_type=LeadIntentResponse,
-    system_prompt=load_agent_config("lead_scoring_agent_config.xml"),
+    system_prompt=lead_scoring_system_prompt,
+)
+
+lead_score_agent_weak_batch = Agent(
+    gemini_flash_lite_model,
+    output_type=BatchLeadIntentResponse,
+    system_prompt=[lead_scoring_system_prompt, lead_scoring_batch_prompt],
 )
@@ -1,16 +1,40 @@
+import asyncio
+import hashlib
 import json
-from typing import Optional
+import logging
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 from ..models.agent_models import (
     LeadIntentResponse,
     FactorScores,
     FactorJustifications,
 )
 from src.lead_scoring.lead_scoring_agent import (
+    LEAD_SCORING_PROMPT_VERSION,
+    lead_scoring_batch_prompt,
+    lead_scoring_system_prompt,
     lead_score_agent_weak,
+    lead_score_agent_weak_batch,
     lead_score_agent_strong,
 )
+from src.lead_scoring.score_cache import get_score_cache, score_cache_key
 from ..agent.agent_services import run_agent
 
+logger = logging.getLogger(__name__)
+
+# Batched weak scores are stored under the single-post key, so the batch
+# prompt is part of what every cached score depends on.
+_SCORING_CONFIG_HASH = hashlib.sha256(
+    "\n".join(
+        [LEAD_SCORING_PROMPT_VERSION, lead_scoring_system_prompt, lead_scoring_batch_prompt]
+    ).encode("utf-8")
+).hexdigest()
+
+
+class PostToScore(NamedTuple):
+    submission_id: str
+    post_title: str
+    post_content: str
+
 
 async def score_lead_intent_two_stage(
     post_title: str,
@@ -18,44 +42,204 @@ async def score_lead_intent_two_stage(
     icp_description: str,
     icp_pain_points: str,
     weak_agent_threshold: int = 35,
+    speculative: bool = False,
 ) -> Optional[LeadIntentResponse]:
-    initial_result = await score_lead_intent_initial(
-        post_title, post_content, icp_description, icp_pain_points
+    """Weak-model score, then the strong model for posts above the threshold.
+    With ``speculative`` the strong call starts alongside the weak one and
+    is cancelled if the post does not pass."""
+    detailed_task = (
+        asyncio.create_task(
+            score_lead_intent_detailed(post_title, post_content, icp_description)
+        )
+        if speculative
+        else None
     )
+    try:
+        initial_result = await score_lead_intent_initial(
+            post_title, post_content, icp_description, icp_pain_points
+        )
+    except BaseException:
+        if detailed_task is not None:
+            detailed_task.cancel()
+        raise
 
     if not initial_result.final_score > weak_agent_threshold:
+        if detailed_task is not None:
+            detailed_task.cancel()
         return None
 
+    if detailed_task is not None:
+        return await detailed_task
     detailed_result = await score_lead_intent_detailed(
         post_title, post_content, icp_description
     )
     return detailed_result
 
 
-async def score_lead_intent_initial(
-    post_title: str, post_content: str, icp_description: str, icp_pain_points: str
-) -> LeadIntentResponse:
+async def score_lead_intent_two_stage_batch(
+    posts: List[PostToScore],
+    icp_description: str,
+    icp_pain_points: str,
+    weak_agent_threshold: int = 35,
+    speculative_ids: Optional[Set[str]] = None,
+) -> Dict[str, Optional[LeadIntentResponse]]:
+    """Two-stage scoring for several posts of one ICP: the weak stage runs as
+    one batched request, the strong stage per post that passes it. Posts in
+    ``speculative_ids`` start the strong call alongside the weak batch; it is
+    cancelled for those that do not pass."""
+    detailed_tasks = {
+        post.submission_id: asyncio.create_task(
+            score_lead_intent_detailed(post.post_title, post.post_content, icp_description)
+        )
+        for post in posts
+        if speculative_ids and post.submission_id in speculative_ids
+    }
+    try:
+        initial_results = await score_lead_intent_initial_batch(
+            posts, icp_description, icp_pain_points
+        )
+    except BaseException:
+        for task in detailed_tasks.values():
+            task.cancel()
+        raise
+
+    results: Dict[str, Optional[LeadIntentResponse]] = {}
+    passing = []
+    for post in posts:
+        if initial_results[post.submission_id].final_score > weak_agent_threshold:
+            passing.append(post)
+        else:
+            results[post.submission_id] = None
+            if post.submission_id in detailed_tasks:
+                detailed_tasks[post.submission_id].cancel()
+
+    detailed_results = await asyncio.gather(
+        *[
+            detailed_tasks.get(post.submission_id)
+            or score_lead_intent_detailed(
+                post.post_title, post.post_content, icp_description
+            )
+            for post in passing
+        ]
+    )
+    for post, detailed_result in zip(passing, detailed_results):
+        results[post.submission_id] = detailed_result
+    return results
+
+
+async def score_lead_intent_initial_batch(
+    posts: List[PostToScore], icp_description: str, icp_pain_points: str
+) -> Dict[str, LeadIntentResponse]:
+    """Weak-model scores for several posts in one request, keyed by
+    submission id. Posts the batch response is missing (or the whole batch,
+    if the response fails validation) fall back to single-post calls."""
+    # Batched scores are cached under the single-post key, so a post scored
+    # in a batch is never sent again, whichever path sees it next.
+    results: Dict[str, LeadIntentResponse] = {}
+    prompts: Dict[str, dict] = {}
+    cache_keys: Dict[str, Optional[str]] = {}
+    to_send: List[PostToScore] = []
+    for post in posts:
+        prompts[post.submission_id] = _initial_prompt_data(
+            post.post_title, post.post_content, icp_description, icp_pain_points
+        )
+    lookups = await asyncio.gather(
+        *[
+            _cached_score("initial", lead_score_agent_weak, prompts[post.submission_id])
+            for post in posts
+        ]
+    )
+    for post, (cache_key, cached) in zip(posts, lookups):
+        if cached is not None:
+            results[post.submission_id] = cached
+        else:
+            cache_keys[post.submission_id] = cache_key
+            to_send.append(post)
+    if len(to_send) <= 1:
+        for post in to_send:
+            results[post.submission_id] = await _run_initial(
+                prompts[post.submission_id], cache_keys[post.submission_id]
+            )
+        return results
+    posts = to_send
+
     prompt_data = {
         "icp_description": icp_description,
         "icp_pain_points": icp_pain_points,
-        "reddit_post_title": post_title,
-        "reddit_post_content": post_content,
+        "posts": [
+            {
+                "submission_id": post.submission_id,
+                "reddit_post_title": post.post_title,
+                "reddit_post_content": post.post_content,
+            }
+            for post in posts
+        ],
     }
     prompt = json.dumps(prompt_data)
 
+    result = await run_agent(
+        lead_score_agent_weak_batch.run,
+        prompt,
+        "Batch initial lead scoring",
+        timeout=10.0 + 4.0 * len(posts),
+        default_return=None,
+        context=f"{len(posts)} posts",
+    )
+
+    if result is not None:
+        expected_ids = {post.submission_id for post in posts}
+        for item in result.output.results:
+            if item.submission_id in expected_ids and item.submission_id not in results:
+                response = LeadIntentResponse(**item.model_dump(exclude={"submission_id"}))
+                results[item.submission_id] = response
+                await _store_score("initial", cache_keys[item.submission_id], response)
+
+    missing = [post for post in posts if post.submission_id not in results]
+    if missing:
+        logger.warning(
+            f"Batch scoring returned {len(posts) - len(missing)}/{len(posts)} results, scoring {len(missing)} posts individually"
+        )
+        fallback_results = await asyncio.gather(
+            *[
+                _run_initial(prompts[post.submission_id], cache_keys[post.submission_id])
+                for post in missing
+            ]
+        )
+        for post, fallback_result in zip(missing, fallback_results):
+            results[post.submission_id] = fallback_result
+    return results
+
+
+async def score_lead_intent_initial(
+    post_title: str, post_content: str, icp_description: str, icp_pain_points: str
+) -> LeadIntentResponse:
+    prompt_data = _initial_prompt_data(
+        post_title, post_content, icp_description, icp_pain_points
+    )
+    cache_key, cached = await _cached_score("initial", lead_score_agent_weak, prompt_data)
+    if cached is not None:
+        return cached
+    return await _run_initial(prompt_data, cache_key)
+
+
+async def _run_initial(prompt_data: dict, cache_key: Optional[str]) -> LeadIntentResponse:
+    prompt = json.dumps(prompt_data)
+
     result = await run_agent(
         lead_score_agent_weak.run,
         prompt,
         "Initial lead scoring",
         timeout=10.0,
         default_return=None,
-        context=post_title,
+        context=prompt_data["reddit_post_title"],
     )
 
     if result is None:
         return _create_error_response("timeout or error")
 
-    return _create_response_from_result(result)
+    response = _create_response_from_result(result)
+    await _store_score("initial", cache_key, response)
+    return response
 
 
 async def score_lead_intent_detailed(
@@ -66,6 +250,9 @@ async def score_lead_intent_detailed(
         "reddit_post_title": post_title,
         "reddit_post_content": post_content,
     }
+    cache_key, cached = await _cached_score("detailed", lead_score_agent_strong, prompt_data)
+    if cached is not None:
+        return cached
     prompt = json.dumps(prompt_data)
 
     result = await run_agent(
@@ -80,7 +267,44 @@ async def score_lead_intent_detailed(
     if result is None:
         return _create_error_response("timeout or error")
 
-    return _create_response_from_result(result)
+    response = _create_response_from_result(result)
+    await _store_score("detailed", cache_key, response)
+    return response
+
+
+def _initial_prompt_data(
+    post_title: str, post_content: str, icp_description: str, icp_pain_points: str
+) -> dict:
+    return {
+        "icp_description": icp_description,
+        "icp_pain_points": icp_pain_points,
+        "reddit_post_title": post_title,
+        "reddit_post_content": post_content,
+    }
+
+
+async def _cached_score(
+    stage: str, agent, prompt_data: dict
+) -> Tuple[Optional[str], Optional[LeadIntentResponse]]:
+    """Cache key for a scoring call and the stored result, if any."""
+    cache = get_score_cache()
+    if cache is None:
+        return None, None
+    key = score_cache_key(stage, agent.model.model_name, _SCORING_CONFIG_HASH, prompt_data)
+    cached = await cache.aget(key, stage)
+    if cached is not None:
+        logger.info(
+            f"SCORE CACHE HIT: {stage} score for '{prompt_data['reddit_post_title'][:50]}'"
+        )
+    return key, cached
+
+
+async def _store_score(
+    stage: str, key: Optional[str], response: LeadIntentResponse
+) -> None:
+    cache = get_score_cache()
+    if cache is not None and key is not None:
+        await cache.aput(key, stage, response)
 
 
 def _create_error_response(reason: str) -> LeadIntentResponse:
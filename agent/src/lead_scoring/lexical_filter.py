@@ -0,0 +1,134 @@
+import re
+import logging
+from enum import Enum
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from src.models.db_models import ICPModel
+
+logger = logging.getLogger("agent_scraper")
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9'-]+")
+# Pain point words that carry no topical signal on their own.
+STOPWORDS = frozenset(
+    """
+    about above after again against also among another because been before
+    being below between both cannot could does doing down during each either
+    enough every from further have having here hers into itself just more
+    most much must need needs only other ours over same should some such
+    than that their theirs them then there these they this those through
+    under until very want wants what when where which while whom will with
+    within without would your yours really often always never things thing
+    people someone something make makes making like lots many time times
+    """.split()
+)
+MIN_PAIN_TERM_LENGTH = 4
+_INFLECTION_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+class LexicalDecision(str, Enum):
+    REJECT = "reject"
+    FAST_TRACK = "fast_track"
+    UNDECIDED = "undecided"
+
+
+class LexicalMatch(NamedTuple):
+    keyword_hits: int
+    pain_hits: int
+
+
+def _stem(token: str) -> str:
+    """Crude suffix strip so inflections of a pain point word match."""
+    for suffix in _INFLECTION_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_PAIN_TERM_LENGTH:
+            return token[: -len(suffix)]
+    return token
+
+
+def _alternation(terms: List[str], suffix: str = "") -> Optional[re.Pattern]:
+    if not terms:
+        return None
+    # Longest first so "cold email" wins over "email".
+    ordered = sorted(terms, key=len, reverse=True)
+    body = "|".join(re.escape(term) for term in ordered)
+    return re.compile(rf"(?<!\w)(?:{body}){suffix}(?!\w)", re.IGNORECASE)
+
+
+class LexicalMatcher:
+    """Compiled keyword and pain-point matcher for one ICP.
+
+    Keywords are matched as whole phrases. Pain points are reduced to their
+    content words, stemmed and matched with a short inflection suffix so
+    "invoices" also finds "invoice" / "invoicing".
+    """
+
+    def __init__(self, keywords: Optional[List[str]], pain_points: Optional[str]):
+        self.keywords = sorted(
+            {keyword.strip().lower() for keyword in keywords or [] if keyword and keyword.strip()}
+        )
+        self.pain_terms = sorted(
+            {
+                _stem(token.strip("'-"))
+                for token in _TOKEN_PATTERN.findall((pain_points or "").lower())
+                if len(token) >= MIN_PAIN_TERM_LENGTH and token not in STOPWORDS
+            }
+        )
+        self._keyword_pattern = _alternation(self.keywords)
+        self._pain_pattern = _alternation(self.pain_terms, suffix=r"\w{0,4}")
+
+    @property
+    def term_count(self) -> int:
+        return len(self.keywords) + len(self.pain_terms)
+
+    def match(self, text: str) -> LexicalMatch:
+        """Number of distinct keywords and pain-point terms found in text."""
+        keyword_hits = 0
+        pain_hits = 0
+        if self._keyword_pattern is not None:
+            keyword_hits = len(
+                {hit.lower() for hit in self._keyword_pattern.findall(text)}
+            )
+        if self._pain_pattern is not None:
+            pain_hits = len({hit.lower() for hit in self._pain_pattern.findall(text)})
+        return LexicalMatch(keyword_hits, pain_hits)
+
+    def decide(
+        self, text: str, fast_track_hits: int, min_terms: int, reject: bool = False
+    ) -> Tuple[LexicalDecision, LexicalMatch]:
+        """Fast-track posts hitting at least ``fast_track_hits`` keywords and
+        leave the rest to embeddings. With ``reject``, posts sharing no term
+        with the ICP are rejected outright; that misses leads phrased in
+        other words, so it is off unless enabled.
+
+        ICPs with fewer than ``min_terms`` terms never reject, since a
+        handful of words says too little about what they are looking for."""
+        lexical_match = self.match(text)
+        if fast_track_hits and lexical_match.keyword_hits >= fast_track_hits:
+            return LexicalDecision.FAST_TRACK, lexical_match
+        if (
+            reject
+            and self.term_count >= min_terms
+            and lexical_match.keyword_hits == 0
+            and lexical_match.pain_hits == 0
+        ):
+            return LexicalDecision.REJECT, lexical_match
+        return LexicalDecision.UNDECIDED, lexical_match
+
+
+_matchers: Dict[int, Tuple[tuple, LexicalMatcher]] = {}
+
+
+def get_lexical_matcher(icp: ICPModel) -> LexicalMatcher:
+    """Matcher for ``icp``, compiled once and rebuilt only when its keywords
+    or pain points change."""
+    keywords = tuple(icp.data.keywords or []) if icp.data else ()
+    pain_points = icp.data.painPoints if icp.data else None
+    signature = (keywords, pain_points)
+    cached = _matchers.get(icp.id)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    matcher = LexicalMatcher(list(keywords), pain_points)
+    _matchers[icp.id] = (signature, matcher)
+    logger.info(
+        f"Compiled lexical matcher for ICP {icp.id}: {len(matcher.keywords)} keywords, {len(matcher.pain_terms)} pain terms"
+    )
+    return matcher
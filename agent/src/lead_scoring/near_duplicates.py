@@ -0,0 +1,201 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from src.models.agent_models import LeadIntentResponse
+
+logger = logging.getLogger("scoreing")
+
+FINGERPRINT_BITS = 64
+# 8 bands of 8 bits: two fingerprints within 7 bits of each other always
+# agree on at least one whole band, so only same-band entries are compared.
+BAND_BITS = 8
+MAX_GUARANTEED_DISTANCE = FINGERPRINT_BITS // BAND_BITS - 1
+# Word bigrams: robust to small edits on short posts while keeping unrelated
+# posts ~30 bits apart.
+SHINGLE_SIZE = 2
+# Titles alone have too few shingles for a fingerprint to mean anything.
+MIN_SHINGLES = 8
+
+_WORD_PATTERN = re.compile(r"\w+")
+_BIT_SHIFTS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def get_near_duplicate_config() -> dict:
+    return {
+        "enabled": os.getenv("NEAR_DUPLICATE_REUSE", "true").lower() == "true",
+        "max_distance": min(
+            int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", 6)), MAX_GUARANTEED_DISTANCE
+        ),
+        "ttl": float(os.getenv("NEAR_DUPLICATE_TTL", 7 * 24 * 3600)),
+        "max_entries": int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", 100000)),
+    }
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash over word bigrams, or None for very short texts."""
+    words = _WORD_PATTERN.findall(text.lower())
+    shingles = [
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 0))
+    ]
+    if len(shingles) < MIN_SHINGLES:
+        return None
+
+    hashes = np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+            )
+            for shingle in shingles
+        ],
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)
+    votes = bits.sum(axis=0).astype(np.int64) * 2 - len(shingles)
+    fingerprint = 0
+    for bit in np.nonzero(votes > 0)[0]:
+        fingerprint |= 1 << int(bit)
+    return fingerprint
+
+
+def icp_version(icp_description: str, icp_pain_points: str) -> str:
+    """Hash of the ICP texts a score depends on."""
+    return hashlib.sha256(
+        f"{icp_description}\0{icp_pain_points}".encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [
+        (band, (fingerprint >> (band * BAND_BITS)) & mask)
+        for band in range(FINGERPRINT_BITS // BAND_BITS)
+    ]
+
+
+class ScoredPost(NamedTuple):
+    submission_id: str
+    fingerprint: int
+    result: LeadIntentResponse
+    scored_at: float
+
+
+class NearDuplicateIndex:
+    """Remembers scored posts per ICP by SimHash so reposts and cross-posts
+    can reuse the earlier LLM result instead of being scored again.
+
+    Entries expire after ``ttl`` seconds and the oldest are evicted beyond
+    ``max_entries``. Each ICP's entries are dropped as soon as it is seen
+    with a different ``icp_version``, since its edited description or pain
+    points would score the same post differently.
+    """
+
+    def __init__(self, max_distance: int = 6, ttl: float = 7 * 24 * 3600, max_entries: int = 100000):
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], ScoredPost]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, int, int], List[Tuple[int, str]]] = {}
+        self._icp_versions: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def _check_version(self, icp_id: int, version: str) -> None:
+        previous = self._icp_versions.get(icp_id)
+        if previous == version:
+            return
+        self._icp_versions[icp_id] = version
+        if previous is None:
+            return
+        stale = [key for key in self._entries if key[0] == icp_id]
+        for key in stale:
+            self._remove(key)
+        if stale:
+            logger.info(
+                f"ICP {icp_id} changed, dropped {len(stale)} near-duplicate entries"
+            )
+
+    def find(
+        self, icp_id: int, version: str, fingerprint: int, submission_id: str
+    ) -> Optional[ScoredPost]:
+        now = time.time()
+        with self._lock:
+            self._check_version(icp_id, version)
+            best = None
+            for band, value in _bands(fingerprint):
+                for key in self._buckets.get((icp_id, band, value), ()):
+                    entry = self._entries.get(key)
+                    if (
+                        entry is None
+                        or entry.submission_id == submission_id
+                        or now - entry.scored_at > self.ttl
+                    ):
+                        continue
+                    distance = hamming_distance(fingerprint, entry.fingerprint)
+                    if distance <= self.max_distance and (
+                        best is None or distance < best[0]
+                    ):
+                        best = (distance, entry)
+            if best is None:
+                return None
+            self.hits += 1
+            return best[1]
+
+    def add(
+        self,
+        icp_id: int,
+        version: str,
+        fingerprint: int,
+        submission_id: str,
+        result: LeadIntentResponse,
+    ) -> None:
+        key = (icp_id, submission_id)
+        with self._lock:
+            self._check_version(icp_id, version)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = ScoredPost(submission_id, fingerprint, result, time.time())
+            for band, value in _bands(fingerprint):
+                self._buckets.setdefault((icp_id, band, value), []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Tuple[int, str]) -> None:
+        entry = self._entries.pop(key)
+        for band, value in _bands(entry.fingerprint):
+            bucket_key = (key[0], band, value)
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                continue
+            bucket.remove(key)
+            if not bucket:
+                del self._buckets[bucket_key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_shared_near_duplicate_index = None
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    global _shared_near_duplicate_index
+    if _shared_near_duplicate_index is None:
+        config = get_near_duplicate_config()
+        _shared_near_duplicate_index = NearDuplicateIndex(
+            max_distance=config["max_distance"],
+            ttl=config["ttl"],
+            max_entries=config["max_entries"],
+        )
+    return _shared_near_duplicate_index
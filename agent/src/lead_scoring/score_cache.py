@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import Counter
+from typing import Dict, Optional
+from src.models.agent_models import LeadIntentResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", ".cache", "score_cache.sqlite3"
+)
+# Evict in bulk once the table is this far over max_entries, so a full
+# cache does not pay for a DELETE on every insert.
+EVICTION_SLACK = 0.05
+# Hits only bump accessed_at for LRU order, so they are written in batches.
+TOUCH_BATCH_SIZE = 64
+
+
+def get_score_cache_config() -> dict:
+    return {
+        "enabled": os.getenv("SCORE_CACHE_ENABLED", "true").lower() == "true",
+        "path": os.getenv("SCORE_CACHE_PATH", DEFAULT_CACHE_PATH),
+        "ttl": float(os.getenv("SCORE_CACHE_TTL", 30 * 24 * 3600)),
+        "max_entries": int(os.getenv("SCORE_CACHE_MAX_ENTRIES", 200000)),
+    }
+
+
+def score_cache_key(stage: str, model_name: str, config_hash: str, inputs: dict) -> str:
+    """Content address of one scoring call: the stage, model, system prompt
+    contents and the exact prompt inputs."""
+    payload = json.dumps(
+        {
+            "stage": stage,
+            "model": model_name,
+            "config": config_hash,
+            "inputs": inputs,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    """Persistent sqlite cache of LLM scoring results.
+
+    Entries expire ``ttl`` seconds after they were written; beyond
+    ``max_entries`` the least recently used are evicted. Hits and misses
+    are counted per stage in ``metrics``.
+
+    ``aget`` and ``aput`` run the sqlite calls in a worker thread so the
+    event loop never waits on the disk. Access times of hits are buffered
+    and written ``TOUCH_BATCH_SIZE`` at a time or with the next write.
+    """
+
+    def __init__(self, path: str, ttl: float = 30 * 24 * 3600, max_entries: int = 200000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.metrics: Counter = Counter()
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A crash may lose the last commits, which only costs a re-score.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scores (
+                key TEXT PRIMARY KEY,
+                stage TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS scores_accessed_at ON scores (accessed_at)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get(self, key: str, stage: str) -> Optional[LeadIntentResponse]:
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM scores WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    self._conn.execute("DELETE FROM scores WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._size -= 1
+                    row = None
+                if row is None:
+                    self.metrics[f"{stage}_misses"] += 1
+                    return None
+                self._touched[key] = now
+                if len(self._touched) >= TOUCH_BATCH_SIZE:
+                    self._write_touches()
+                    self._conn.commit()
+                self.metrics[f"{stage}_hits"] += 1
+            except sqlite3.Error as e:
+                logger.warning(f"Score cache read failed: {e}")
+                self.metrics[f"{stage}_errors"] += 1
+                return None
+        return LeadIntentResponse.model_validate_json(row[0])
+
+    def put(self, key: str, stage: str, result: LeadIntentResponse) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                existed = self._conn.execute(
+                    "SELECT 1 FROM scores WHERE key = ?", (key,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scores (key, stage, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, stage, result.model_dump_json(), now, now),
+                )
+                if not existed:
+                    self._size += 1
+                self._touched.pop(key, None)
+                self._write_touches()
+                if self._size > self.max_entries * (1 + EVICTION_SLACK):
+                    self._evict(now)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Score cache write failed: {e}")
+                self.metrics[f"{stage}_errors"] += 1
+
+    async def aget(self, key: str, stage: str) -> Optional[LeadIntentResponse]:
+        return await asyncio.to_thread(self.get, key, stage)
+
+    async def aput(self, key: str, stage: str, result: LeadIntentResponse) -> None:
+        await asyncio.to_thread(self.put, key, stage, result)
+
+    def _write_touches(self) -> None:
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE scores SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM scores WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            """
+            DELETE FROM scores WHERE key IN (
+                SELECT key FROM scores ORDER BY accessed_at
+                LIMIT MAX((SELECT COUNT(*) FROM scores) - ?, 0)
+            )
+            """,
+            (self.max_entries,),
+        )
+        self._size = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        logger.info(f"Score cache evicted down to {self._size} entries")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": self._size, **self.metrics}
+
+
+_shared_score_cache = None
+
+
+def get_score_cache() -> Optional[ScoreCache]:
+    """Shared cache, or None when SCORE_CACHE_ENABLED is false or the cache
+    file cannot be opened."""
+    global _shared_score_cache
+    if _shared_score_cache is None:
+        config = get_score_cache_config()
+        if not config["enabled"]:
+            return None
+        try:
+            _shared_score_cache = ScoreCache(
+                config["path"], ttl=config["ttl"], max_entries=config["max_entries"]
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Score cache disabled, cannot open {config['path']}: {e}")
+            return None
+    return _shared_score_cache
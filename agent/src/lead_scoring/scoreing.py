@@ -1,24 +1,181 @@
-from typing import Optional
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
 from asyncpraw.models import Submission
 from src.models.db_models import ICPModel
 from src.models.agent_models import LeadIntentResponse
-from src.lead_scoring.lead_scoring_service import score_lead_intent_two_stage
+from src.lead_scoring.lead_scoring_service import (
+    PostToScore,
+    score_lead_intent_two_stage,
+    score_lead_intent_two_stage_batch,
+)
+from src.lead_scoring.cascade_thresholds import get_icp_thresholds
+from src.lead_scoring.near_duplicates import (
+    get_near_duplicate_config,
+    get_near_duplicate_index,
+    icp_version,
+    simhash,
+)
 from src.utils.text_utils import condense_reddit_post
 import logging
 
 logger = logging.getLogger("scoreing")
 
 
-async def score_post(post: Submission, icp: ICPModel) -> Optional[LeadIntentResponse]:
-    post_content = post.selftext if post.selftext else ""
-    condensed_content = condense_reddit_post(post.title, post_content)
+def get_scoring_config() -> dict:
+    speculative_similarity = os.getenv("SPECULATIVE_SCORING_MIN_SIMILARITY")
+    return {
+        "weak_agent_threshold": 30,
+        "batch_size": int(os.getenv("LEAD_SCORING_BATCH_SIZE", 8)),
+        # Embedding similarity (percent) from which the strong model starts
+        # alongside the weak one. Unset disables speculative scoring.
+        "speculative_min_similarity": (
+            float(speculative_similarity) if speculative_similarity else None
+        ),
+    }
+
+
+def _weak_agent_threshold(icp: ICPModel, config: dict) -> int:
+    return get_icp_thresholds(icp.id).get(
+        "weak_agent_threshold", config["weak_agent_threshold"]
+    )
+
+
+def _is_speculative(similarity: Optional[float], config: dict) -> bool:
+    return (
+        config["speculative_min_similarity"] is not None
+        and similarity is not None
+        and similarity >= config["speculative_min_similarity"]
+    )
+
+
+def _icp_texts(icp: ICPModel) -> Tuple[str, str]:
     icp_description = icp.data.description if icp.data and icp.data.description else ""
     icp_pain_points = icp.data.painPoints if icp.data and icp.data.painPoints else ""
+    return icp_description, icp_pain_points
+
+
+def _near_duplicate_lookup(
+    post: Submission, icp: ICPModel, condensed_content: str
+) -> Tuple[Optional[int], Optional[LeadIntentResponse]]:
+    """Fingerprint the post and return an earlier result for a near-duplicate."""
+    if not get_near_duplicate_config()["enabled"]:
+        return None, None
+    fingerprint = simhash(condensed_content)
+    if fingerprint is None:
+        return None, None
+    duplicate = get_near_duplicate_index().find(
+        icp.id, icp_version(*_icp_texts(icp)), fingerprint, post.id
+    )
+    if duplicate is None:
+        return fingerprint, None
+    logger.info(
+        f"NEAR DUPLICATE: Post {post.id} reuses score of {duplicate.submission_id} for ICP {icp.id}"
+    )
+    return fingerprint, duplicate.result
+
+
+async def score_post(
+    post: Submission, icp: ICPModel, similarity: Optional[float] = None
+) -> Optional[LeadIntentResponse]:
+    post_content = post.selftext if post.selftext else ""
+    condensed_content = condense_reddit_post(post.title, post_content)
+    icp_description, icp_pain_points = _icp_texts(icp)
+
+    fingerprint, duplicate_result = _near_duplicate_lookup(post, icp, condensed_content)
+    if duplicate_result is not None:
+        return duplicate_result
+
     logger.info(f"Scoring post {post.id}")
-    return await score_lead_intent_two_stage(
+    config = get_scoring_config()
+    result = await score_lead_intent_two_stage(
         post_title=post.title,
         post_content=condensed_content,
         icp_description=icp_description,
         icp_pain_points=icp_pain_points,
-        weak_agent_threshold=30,
+        weak_agent_threshold=_weak_agent_threshold(icp, config),
+        speculative=_is_speculative(similarity, config),
+    )
+    if result is not None and fingerprint is not None:
+        get_near_duplicate_index().add(
+            icp.id,
+            icp_version(icp_description, icp_pain_points),
+            fingerprint,
+            post.id,
+            result,
+        )
+    return result
+
+
+async def score_posts(
+    posts: List[Submission],
+    icp: ICPModel,
+    similarities: Optional[Dict[str, float]] = None,
+) -> Dict[str, Optional[LeadIntentResponse]]:
+    """Score several posts for one ICP, packing up to LEAD_SCORING_BATCH_SIZE
+    posts into each weak-model request. ``similarities`` (post id to
+    embedding similarity) selects posts for speculative strong-model calls.
+    Returns results keyed by post id."""
+    config = get_scoring_config()
+    similarities = similarities or {}
+    if config["batch_size"] <= 1:
+        results = await asyncio.gather(
+            *[score_post(post, icp, similarities.get(post.id)) for post in posts]
+        )
+        return {post.id: result for post, result in zip(posts, results)}
+
+    icp_description, icp_pain_points = _icp_texts(icp)
+    results: Dict[str, Optional[LeadIntentResponse]] = {}
+    fingerprints: Dict[str, int] = {}
+    to_score: List[PostToScore] = []
+    for post in posts:
+        condensed_content = condense_reddit_post(post.title, post.selftext or "")
+        fingerprint, duplicate_result = _near_duplicate_lookup(post, icp, condensed_content)
+        if duplicate_result is not None:
+            results[post.id] = duplicate_result
+            continue
+        if fingerprint is not None:
+            fingerprints[post.id] = fingerprint
+        to_score.append(PostToScore(post.id, post.title, condensed_content))
+
+    speculative_ids = {
+        post.submission_id
+        for post in to_score
+        if _is_speculative(similarities.get(post.submission_id), config)
+    }
+    batch_size = config["batch_size"]
+    batches = [to_score[i : i + batch_size] for i in range(0, len(to_score), batch_size)]
+    if batches:
+        logger.info(
+            f"Scoring {len(to_score)} posts for ICP {icp.id} in {len(batches)} batched requests"
+        )
+    batch_results = await asyncio.gather(
+        *[
+            score_lead_intent_two_stage_batch(
+                batch,
+                icp_description,
+                icp_pain_points,
+                weak_agent_threshold=_weak_agent_threshold(icp, config),
+                speculative_ids=speculative_ids,
+            )
+            for batch in batches
+        ],
+        return_exceptions=True,
     )
+    for batch, batch_result in zip(batches, batch_results):
+        if isinstance(batch_result, Exception):
+            logger.warning(f"Batch scoring failed for ICP {icp.id}: {batch_result}")
+            batch_result = {}
+        for post in batch:
+            result = batch_result.get(post.submission_id)
+            results[post.submission_id] = result
+            fingerprint = fingerprints.get(post.submission_id)
+            if result is not None and fingerprint is not None:
+                get_near_duplicate_index().add(
+                    icp.id,
+                    icp_version(icp_description, icp_pain_points),
+                    fingerprint,
+                    post.submission_id,
+                    result,
+                )
+    return results
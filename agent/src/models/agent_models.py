@@ -34,3 +34,11 @@ class LeadIntentResponse(BaseModel):
             + self.factor_scores.decision_authority * 0.10
         )
         return round(weighted_sum)
+
+
+class BatchLeadIntentItem(LeadIntentResponse):
+    submission_id: str
+
+
+class BatchLeadIntentResponse(BaseModel):
+    results: List[BatchLeadIntentItem]
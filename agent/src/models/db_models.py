@@ -14,3 +14,12 @@ class ICPModel(BaseModel):
     userId: str
     name: str
     data: Optional[ICPDataModel] = None
+
+
+class SubredditWatermark(BaseModel):
+    subreddit: str
+    fullname: str
+    created_utc: float
+    posts_per_hour: float = 0.0
+    lead_yield: float = 0.0
+    checked_at: Optional[float] = None
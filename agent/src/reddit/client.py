@@ -2,10 +2,140 @@ import asyncpraw
 import os
 import logging
 import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import List, Mapping, Optional, Tuple
+from asyncprawcore import Requestor
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class RedditPriority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+_request_priority: ContextVar[RedditPriority] = ContextVar(
+    "reddit_request_priority", default=RedditPriority.NORMAL
+)
+
+
+@contextmanager
+def reddit_request_priority(priority: RedditPriority):
+    """Run Reddit calls made in this context (and tasks started from it) at
+    ``priority``."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+class RedditRequestScheduler:
+    """Process-wide token bucket in front of every Reddit HTTP request.
+
+    Tokens refill at ``requests_per_minute`` up to ``burst``. Each response's
+    X-Ratelimit-Remaining/Reset headers re-pace the refill so the remaining
+    allowance is spread over the rest of the window. A 429 empties the bucket
+    until the reset. Waiting requests are granted by priority, then FIFO.
+    """
+
+    def __init__(self, requests_per_minute: float = 100, burst: int = 10):
+        self.max_rate = requests_per_minute / 60
+        self.rate = self.max_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, priority: Optional[RedditPriority] = None) -> None:
+        priority = _request_priority.get() if priority is None else priority
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        if (
+            self._dispatcher is None
+            or self._dispatcher.done()
+            or self._dispatcher.get_loop() is not future.get_loop()
+        ):
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+
+    def update(self, status: int, headers: Mapping[str, str]) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is not None and reset is not None:
+            remaining = float(remaining)
+            seconds_to_reset = max(float(reset), 1.0)
+            self.tokens = min(self.tokens, remaining)
+            self.rate = min(self.max_rate, max(remaining, 0) / seconds_to_reset) or (
+                1 / seconds_to_reset
+            )
+            if remaining <= 0:
+                self.paused_until = now + seconds_to_reset
+        if status == 429:
+            retry_after = float(headers.get("retry-after") or reset or 60)
+            self.tokens = 0
+            self.paused_until = max(self.paused_until, now + retry_after)
+            logger.warning(f"Reddit returned 429, pausing requests for {retry_after}s")
+
+
+_request_scheduler: Optional[RedditRequestScheduler] = None
+
+
+def get_request_scheduler() -> RedditRequestScheduler:
+    global _request_scheduler
+    if _request_scheduler is None:
+        _request_scheduler = RedditRequestScheduler(
+            requests_per_minute=float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", 100)),
+            burst=int(os.getenv("REDDIT_REQUEST_BURST", 10)),
+        )
+    return _request_scheduler
+
+
+class ScheduledRequestor(Requestor):
+    """asyncprawcore requestor that routes every HTTP call through the shared
+    RedditRequestScheduler."""
+
+    async def request(self, *args, **kwargs):
+        scheduler = get_request_scheduler()
+        await scheduler.acquire()
+        response = await super().request(*args, **kwargs)
+        scheduler.update(response.status, response.headers)
+        return response
+
 
 class RedditClient:
     def __init__(self):
@@ -35,7 +165,8 @@ class RedditClient:
                 client_secret=self.client_secret,
                 user_agent=f"python:reddit-bot:v1.0 (by /u/sbdevs)",
                 username=os.getenv("REDDIT_USERNAME"),
-                password=os.getenv("REDDIT_PASSWORD")
+                password=os.getenv("REDDIT_PASSWORD"),
+                requestor_class=ScheduledRequestor,
             )
             self._current_loop = current_loop
 
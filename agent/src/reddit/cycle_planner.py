@@ -0,0 +1,35 @@
+import logging
+from typing import Dict, List, Set
+from src.models.db_models import ICPModel
+
+logger = logging.getLogger("agent_scraper")
+
+
+def get_subreddits_for_icp(icp: ICPModel) -> Set[str]:
+    subreddits = set()
+    if not icp.data or not icp.data.subreddits:
+        return subreddits
+    for subreddit in icp.data.subreddits:
+        clean_subreddit = subreddit.strip() if subreddit else ""
+        if clean_subreddit:
+            subreddits.add(clean_subreddit)
+    logger.info(f"ICPID {icp.id} subreddits: {subreddits}")
+    return subreddits
+
+
+def build_subreddit_plan(icps: List[ICPModel]) -> Dict[str, List[ICPModel]]:
+    """Invert the ICP -> subreddits mapping so every distinct subreddit is
+    fetched once per cycle. Keys are lower-cased since Reddit names are
+    case-insensitive."""
+    plan: Dict[str, List[ICPModel]] = {}
+    for icp in icps:
+        for subreddit_name in get_subreddits_for_icp(icp):
+            interested = plan.setdefault(subreddit_name.lower(), [])
+            if not interested or interested[-1].id != icp.id:
+                interested.append(icp)
+
+    watchers = sum(len(interested) for interested in plan.values())
+    logger.info(
+        f"Cycle plan: {len(plan)} distinct subreddits for {len(icps)} ICPs ({watchers} ICP subscriptions)"
+    )
+    return plan
@@ -0,0 +1,269 @@
+import time
+import logging
+from typing import Dict, List, Optional
+from asyncpraw.models import Submission
+from src.models.db_models import SubredditWatermark
+
+logger = logging.getLogger("agent_scraper")
+
+MAX_LISTING_POSTS = 1000
+MAX_PAGE_SIZE = 100
+MIN_PAGE_SIZE = 10
+# Keeps /r/a+b+.../new well under common URL length limits.
+MAX_MULTIREDDIT_NAME_LENGTH = 1800
+MAX_GROUP_SUBREDDITS = 100
+# Expected new posts per cycle that one combined listing should hold, so
+# most groups are served by a single page.
+GROUP_POST_BUDGET = 80
+RATE_SMOOTHING = 0.3
+# Posts can surface in /new up to this long after their created_utc (spam
+# filter approval, indexing lag), so listings read back this far past the
+# newest post already seen. The re-listed overlap is dropped by the
+# ProcessedPost lookup.
+LISTING_DELAY_MARGIN = 600
+
+
+def listing_horizon(watermark: SubredditWatermark) -> float:
+    """Oldest created_utc that can still hold unseen posts: the delay margin
+    before the newest post seen. A subreddit that has been quiet for weeks
+    looks back from its last poll instead of its last post, so a combined
+    listing is not read back weeks for it."""
+    newest_seen = watermark.created_utc
+    if watermark.checked_at:
+        newest_seen = max(newest_seen, watermark.checked_at - LISTING_DELAY_MARGIN)
+    return newest_seen - LISTING_DELAY_MARGIN
+
+
+def is_past_watermark(post: Submission, watermark: SubredditWatermark) -> bool:
+    """True once a /new listing has gone past every post that can still be
+    unseen. Going by created_utc means a deleted watermark post does not
+    make us read the whole listing."""
+    return post.created_utc < listing_horizon(watermark)
+
+
+def is_watermark_post(post: Submission, watermark: SubredditWatermark) -> bool:
+    return bool(watermark.fullname) and post.fullname == watermark.fullname
+
+
+def expected_posts_per_cycle(
+    watermark: Optional[SubredditWatermark],
+    cycle_seconds: float,
+    now: Optional[float] = None,
+) -> float:
+    """Posts expected since the last poll. With ``now`` the real time since
+    ``checked_at`` is used, since subreddits are polled at different rates."""
+    if watermark is None:
+        return float(MAX_PAGE_SIZE)
+    if now is not None and watermark.checked_at:
+        cycle_seconds = max(now - watermark.checked_at, 0.0)
+    return watermark.posts_per_hour * cycle_seconds / 3600
+
+
+def group_subreddits(
+    subreddit_names: List[str],
+    watermarks: Dict[str, SubredditWatermark],
+    cycle_seconds: float,
+    isolate_new: bool = True,
+    now: Optional[float] = None,
+) -> List[List[str]]:
+    """Pack subreddits into combined r/a+b+c listings.
+
+    With ``isolate_new``, subreddits without a watermark get their own
+    listing so the first cycle still sees a full page each. The rest are
+    packed so a group's expected new posts per cycle fit in
+    ``GROUP_POST_BUDGET`` and the joined name stays under
+    ``MAX_MULTIREDDIT_NAME_LENGTH``. Busy subreddits end up alone or in
+    small groups; quiet ones share large groups.
+    """
+    groups: List[List[str]] = []
+    packed = []
+    for name in subreddit_names:
+        if name in watermarks or not isolate_new:
+            packed.append(name)
+        else:
+            groups.append([name])
+
+    def expected(name: str) -> float:
+        if name not in watermarks:
+            return 0.0
+        return expected_posts_per_cycle(watermarks[name], cycle_seconds, now)
+
+    packed.sort(key=expected, reverse=True)
+    current: List[str] = []
+    current_posts = 0.0
+    current_length = 0
+    for name in packed:
+        name_posts = expected(name)
+        added_length = len(name) + (1 if current else 0)
+        if current and (
+            current_posts + name_posts > GROUP_POST_BUDGET
+            or current_length + added_length > MAX_MULTIREDDIT_NAME_LENGTH
+            or len(current) >= MAX_GROUP_SUBREDDITS
+        ):
+            groups.append(current)
+            current, current_posts, current_length = [], 0.0, 0
+            added_length = len(name)
+        current.append(name)
+        current_posts += name_posts
+        current_length += added_length
+    if current:
+        groups.append(current)
+    return groups
+
+
+def listing_page_size(
+    subreddit_names: List[str],
+    watermarks: Dict[str, SubredditWatermark],
+    cycle_seconds: float,
+    now: Optional[float] = None,
+) -> int:
+    """Size the first page from expected activity so quiet groups cost one
+    small request; later pages always use the maximum size."""
+    expected = sum(
+        expected_posts_per_cycle(watermarks.get(name), cycle_seconds, now)
+        for name in subreddit_names
+    )
+    return int(min(MAX_PAGE_SIZE, max(MIN_PAGE_SIZE, expected * 1.5 + 5)))
+
+
+async def fetch_new_posts(
+    subreddit,
+    watermarks: Dict[str, SubredditWatermark],
+    page_size: int = MAX_PAGE_SIZE,
+) -> List[Submission]:
+    """List submissions newer than each member's watermark, newest first.
+
+    ``subreddit`` may be a single subreddit or a combined r/a+b+c listing.
+    With no watermarks this is the usual ``new(limit=page_size)`` listing.
+    Otherwise pages are read until every member is past its
+    ``listing_horizon`` (or the listing is older than the oldest one), so
+    busy subreddits are not truncated at one page. Posts in the delay margin
+    are returned again; callers drop the ones already processed.
+    """
+    if not watermarks:
+        return [post async for post in subreddit.new(limit=page_size)]
+
+    oldest_created = min(listing_horizon(watermark) for watermark in watermarks.values())
+    pending_subreddits = set(watermarks)
+    posts: List[Submission] = []
+    after = None
+    fetched = 0
+
+    while fetched < MAX_LISTING_POSTS:
+        params = {"after": after} if after else None
+        page = [post async for post in subreddit.new(limit=page_size, params=params)]
+        fetched += len(page)
+        for post in page:
+            if post.created_utc < oldest_created:
+                return posts
+            subreddit_name = post.subreddit.display_name.lower()
+            watermark = watermarks.get(subreddit_name)
+            if watermark is not None:
+                if is_past_watermark(post, watermark):
+                    pending_subreddits.discard(subreddit_name)
+                    if not pending_subreddits:
+                        return posts
+                    continue
+                if is_watermark_post(post, watermark):
+                    continue
+            posts.append(post)
+
+        if len(page) < page_size:
+            return posts
+        after = page[-1].fullname
+        page_size = MAX_PAGE_SIZE
+
+    logger.warning(
+        f"Listing for {sorted(watermarks)} exhausted before reaching all watermarks"
+    )
+    return posts
+
+
+def demux_by_subreddit(
+    posts: List[Submission], subreddit_names: List[str]
+) -> Dict[str, List[Submission]]:
+    by_subreddit: Dict[str, List[Submission]] = {name: [] for name in subreddit_names}
+    for post in posts:
+        subreddit_name = post.subreddit.display_name.lower()
+        if subreddit_name in by_subreddit:
+            by_subreddit[subreddit_name].append(post)
+    return by_subreddit
+
+
+def newest_watermark(
+    subreddit_name: str,
+    posts: List[Submission],
+    previous: Optional[SubredditWatermark] = None,
+) -> Optional[SubredditWatermark]:
+    if not posts:
+        return previous
+    newest = max(posts, key=lambda post: post.created_utc)
+    if previous is not None and previous.created_utc >= newest.created_utc:
+        # Only late-surfacing posts from the delay margin.
+        return previous
+    if previous is not None:
+        return previous.model_copy(
+            update={"fullname": newest.fullname, "created_utc": newest.created_utc}
+        )
+    return SubredditWatermark(
+        subreddit=subreddit_name,
+        fullname=newest.fullname,
+        created_utc=newest.created_utc,
+    )
+
+
+def advance_watermark(
+    subreddit_name: str,
+    posts: List[Submission],
+    previous: Optional[SubredditWatermark],
+    now: Optional[float] = None,
+    leads: int = 0,
+) -> SubredditWatermark:
+    """Move the watermark to the newest post and fold this poll's arrival
+    count and qualified ``leads`` into the smoothed posts-per-hour and
+    lead-yield estimates. Re-listed posts from the delay margin do not count
+    as arrivals."""
+    now = now if now is not None else time.time()
+    watermark = newest_watermark(subreddit_name, posts, previous)
+    if previous is not None:
+        posts = [post for post in posts if post.created_utc > previous.created_utc]
+    if watermark is None:
+        # Empty subreddit: anything posted from now on is new.
+        return SubredditWatermark(
+            subreddit=subreddit_name, fullname="", created_utc=now, checked_at=now
+        )
+
+    if previous is not None and previous.checked_at:
+        elapsed_hours = max((now - previous.checked_at) / 3600, 1 / 60)
+        observed_rate = len(posts) / elapsed_hours
+        posts_per_hour = (
+            RATE_SMOOTHING * observed_rate
+            + (1 - RATE_SMOOTHING) * previous.posts_per_hour
+        )
+    elif len(posts) > 1:
+        span_hours = max(
+            (max(post.created_utc for post in posts) - min(post.created_utc for post in posts))
+            / 3600,
+            1 / 60,
+        )
+        posts_per_hour = len(posts) / span_hours
+    else:
+        posts_per_hour = watermark.posts_per_hour
+
+    lead_yield = watermark.lead_yield
+    if posts:
+        observed_yield = leads / len(posts)
+        if previous is None:
+            lead_yield = observed_yield
+        else:
+            lead_yield = (
+                RATE_SMOOTHING * observed_yield + (1 - RATE_SMOOTHING) * lead_yield
+            )
+
+    return watermark.model_copy(
+        update={
+            "posts_per_hour": posts_per_hour,
+            "lead_yield": lead_yield,
+            "checked_at": now,
+        }
+    )
@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, List, Optional
+from src.models.db_models import SubredditWatermark
+from src.reddit.listings import GROUP_POST_BUDGET, MAX_GROUP_SUBREDDITS
+
+logger = logging.getLogger("agent_scraper")
+
+# Lead yield (leads per listed post) at which a subreddit is polled twice as
+# often as its post rate alone would ask for.
+REFERENCE_LEAD_YIELD = 0.02
+MAX_YIELD_SPEEDUP = 4.0
+# Floor for the rate estimate so dead subreddits land on max_poll_interval
+# instead of dividing by zero.
+MIN_POSTS_PER_HOUR = 0.01
+BUDGET_PASSES = 3
+
+
+def poll_interval(watermark: Optional[SubredditWatermark], config: dict) -> float:
+    """Seconds between polls of one subreddit, before the global budget.
+
+    Aims for ``target_posts_per_poll`` new posts per poll, shortened for
+    subreddits that have produced leads, and clamped to
+    [``min_poll_interval``, ``max_poll_interval``]."""
+    if watermark is None or not watermark.checked_at:
+        return float(config["min_poll_interval"])
+    rate = max(watermark.posts_per_hour, MIN_POSTS_PER_HOUR)
+    interval = config["target_posts_per_poll"] / rate * 3600
+    interval /= min(1 + watermark.lead_yield / REFERENCE_LEAD_YIELD, MAX_YIELD_SPEEDUP)
+    return min(max(interval, config["min_poll_interval"]), config["max_poll_interval"])
+
+
+def estimated_requests_per_hour(
+    intervals: Dict[str, float], watermarks: Dict[str, SubredditWatermark]
+) -> float:
+    """Listing requests per hour if every subreddit is polled at its interval.
+
+    A poll costs its share of a combined listing: busy subreddits fill pages
+    on their own, quiet ones share a group of up to ``MAX_GROUP_SUBREDDITS``."""
+    total = 0.0
+    for name, interval in intervals.items():
+        watermark = watermarks.get(name)
+        posts_per_poll = watermark.posts_per_hour * interval / 3600 if watermark else 0.0
+        cost = max(posts_per_poll / GROUP_POST_BUDGET, 1 / MAX_GROUP_SUBREDDITS)
+        total += cost * 3600 / interval
+    return total
+
+
+def budgeted_poll_intervals(
+    subreddit_names: List[str],
+    watermarks: Dict[str, SubredditWatermark],
+    config: dict,
+) -> Dict[str, float]:
+    """Per-subreddit poll intervals, stretched uniformly when the combined
+    estimate exceeds ``poll_requests_per_hour``."""
+    intervals = {
+        name: poll_interval(watermarks.get(name), config) for name in subreddit_names
+    }
+    budget = config["poll_requests_per_hour"]
+    for _ in range(BUDGET_PASSES):
+        estimate = estimated_requests_per_hour(intervals, watermarks)
+        if estimate <= budget:
+            break
+        scale = estimate / budget
+        intervals = {
+            name: min(interval * scale, config["max_poll_interval"])
+            for name, interval in intervals.items()
+        }
+    else:
+        estimate = estimated_requests_per_hour(intervals, watermarks)
+        if estimate > budget:
+            logger.warning(
+                f"Polling {len(intervals)} subreddits needs ~{estimate:.0f} requests/hour, over the {budget} budget"
+            )
+    return intervals
+
+
+def select_due_subreddits(
+    subreddit_names: List[str],
+    watermarks: Dict[str, SubredditWatermark],
+    config: dict,
+    now: float,
+) -> List[str]:
+    """Subreddits whose next poll falls before the middle of the next
+    scheduler tick. Subreddits never polled are always due."""
+    intervals = budgeted_poll_intervals(subreddit_names, watermarks, config)
+    slack = config["poll_tick_interval"] / 2
+    due = []
+    for name in subreddit_names:
+        watermark = watermarks.get(name)
+        if watermark is None or not watermark.checked_at:
+            due.append(name)
+        elif now + slack >= watermark.checked_at + intervals[name]:
+            due.append(name)
+    return due
@@ -5,7 +5,7 @@ from collections import Counter
 import asyncpraw
 from ..agents.agents import keyword_generation_agent, subreddit_relevance_agent
 from ..agent.agent_services import run_agent
-from ..reddit.client import RedditClient
+from ..reddit.client import RedditClient, RedditPriority, reddit_request_priority
 
 logger = logging.getLogger(__name__)
 
@@ -47,18 +47,19 @@ async def find_relevant_subreddits_from_keywords(
     subreddit_subscribers = {}
     subreddit_descriptions = {}
 
-    for keyword in keywords:
-        async for subreddit in reddit.get_client().subreddits.search(
-            keyword, limit=limit
-        ):
-            if subreddit.subscribers and subreddit.subscribers >= min_subscribers:
-                subreddit_counts[subreddit.display_name] += 1
-                subreddit_subscribers[subreddit.display_name] = (
-                    subreddit.subscribers
-                )
-                subreddit_descriptions[subreddit.display_name] = (
-                    subreddit.public_description or ""
-                )
+    with reddit_request_priority(RedditPriority.HIGH):
+        for keyword in keywords:
+            async for subreddit in reddit.get_client().subreddits.search(
+                keyword, limit=limit
+            ):
+                if subreddit.subscribers and subreddit.subscribers >= min_subscribers:
+                    subreddit_counts[subreddit.display_name] += 1
+                    subreddit_subscribers[subreddit.display_name] = (
+                        subreddit.subscribers
+                    )
+                    subreddit_descriptions[subreddit.display_name] = (
+                        subreddit.public_description or ""
+                    )
 
     top_subreddits = [
         (name, count, subreddit_subscribers[name], subreddit_descriptions[name])
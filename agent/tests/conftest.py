@@ -0,0 +1,14 @@
+import os
+
+# Modules build their clients at import time; give them placeholder settings
+# so nothing reaches a real service.
+for name, value in {
+    "DATABASE_URL": "postgresql://localhost/test",
+    "UPSTASH_REDIS_REST_URL": "http://localhost",
+    "UPSTASH_REDIS_REST_TOKEN": "test",
+    "OPENAI_API_KEY": "test",
+    "OPENROUTER_API_KEY": "test",
+    "LOGFIRE_SEND_TO_LOGFIRE": "false",
+    "SCORE_CACHE_ENABLED": "false",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+from typing import List, Optional
+
+
+def make_post(
+    post_id: str,
+    created_utc: float,
+    subreddit: str = "python",
+    title: str = "",
+    selftext: str = "",
+) -> SimpleNamespace:
+    """Stand-in for an asyncpraw Submission with the fields the scraper reads."""
+    return SimpleNamespace(
+        id=post_id,
+        fullname=f"t3_{post_id}",
+        created_utc=created_utc,
+        subreddit=SimpleNamespace(display_name=subreddit),
+        title=title or f"Post {post_id}",
+        selftext=selftext,
+    )
+
+
+class FakeListing:
+    """/new listing over ``posts`` (newest first) that pages like Reddit."""
+
+    def __init__(self, posts: List[SimpleNamespace]):
+        self.posts = sorted(posts, key=lambda post: post.created_utc, reverse=True)
+        self.requests = []
+
+    async def new(self, limit: int = 100, params: Optional[dict] = None):
+        after = (params or {}).get("after")
+        self.requests.append((limit, after))
+        start = 0
+        if after:
+            start = next(
+                i + 1 for i, post in enumerate(self.posts) if post.fullname == after
+            )
+        for post in self.posts[start : start + limit]:
+            yield post
+
+
+class _Context:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def __aenter__(self):
+        return self.value
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeLeadConnection:
+    """asyncpg connection that emulates the RedditPost insert's
+    ``ON CONFLICT ("submissionId") DO NOTHING`` and records executes."""
+
+    def __init__(self, existing_submission_ids=()):
+        self.submission_ids = set(existing_submission_ids)
+        self.executed = []
+
+    def transaction(self):
+        return _Context()
+
+    async def fetch(self, query, icp_ids, submission_ids, *columns):
+        rows = []
+        for icp_id, submission_id in zip(icp_ids, submission_ids):
+            if submission_id not in self.submission_ids:
+                self.submission_ids.add(submission_id)
+                rows.append({"submissionId": submission_id, "icpId": icp_id})
+        return rows
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+        return "OK"
+
+
+class FakePool:
+    """asyncpg pool handing out ``conns`` in turn, running ``setup`` on each
+    acquire the way asyncpg does (a failing setup discards the connection)."""
+
+    def __init__(self, *conns, setup=None):
+        self.conns = list(conns)
+        self.setup = setup
+        self.discarded = []
+        self.released = []
+
+    async def acquire(self):
+        conn = self.conns[0]
+        if self.setup is not None:
+            try:
+                await self.setup(conn)
+            except Exception:
+                self.discarded.append(self.conns.pop(0))
+                raise
+        return conn
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+
+def make_lead(submission_id: str, icp_id: int) -> dict:
+    return {
+        "icp_id": icp_id,
+        "submission_id": submission_id,
+        "subreddit": "python",
+        "title": f"Post {submission_id}",
+        "content": "",
+        "url": f"https://reddit.com/{submission_id}",
+        "lead_quality": 80,
+        "analysis_data": {},
+        "reddit_created_at": None,
+    }
+
+
+def make_result(score: int = 80, category: str = "lead"):
+    from src.models.agent_models import (
+        FactorJustifications,
+        FactorScores,
+        LeadIntentResponse,
+    )
+
+    return LeadIntentResponse(
+        category=category,
+        factor_scores=FactorScores(
+            product_fit=score, intent_signals=score, decision_authority=score
+        ),
+        factor_justifications=FactorJustifications(
+            product_fit="", intent_signals="", decision_authority=""
+        ),
+        pain_points="",
+    )
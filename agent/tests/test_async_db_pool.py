@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from src.db import async_db
+from src.db.async_db import AsyncScraperDatabaseManager, _UnhealthyConnection
+from tests.fakes import FakePool
+
+
+class FakePooledConnection:
+    def __init__(self, opened_at: float, checked_at: float, healthy: bool = True):
+        self.opened_at = opened_at
+        self.checked_at = checked_at
+        self.healthy = healthy
+        self.pings = 0
+
+    async def fetchval(self, query):
+        self.pings += 1
+        if not self.healthy:
+            raise ConnectionResetError("connection reset by peer")
+        return 1
+
+
+def db_manager_with(*conns, max_size: int = 3) -> AsyncScraperDatabaseManager:
+    manager = AsyncScraperDatabaseManager.__new__(AsyncScraperDatabaseManager)
+    manager.pool_config = {
+        "min_size": 1,
+        "max_size": max_size,
+        "max_connection_age": 1800.0,
+        "health_check_interval": 30.0,
+    }
+    manager._pool = FakePool(*conns, setup=manager._check_connection)
+    return manager
+
+
+async def acquire(manager):
+    async with manager._connection() as conn:
+        return conn
+
+
+@pytest.fixture
+def now(monkeypatch):
+    monkeypatch.setattr(async_db.time, "monotonic", lambda: 10_000.0)
+    return 10_000.0
+
+
+def test_recently_checked_connection_is_handed_out_without_a_ping(now):
+    conn = FakePooledConnection(opened_at=now - 60, checked_at=now - 5)
+    manager = db_manager_with(conn)
+    assert asyncio.run(acquire(manager)) is conn
+    assert conn.pings == 0
+    assert manager._pool.released == [conn]
+
+
+def test_idle_connection_is_pinged_before_it_is_handed_out(now):
+    conn = FakePooledConnection(opened_at=now - 60, checked_at=now - 45)
+    manager = db_manager_with(conn)
+    assert asyncio.run(acquire(manager)) is conn
+    assert conn.pings == 1
+    assert conn.checked_at == now
+
+
+def test_connections_past_max_age_or_failing_the_ping_are_replaced(now):
+    old = FakePooledConnection(opened_at=now - 3600, checked_at=now)
+    broken = FakePooledConnection(opened_at=now - 60, checked_at=now - 45, healthy=False)
+    fresh = FakePooledConnection(opened_at=now, checked_at=now)
+    manager = db_manager_with(old, broken, fresh)
+    assert asyncio.run(acquire(manager)) is fresh
+    assert manager._pool.discarded == [old, broken]
+
+
+def test_acquire_gives_up_after_max_size_plus_one_unhealthy_connections(now):
+    conns = [
+        FakePooledConnection(opened_at=now - 60, checked_at=now - 45, healthy=False)
+        for _ in range(3)
+    ]
+    manager = db_manager_with(*conns, max_size=2)
+    with pytest.raises(_UnhealthyConnection):
+        asyncio.run(acquire(manager))
+    assert manager._pool.discarded == conns
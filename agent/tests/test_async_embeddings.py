@@ -0,0 +1,147 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import pytest
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from src import agent_scraper
+from src.embeddings.openai_embeddings_service import AsyncOpenAIEmbeddingsService
+from src.models.db_models import ICPDataModel, ICPModel
+from tests.fakes import make_post
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+
+
+class FakeEmbeddings:
+    """``client.embeddings`` that raises ``errors`` in turn, then embeds each
+    text as ``[len(text)]``."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = []
+        self.called_at = []
+
+    async def create(self, input, model):
+        self.calls.append(list(input))
+        self.called_at.append(asyncio.get_running_loop().time())
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(len(text))]) for text in input]
+        )
+
+
+def service_with(embeddings, **kwargs) -> AsyncOpenAIEmbeddingsService:
+    service = AsyncOpenAIEmbeddingsService(batch_window=0.01, **kwargs)
+    service.BACKOFF_BASE = 0.001
+    service.client = SimpleNamespace(embeddings=embeddings)
+    return service
+
+
+def rate_limited(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=REQUEST)
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+def test_concurrent_requests_are_coalesced_and_deduplicated():
+    embeddings = FakeEmbeddings()
+    service = service_with(embeddings)
+
+    async def run():
+        return await asyncio.gather(
+            service.get_embeddings(["a", "bb"]),
+            service.get_embeddings(["bb", "ccc"]),
+        )
+
+    first, second = asyncio.run(run())
+    assert first == [[1.0], [2.0]] and second == [[2.0], [3.0]]
+    assert embeddings.calls == [["a", "bb", "ccc"]]
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    embeddings = FakeEmbeddings()
+    service = service_with(embeddings, batch_size=2)
+    service.batch_window = 60
+    assert asyncio.run(service.get_embeddings(["a", "bb"])) == [[1.0], [2.0]]
+    assert embeddings.calls == [["a", "bb"]]
+
+
+def test_rate_limit_waits_for_retry_after():
+    embeddings = FakeEmbeddings([rate_limited("0.2")])
+    service = service_with(embeddings)
+    assert asyncio.run(service.get_embeddings(["ab"])) == [[2.0]]
+    assert embeddings.called_at[1] - embeddings.called_at[0] >= 0.2
+
+
+def test_rate_limit_backoff_grows_exponentially_without_retry_after():
+    service = service_with(FakeEmbeddings())
+    service.BACKOFF_BASE = 1.0
+    for attempt in range(3):
+        delay = service._retry_delay(rate_limited(), attempt)
+        assert 2**attempt <= delay <= 2**attempt * 1.25
+    assert service._retry_delay(rate_limited(), 20) <= service.BACKOFF_MAX * 1.25
+
+
+def test_rate_limit_pauses_requests_made_during_the_backoff():
+    embeddings = FakeEmbeddings([rate_limited("0.3")])
+    service = service_with(embeddings)
+
+    async def later_request():
+        await asyncio.sleep(0.1)
+        return await service.get_embeddings(["bb"])
+
+    async def run():
+        return await asyncio.gather(service.get_embeddings(["a"]), later_request())
+
+    assert asyncio.run(run()) == [[[1.0]], [[2.0]]]
+    rate_limited_at = embeddings.called_at[0]
+    assert sorted(embeddings.calls[1:]) == [["a"], ["bb"]]
+    assert all(called_at - rate_limited_at >= 0.3 for called_at in embeddings.called_at[1:])
+
+
+def test_connection_timeout_and_server_errors_are_retried():
+    embeddings = FakeEmbeddings(
+        [
+            APIConnectionError(request=REQUEST),
+            InternalServerError(
+                "bad gateway", response=httpx.Response(502, request=REQUEST), body=None
+            ),
+        ]
+    )
+    service = service_with(embeddings)
+    assert asyncio.run(service.get_embeddings(["ab"])) == [[2.0]]
+    assert len(embeddings.calls) == 3
+
+
+def test_retries_give_up_after_max_retries():
+    embeddings = FakeEmbeddings([APIConnectionError(request=REQUEST)] * 3)
+    service = service_with(embeddings, max_retries=2)
+    assert asyncio.run(service.get_embeddings(["ab"])) is None
+    assert len(embeddings.calls) == 3
+
+
+class FakeBackend:
+    model = "test-model"
+    prefilter_threshold = 50.0
+
+
+@pytest.fixture
+def embeddings_down(monkeypatch):
+    async def unavailable(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(agent_scraper, "get_embedding_backend", FakeBackend)
+    monkeypatch.setattr(agent_scraper, "icp_similarity_matrix", unavailable)
+    monkeypatch.setattr(agent_scraper, "get_icp_thresholds", lambda *args: {})
+
+
+def test_prefilter_fails_closed_when_embeddings_are_unavailable(embeddings_down):
+    icp = ICPModel(
+        id=1,
+        userId="alice",
+        name="Invoicing",
+        data=ICPDataModel(description="Freelancers who struggle with invoicing"),
+    )
+    posts = [make_post("a", 1.0, selftext="What should I cook tonight?")]
+    results = asyncio.run(agent_scraper.embeddings_prefilter_batch(posts, [icp]))
+    assert results == {1: {"a": (False, 0.0)}}
@@ -0,0 +1,140 @@
+import asyncio
+import numpy as np
+from src.lead_scoring import calibrate_cascade
+from src.lead_scoring.calibrate_cascade import (
+    FAST_TRACKED,
+    REJECTED,
+    UNDECIDED,
+    Thresholds,
+    calibrate,
+    evaluate,
+    replay_lexical,
+    replay_similarity,
+    replay_weak_scores,
+)
+from tests.fakes import make_result
+
+CURRENT = Thresholds(prefilter_threshold=20.0, weak_agent_threshold=30, confidence_threshold=30)
+
+
+def record(similarity, weak, strong, is_lead=None):
+    return {
+        "similarity": similarity,
+        "weak_score": weak,
+        "strong_score": strong,
+        "is_lead": is_lead,
+    }
+
+
+def test_evaluate_counts_calls_and_losses():
+    outcome = evaluate(
+        similarity=np.array([10.0, 25.0, 40.0, 50.0]),
+        weak=np.array([80.0, 20.0, 80.0, 80.0]),
+        strong=np.array([80.0, 80.0, 10.0, 80.0]),
+        reference=np.array([True, True, True, True]),
+        thresholds=CURRENT,
+    )
+    assert (outcome.weak_calls, outcome.strong_calls, outcome.leads) == (3, 2, 1)
+    assert (outcome.lost_at_prefilter, outcome.lost_at_weak, outcome.lost_at_confidence) == (1, 1, 1)
+    assert outcome.cost == 3 * 1.0 + 2 * 5.0
+    assert outcome.recall == 0.25
+
+
+def test_prefilter_rises_to_skip_posts_that_never_become_leads():
+    records = [record(s, 10, 10) for s in (21.0, 22.0, 23.0, 24.0)]
+    records += [record(s, 80, 80) for s in (45.0, 50.0, 60.0)]
+    outcomes = calibrate(records, CURRENT, labelled=False)
+    calibrated = outcomes["calibrated"]
+    assert calibrated.recall == outcomes["baseline"].recall == 1.0
+    assert calibrated.cost < outcomes["baseline"].cost
+    assert 24.0 < calibrated.thresholds.prefilter_threshold <= 45.0
+
+
+def test_unlabelled_samples_keep_the_confidence_threshold():
+    records = [record(50.0, 80, s) for s in (20, 40, 60)]
+    outcomes = calibrate(records, CURRENT, labelled=False)
+    assert outcomes["calibrated"].thresholds.confidence_threshold == 30
+
+
+def test_labels_raise_the_confidence_threshold_for_precision():
+    records = [record(50.0, 80, 80, is_lead=True), record(50.0, 80, 40, is_lead=False)]
+    outcomes = calibrate(records, CURRENT, labelled=True)
+    assert outcomes["baseline"].precision == 0.5
+    calibrated = outcomes["calibrated"]
+    assert calibrated.precision == 1.0 and calibrated.recall == 1.0
+    assert calibrated.thresholds.confidence_threshold == 40
+
+
+def test_thresholds_do_not_move_without_a_strict_improvement():
+    records = [record(50.0, 80, 80), record(60.0, 80, 80)]
+    outcomes = calibrate(records, CURRENT, labelled=False)
+    assert outcomes["calibrated"].thresholds == CURRENT
+
+
+def test_lexical_decisions_bypass_the_similarity_cut():
+    outcome = evaluate(
+        similarity=np.array([5.0, 50.0, 50.0]),
+        weak=np.array([80.0, 80.0, 80.0]),
+        strong=np.array([80.0, 80.0, 80.0]),
+        reference=np.array([True, True, True]),
+        thresholds=CURRENT,
+        lexical=np.array([FAST_TRACKED, REJECTED, UNDECIDED]),
+    )
+    assert outcome.weak_calls == 2
+    assert outcome.lost_at_prefilter == 1
+
+
+def sample_record(post_id, icp_id, title, **fields):
+    return {
+        "post_id": post_id,
+        "icp_id": icp_id,
+        "title": title,
+        "content": "",
+        "icp_description": f"ICP {icp_id}",
+        "icp_pain_points": "",
+        **fields,
+    }
+
+
+KEYWORDS = ["crm", "cold email"]
+
+
+def test_replay_embeds_only_lexically_undecided_records():
+    records = [
+        sample_record("a", 1, "Best CRM for cold email outreach?", icp_keywords=KEYWORDS),
+        sample_record("b", 1, "What should I cook tonight?", icp_keywords=KEYWORDS),
+    ]
+    embedded = []
+
+    class FakeBackend:
+        async def similarity_matrix(self, post_texts, target_texts):
+            embedded.extend(post_texts)
+            return np.full((len(post_texts), len(target_texts)), 30.0)
+
+    replay_lexical(records)
+    asyncio.run(replay_similarity(records, FakeBackend()))
+    assert [record["lexical"] for record in records] == ["fast_track", "undecided"]
+    assert embedded == ["What should I cook tonight?"]
+    assert records[1]["similarity"] == 30.0
+
+
+def test_weak_scores_are_replayed_through_the_batch_prompt(monkeypatch):
+    batches = []
+
+    async def initial_batch(posts, icp_description, icp_pain_points):
+        batches.append((icp_description, [post.submission_id for post in posts]))
+        return {post.submission_id: make_result(70) for post in posts}
+
+    async def initial(*args):
+        raise AssertionError("single-post prompt used")
+
+    monkeypatch.setattr(calibrate_cascade, "score_lead_intent_initial_batch", initial_batch)
+    monkeypatch.setattr(calibrate_cascade, "score_lead_intent_initial", initial)
+    monkeypatch.setenv("LEAD_SCORING_BATCH_SIZE", "2")
+    records = [sample_record(f"p{i}", 1, f"Post {i}") for i in range(3)]
+    records.append(sample_record("q0", 2, "Other post"))
+    records.append(sample_record("p9", 1, "Logged", weak_score=10))
+
+    asyncio.run(replay_weak_scores(records))
+    assert batches == [("ICP 1", ["p0", "p1"]), ("ICP 1", ["p2"]), ("ICP 2", ["q0"])]
+    assert [record["weak_score"] for record in records] == [70, 70, 70, 70, 10]
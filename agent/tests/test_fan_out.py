@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+from src import agent_scraper
+from src.models.db_models import ICPModel
+from tests.fakes import FakeListing, make_post
+
+NOW = 1_700_000_000.0
+ICPS = [ICPModel(id=i, userId=f"user{i}", name=f"ICP {i}") for i in (1, 2)]
+
+
+class FakeDbManager:
+    def __init__(self):
+        self.lookups = []
+        self.saved_watermarks = []
+
+    async def can_user_add_lead(self, user_id):
+        return True
+
+    async def get_unprocessed_submission_ids(self, icp_id, submission_ids):
+        self.lookups.append(icp_id)
+        return set(submission_ids)
+
+    async def set_subreddit_watermarks(self, watermarks):
+        self.saved_watermarks += watermarks
+        return True
+
+
+def test_subreddit_is_fetched_once_and_fanned_out_to_every_icp(monkeypatch):
+    listing = FakeListing([make_post(f"p{i}", NOW - i) for i in range(3)])
+    fetched = []
+    prefiltered = []
+    processed = {}
+
+    async def get_subreddit(name):
+        fetched.append(name)
+        return listing
+
+    async def prefilter(posts, icps):
+        prefiltered.append(([post.id for post in posts], [icp.id for icp in icps]))
+        return {icp.id: {post.id: (True, 80.0) for post in posts} for icp in icps}
+
+    async def process(posts, icp, db_manager, prefilter_results):
+        processed[icp.id] = [post.id for post in posts]
+        return 1, True
+
+    monkeypatch.setattr(
+        agent_scraper,
+        "get_shared_reddit_client",
+        lambda: SimpleNamespace(get_subreddit=get_subreddit),
+    )
+    monkeypatch.setattr(agent_scraper, "embeddings_prefilter_batch", prefilter)
+    monkeypatch.setattr(agent_scraper, "process_posts_in_batches", process)
+    db = FakeDbManager()
+    asyncio.run(
+        agent_scraper.process_subreddit_group(["python"], {"python": ICPS}, db, {}, 1800, NOW)
+    )
+
+    assert fetched == ["python"]
+    assert len(listing.requests) == 1
+    assert prefiltered == [(["p0", "p1", "p2"], [1, 2])]
+    assert processed == {1: ["p0", "p1", "p2"], 2: ["p0", "p1", "p2"]}
+    assert sorted(db.lookups) == [1, 2]
+    assert [watermark.fullname for watermark in db.saved_watermarks] == ["t3_p0"]
@@ -0,0 +1,113 @@
+import asyncio
+import numpy as np
+from src.embeddings import icp_index
+from src.embeddings.icp_index import IcpVectorIndex
+from src.models.db_models import ICPDataModel, ICPModel
+
+
+def unit_rows(rng, n, dim=32, centers=None):
+    if centers is None:
+        vectors = rng.normal(size=(n, dim))
+    else:
+        vectors = centers[rng.integers(len(centers), size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def build_index(seed=0, n=200):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, 32))
+    vectors = unit_rows(rng, n, centers=centers)
+    index = IcpVectorIndex()
+    index.upsert({icp_id: vector for icp_id, vector in enumerate(vectors)})
+    return index, vectors, unit_rows(rng, 50, centers=centers)
+
+
+def test_pruned_search_matches_brute_force_above_threshold():
+    index, vectors, queries = build_index()
+    threshold = 0.5
+    exact = queries @ vectors.T
+    pruned = index.search(queries, threshold, list(range(len(vectors))))
+
+    above = exact >= threshold
+    assert above.any()
+    np.testing.assert_allclose(pruned[above], exact[above], rtol=1e-5, atol=1e-6)
+    assert index.recall_check(queries, threshold) == 1.0
+
+
+def test_pruned_pairs_read_well_below_the_threshold():
+    index, vectors, queries = build_index(seed=1)
+    exact = queries @ vectors.T
+    result = index.search(queries, 0.6, list(range(len(vectors))))
+    pruned = result == icp_index.PRUNED_SIMILARITY
+    assert pruned.any()
+    assert (exact[pruned] < 0.6).all()
+    np.testing.assert_allclose(result[~pruned], exact[~pruned], rtol=1e-5, atol=1e-6)
+
+
+def test_recall_stays_exact_after_upserts_and_removals():
+    index, vectors, queries = build_index(seed=2)
+    rng = np.random.default_rng(3)
+    index.upsert({icp_id: unit_rows(rng, 1)[0] for icp_id in range(10)})
+    index.retain(range(10, 200))
+    assert index.recall_check(queries, 0.4) == 1.0
+
+
+class FakeBackend:
+    model = "test-model"
+    post_cache = None
+
+    def __init__(self, targets, posts):
+        self.targets = targets
+        self.posts = posts
+
+    async def embed_targets(self, descriptions, owners):
+        return self.targets
+
+    async def embed_texts(self, texts, cache=None):
+        return self.posts
+
+
+def test_similarity_matrix_checks_recall_after_rebuild(monkeypatch):
+    _, vectors, queries = build_index(seed=4)
+    icps = [
+        ICPModel(id=i, userId="u", name=f"icp{i}", data=ICPDataModel(description=f"d{i}"))
+        for i in range(len(vectors))
+    ]
+    checked = []
+    original = icp_index.check_recall
+
+    def record(index, posts, min_similarity, icp_ids):
+        checked.append(len(posts))
+        return original(index, posts, min_similarity, icp_ids)
+
+    monkeypatch.setattr(icp_index, "_icp_indexes", {})
+    monkeypatch.setattr(icp_index, "check_recall", record)
+    backend = FakeBackend(vectors, queries)
+    texts = ["post"] * len(queries)
+
+    first = asyncio.run(icp_index.icp_similarity_matrix(backend, texts, icps, 50))
+    second = asyncio.run(icp_index.icp_similarity_matrix(backend, texts, icps, 50))
+    assert checked == [len(queries)]
+    assert not icp_index.get_icp_index("test-model").recall_pending
+    np.testing.assert_allclose(first, second)
+
+
+def test_similarity_matrix_uses_brute_force_until_recall_is_exact(monkeypatch):
+    _, vectors, queries = build_index(seed=5)
+    icps = [
+        ICPModel(id=i, userId="u", name=f"icp{i}", data=ICPDataModel(description=f"d{i}"))
+        for i in range(len(vectors))
+    ]
+    recalls = [0.9, 1.0]
+    monkeypatch.setattr(icp_index, "_icp_indexes", {})
+    monkeypatch.setattr(icp_index, "check_recall", lambda *args: recalls.pop(0))
+    backend = FakeBackend(vectors, queries)
+    texts = ["post"] * len(queries)
+
+    first = asyncio.run(icp_index.icp_similarity_matrix(backend, texts, icps, 50))
+    np.testing.assert_allclose(first, queries @ vectors.T * 100, rtol=1e-5)
+    assert icp_index.get_icp_index("test-model").recall_pending
+
+    second = asyncio.run(icp_index.icp_similarity_matrix(backend, texts, icps, 50))
+    assert not icp_index.get_icp_index("test-model").recall_pending
+    assert (second == icp_index.PRUNED_SIMILARITY * 100).any()
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+from src.lead_scoring import lead_scoring_service
+from src.lead_scoring.lead_scoring_service import (
+    PostToScore,
+    score_lead_intent_initial_batch,
+    score_lead_intent_two_stage_batch,
+)
+from src.models.agent_models import BatchLeadIntentItem, BatchLeadIntentResponse
+from tests.fakes import make_result
+
+POSTS = [PostToScore(f"p{i}", f"Title {i}", f"Content {i}") for i in range(4)]
+
+
+class FakeAgents:
+    """Stands in for run_agent: answers batch prompts with the scores in
+    ``batch_scores`` (missing ids are left out) and single prompts with
+    ``single_score``."""
+
+    def __init__(self, batch_scores=None, single_score=60, batch_fails=False):
+        self.batch_scores = batch_scores or {}
+        self.single_score = single_score
+        self.batch_fails = batch_fails
+        self.batch_calls = 0
+        self.single_calls = []
+
+    async def run_agent(self, agent_func, prompt, operation_name, **kwargs):
+        if operation_name.startswith("Batch"):
+            self.batch_calls += 1
+            if self.batch_fails:
+                return None
+            items = [
+                BatchLeadIntentItem(
+                    submission_id=submission_id,
+                    **make_result(score).model_dump(),
+                )
+                for submission_id, score in self.batch_scores.items()
+            ]
+            return SimpleNamespace(output=BatchLeadIntentResponse(results=items))
+        self.single_calls.append(operation_name)
+        return SimpleNamespace(output=make_result(self.single_score))
+
+
+def install(monkeypatch, agents):
+    monkeypatch.setattr(lead_scoring_service, "run_agent", agents.run_agent)
+    monkeypatch.setattr(lead_scoring_service, "get_score_cache", lambda: None)
+
+
+def score_batch(posts=POSTS):
+    return asyncio.run(score_lead_intent_initial_batch(posts, "Agencies", "late payments"))
+
+
+def test_batch_results_are_used_as_returned(monkeypatch):
+    agents = FakeAgents(batch_scores={post.submission_id: 70 for post in POSTS})
+    install(monkeypatch, agents)
+    results = score_batch()
+    assert {submission_id: result.final_score for submission_id, result in results.items()} == {
+        post.submission_id: 70 for post in POSTS
+    }
+    assert agents.batch_calls == 1
+    assert agents.single_calls == []
+
+
+def test_posts_missing_from_the_batch_are_scored_alone(monkeypatch):
+    agents = FakeAgents(batch_scores={"p0": 70, "p1": 70, "unknown": 90})
+    install(monkeypatch, agents)
+    results = score_batch()
+    assert set(results) == {"p0", "p1", "p2", "p3"}
+    assert results["p2"].final_score == 60
+    assert len(agents.single_calls) == 2
+
+
+def test_failed_batch_falls_back_to_single_calls(monkeypatch):
+    agents = FakeAgents(batch_fails=True)
+    install(monkeypatch, agents)
+    results = score_batch()
+    assert len(results) == len(POSTS)
+    assert len(agents.single_calls) == len(POSTS)
+
+
+def test_single_post_skips_the_batch_prompt(monkeypatch):
+    agents = FakeAgents()
+    install(monkeypatch, agents)
+    results = score_batch(POSTS[:1])
+    assert results["p0"].final_score == 60
+    assert agents.batch_calls == 0
+
+
+def test_two_stage_batch_runs_the_strong_model_only_for_passing_posts(monkeypatch):
+    agents = FakeAgents(batch_scores={"p0": 80, "p1": 20, "p2": 80, "p3": 20}, single_score=90)
+    install(monkeypatch, agents)
+    results = asyncio.run(
+        score_lead_intent_two_stage_batch(
+            POSTS, "Agencies", "late payments", weak_agent_threshold=35
+        )
+    )
+    assert results["p1"] is None and results["p3"] is None
+    assert results["p0"].final_score == 90 and results["p2"].final_score == 90
+    assert agents.single_calls == ["Detailed lead scoring"] * 2
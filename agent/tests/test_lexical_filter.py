@@ -0,0 +1,37 @@
+from src.lead_scoring.lexical_filter import LexicalDecision, LexicalMatcher
+
+MATCHER = LexicalMatcher(
+    ["cold email", "outreach", "crm"],
+    "Founders struggle with invoicing clients and chasing late payments",
+)
+
+
+def test_keyword_hits_fast_track():
+    decision, lexical_match = MATCHER.decide(
+        "Best CRM for cold email outreach?", fast_track_hits=2, min_terms=3
+    )
+    assert decision == LexicalDecision.FAST_TRACK
+    assert lexical_match.keyword_hits == 3
+
+
+def test_pain_terms_match_inflections():
+    lexical_match = MATCHER.match("I keep chasing invoices every month")
+    assert lexical_match.pain_hits == 2
+
+
+def test_zero_overlap_is_undecided_by_default():
+    decision, _ = MATCHER.decide("Looking for a hiking buddy", fast_track_hits=2, min_terms=3)
+    assert decision == LexicalDecision.UNDECIDED
+
+
+def test_zero_overlap_rejects_only_when_enabled():
+    decision, _ = MATCHER.decide(
+        "Looking for a hiking buddy", fast_track_hits=2, min_terms=3, reject=True
+    )
+    assert decision == LexicalDecision.REJECT
+
+
+def test_small_icps_never_reject():
+    matcher = LexicalMatcher(["crm"], None)
+    decision, _ = matcher.decide("Looking for a hiking buddy", 2, min_terms=3, reject=True)
+    assert decision == LexicalDecision.UNDECIDED
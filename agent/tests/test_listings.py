@@ -0,0 +1,132 @@
+import asyncio
+from src.models.db_models import SubredditWatermark
+from src.reddit.listings import (
+    LISTING_DELAY_MARGIN,
+    MAX_PAGE_SIZE,
+    advance_watermark,
+    fetch_new_posts,
+    group_subreddits,
+    is_past_watermark,
+    listing_horizon,
+    newest_watermark,
+)
+from tests.fakes import FakeListing, make_post
+
+NOW = 1_700_000_000.0
+
+
+def watermark(subreddit="python", created_utc=NOW - 300, checked_at=NOW - 240, **kwargs):
+    return SubredditWatermark(
+        subreddit=subreddit,
+        fullname=f"t3_{subreddit}_newest",
+        created_utc=created_utc,
+        checked_at=checked_at,
+        **kwargs,
+    )
+
+
+def fetch(posts, watermarks, page_size=MAX_PAGE_SIZE):
+    listing = FakeListing(posts)
+    fetched = asyncio.run(fetch_new_posts(listing, watermarks, page_size=page_size))
+    return [post.id for post in fetched], listing
+
+
+def test_horizon_reaches_back_the_margin_before_the_newest_post():
+    mark = watermark()
+    assert listing_horizon(mark) == mark.created_utc - LISTING_DELAY_MARGIN
+
+
+def test_quiet_subreddit_horizon_is_bounded_by_the_last_poll():
+    mark = watermark(created_utc=NOW - 30 * 86400, checked_at=NOW - 300)
+    assert listing_horizon(mark) == NOW - 300 - 2 * LISTING_DELAY_MARGIN
+
+
+def test_late_surfacing_post_older_than_watermark_is_listed():
+    mark = watermark()
+    posts = [
+        make_post("fresh", NOW - 10),
+        make_post("python_newest", mark.created_utc),
+        # Created a minute before the watermark post, surfaced after the poll.
+        make_post("late", mark.created_utc - 60),
+        make_post("old", mark.created_utc - LISTING_DELAY_MARGIN - 1),
+    ]
+    ids, _ = fetch(posts, {"python": mark})
+    assert ids == ["fresh", "late"]
+    assert not is_past_watermark(posts[2], mark)
+    assert is_past_watermark(posts[3], mark)
+
+
+def test_deleted_watermark_post_still_stops_the_listing():
+    mark = watermark()
+    posts = [make_post(f"p{i}", NOW - 10 - i * 60) for i in range(50)]
+    ids, listing = fetch(posts, {"python": mark}, page_size=10)
+    assert ids == [post.id for post in posts if post.created_utc >= listing_horizon(mark)]
+    assert len(listing.requests) < 5
+
+
+def test_busy_subreddit_is_read_past_the_first_page():
+    mark = watermark(created_utc=NOW - 3600, checked_at=NOW - 3600)
+    posts = [make_post(f"p{i}", NOW - i * 10) for i in range(250)]
+    ids, listing = fetch(posts, {"python": mark}, page_size=20)
+    assert len(ids) == sum(1 for post in posts if post.created_utc >= listing_horizon(mark))
+    assert len(listing.requests) > 1
+    assert listing.requests[1][0] == MAX_PAGE_SIZE
+
+
+def test_combined_listing_stops_each_member_at_its_own_horizon():
+    busy = watermark("busy", created_utc=NOW - 1200, checked_at=NOW - 1200)
+    quiet = watermark("quiet", created_utc=NOW - 60, checked_at=NOW - 60)
+    posts = [make_post(f"b{i}", NOW - i * 100, subreddit="busy") for i in range(30)]
+    posts += [make_post(f"q{i}", NOW - 30 - i * 400, subreddit="quiet") for i in range(5)]
+    ids, _ = fetch(posts, {"busy": busy, "quiet": quiet})
+    expected = [
+        post.id
+        for post in sorted(posts, key=lambda post: post.created_utc, reverse=True)
+        if post.created_utc
+        >= listing_horizon(busy if post.subreddit.display_name == "busy" else quiet)
+    ]
+    assert ids == expected
+
+
+def test_without_watermarks_one_page_is_listed():
+    posts = [make_post(f"p{i}", NOW - i) for i in range(30)]
+    ids, listing = fetch(posts, {}, page_size=10)
+    assert len(ids) == 10
+    assert len(listing.requests) == 1
+
+
+def test_late_posts_do_not_move_the_watermark_back():
+    mark = watermark()
+    late = make_post("late", mark.created_utc - 60)
+    assert newest_watermark("python", [late], mark) == mark
+
+
+def test_relisted_margin_posts_are_not_counted_as_arrivals():
+    mark = watermark(posts_per_hour=0.0, checked_at=NOW - 3600)
+    overlap = [make_post(f"o{i}", mark.created_utc - i - 1) for i in range(20)]
+    fresh = [make_post("new", NOW - 5)]
+    advanced = advance_watermark("python", overlap + fresh, mark, now=NOW)
+    assert advanced.fullname == "t3_new"
+    assert advanced.checked_at == NOW
+    assert round(advanced.posts_per_hour, 6) == round(0.3 * 1.0, 6)
+
+
+def test_empty_subreddit_watermark_starts_now():
+    advanced = advance_watermark("python", [], None, now=NOW)
+    assert advanced.created_utc == NOW
+    assert advanced.fullname == ""
+
+
+def test_busy_subreddits_get_their_own_group():
+    marks = {
+        "busy": watermark("busy", posts_per_hour=200.0),
+        "quiet1": watermark("quiet1", posts_per_hour=1.0),
+        "quiet2": watermark("quiet2", posts_per_hour=1.0),
+    }
+    groups = group_subreddits(["quiet1", "busy", "quiet2", "new"], marks, 1800)
+    assert ["new"] in groups
+    assert ["busy"] in groups
+    assert sorted(next(group for group in groups if "quiet1" in group)) == [
+        "quiet1",
+        "quiet2",
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+from pydantic_ai.exceptions import ModelHTTPError
+from src.agent import agent_services
+from src.agent.agent_services import LLMRateLimiter, run_agent
+
+
+def test_in_flight_requests_are_capped():
+    async def run():
+        limiter = LLMRateLimiter(max_in_flight=2, tokens_per_minute=0)
+        running = 0
+        peak = 0
+
+        async def call():
+            nonlocal running, peak
+            reservation = await limiter.acquire(10)
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            limiter.release(reservation)
+
+        await asyncio.gather(*[call() for _ in range(6)])
+        return peak
+
+    assert asyncio.run(run()) == 2
+
+
+def test_token_budget_waits_for_the_window(monkeypatch):
+    monkeypatch.setattr(agent_services, "TOKEN_WINDOW_SECONDS", 0.1)
+
+    async def run():
+        limiter = LLMRateLimiter(max_in_flight=10, tokens_per_minute=100)
+        loop = asyncio.get_running_loop()
+        limiter.release(await limiter.acquire(80))
+        started = loop.time()
+        limiter.release(await limiter.acquire(80))
+        return loop.time() - started
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_reported_usage_replaces_the_estimate():
+    async def run():
+        limiter = LLMRateLimiter(max_in_flight=10, tokens_per_minute=100)
+        limiter.release(await limiter.acquire(90), used_tokens=30)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        limiter.release(await limiter.acquire(60))
+        return loop.time() - started, limiter._tokens_in_window
+
+    waited, tokens = asyncio.run(run())
+    assert waited < 0.05
+    assert tokens == 90
+
+
+def test_back_off_holds_every_caller():
+    async def run():
+        limiter = LLMRateLimiter(max_in_flight=10, tokens_per_minute=0)
+        limiter.back_off(0.1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        limiter.release(await limiter.acquire(1))
+        return loop.time() - started
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_rate_limited_calls_back_off_without_using_a_retry(monkeypatch):
+    monkeypatch.setenv("LLM_RATE_LIMIT_BACKOFF", "0.01")
+    monkeypatch.setattr(agent_services, "_llm_limiters", {})
+    calls = []
+
+    async def agent(prompt):
+        calls.append(prompt)
+        if len(calls) <= 2:
+            raise ModelHTTPError(429, "test-model")
+        return SimpleNamespace(usage=lambda: SimpleNamespace(input_tokens=1, output_tokens=1))
+
+    result = asyncio.run(run_agent(agent, "prompt", "Test call", timeout=1.0))
+    assert result is not None
+    assert len(calls) == 3
+
+
+def test_errors_return_the_default_after_one_retry(monkeypatch):
+    monkeypatch.setattr(agent_services, "_llm_limiters", {})
+    calls = []
+
+    async def agent(prompt):
+        calls.append(prompt)
+        raise RuntimeError("boom")
+
+    assert asyncio.run(run_agent(agent, "prompt", "Test call", default_return="x")) == "x"
+    assert len(calls) == 2
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+from src.embeddings.embedding_backend import HashedNgramEmbeddingBackend
+from src.embeddings.embedding_cache import EmbeddingCache
+
+TEXTS = [
+    "Looking for a CRM to manage cold email outreach",
+    "Best CRM for cold outreach campaigns?",
+    "My sourdough starter smells like acetone",
+]
+
+
+def backend(dim=256):
+    return HashedNgramEmbeddingBackend(
+        dim=dim, cache=EmbeddingCache(), post_cache=EmbeddingCache()
+    )
+
+
+def test_embeddings_are_deterministic_across_processes():
+    script = (
+        "import json; from src.embeddings.embedding_backend import HashedNgramEmbeddingBackend; "
+        "from src.embeddings.embedding_cache import EmbeddingCache; "
+        "backend = HashedNgramEmbeddingBackend(256, cache=EmbeddingCache(), post_cache=EmbeddingCache()); "
+        f"print(json.dumps(backend.embed_one({TEXTS[0]!r}).tolist()))"
+    )
+    # A different hash seed would change any hash()-based feature index.
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+        env={**os.environ, "PYTHONHASHSEED": "123"},
+    ).stdout
+    np.testing.assert_array_equal(
+        np.array(json.loads(output), dtype=np.float32), backend().embed_one(TEXTS[0])
+    )
+
+
+def test_embedded_rows_are_unit_length():
+    vectors = asyncio.run(backend().embed_texts(TEXTS))
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+
+
+def test_text_without_tokens_embeds_to_a_zero_vector():
+    vectors = asyncio.run(backend().embed_texts(["!!!", TEXTS[0]]))
+    assert not vectors[0].any()
+    assert np.isfinite(vectors).all()
+
+
+def test_similarity_ranks_lexical_overlap_first():
+    scores = asyncio.run(backend().similarity_matrix(TEXTS[1:], TEXTS[:1]))
+    assert scores.shape == (2, 1)
+    assert scores[0, 0] > scores[1, 0]
+    assert scores.max() <= 100.0 + 1e-3
@@ -0,0 +1,66 @@
+from src.lead_scoring.near_duplicates import (
+    NearDuplicateIndex,
+    hamming_distance,
+    icp_version,
+    simhash,
+)
+from tests.fakes import make_result
+
+POST = (
+    "We are a small agency and keep losing track of invoices. Chasing late "
+    "payments from clients eats half of my week. What tools do you use to "
+    "automate reminders and reconcile payments?"
+)
+REPOST = POST + " Thanks!"
+UNRELATED = (
+    "Planning a two week hiking trip through the Alps next summer and looking "
+    "for advice on huts, trail conditions and how much gear to carry along."
+)
+VERSION = icp_version("Agencies", "late payments")
+
+
+def test_simhash_keeps_reposts_close_and_unrelated_posts_apart():
+    assert hamming_distance(simhash(POST), simhash(REPOST)) <= 6
+    assert hamming_distance(simhash(POST), simhash(UNRELATED)) > 6
+
+
+def test_simhash_skips_short_texts():
+    assert simhash("Need a CRM") is None
+
+
+def test_repost_reuses_the_earlier_result():
+    index = NearDuplicateIndex()
+    result = make_result(90)
+    index.add(1, VERSION, simhash(POST), "abc", result)
+
+    duplicate = index.find(1, VERSION, simhash(REPOST), "def")
+    assert duplicate.submission_id == "abc"
+    assert duplicate.result == result
+    assert index.find(1, VERSION, simhash(UNRELATED), "ghi") is None
+    assert index.find(2, VERSION, simhash(REPOST), "def") is None
+    assert index.find(1, VERSION, simhash(POST), "abc") is None
+
+
+def test_icp_edit_drops_its_entries():
+    index = NearDuplicateIndex()
+    index.add(1, VERSION, simhash(POST), "abc", make_result())
+    index.add(2, VERSION, simhash(POST), "abc", make_result())
+
+    edited = icp_version("Agencies", "late payments and churn")
+    assert index.find(1, edited, simhash(REPOST), "def") is None
+    assert len(index) == 1
+    assert index.find(2, VERSION, simhash(REPOST), "def") is not None
+
+
+def test_oldest_entries_are_evicted():
+    index = NearDuplicateIndex(max_entries=1)
+    index.add(1, VERSION, simhash(POST), "abc", make_result())
+    index.add(1, VERSION, simhash(UNRELATED), "xyz", make_result())
+    assert len(index) == 1
+    assert index.find(1, VERSION, simhash(REPOST), "def") is None
+
+
+def test_expired_entries_are_not_reused():
+    index = NearDuplicateIndex(ttl=0)
+    index.add(1, VERSION, simhash(POST), "abc", make_result())
+    assert index.find(1, VERSION, simhash(REPOST), "def") is None
@@ -0,0 +1,80 @@
+import pytest
+from src.models.db_models import SubredditWatermark
+from src.reddit.polling import (
+    budgeted_poll_intervals,
+    estimated_requests_per_hour,
+    poll_interval,
+    select_due_subreddits,
+)
+
+NOW = 1_700_000_000.0
+CONFIG = {
+    "target_posts_per_poll": 20,
+    "min_poll_interval": 300,
+    "max_poll_interval": 6 * 3600,
+    "poll_requests_per_hour": 1800,
+    "poll_tick_interval": 300,
+}
+
+
+def watermark(name="python", posts_per_hour=10.0, lead_yield=0.0, checked_at=NOW - 60):
+    return SubredditWatermark(
+        subreddit=name,
+        fullname=f"t3_{name}",
+        created_utc=NOW - 120,
+        posts_per_hour=posts_per_hour,
+        lead_yield=lead_yield,
+        checked_at=checked_at,
+    )
+
+
+def test_unpolled_subreddits_use_the_minimum_interval():
+    assert poll_interval(None, CONFIG) == 300
+    assert poll_interval(watermark(checked_at=None), CONFIG) == 300
+
+
+def test_interval_targets_posts_per_poll():
+    assert poll_interval(watermark(posts_per_hour=10.0), CONFIG) == 2 * 3600
+
+
+def test_interval_is_clamped():
+    assert poll_interval(watermark(posts_per_hour=1000.0), CONFIG) == 300
+    assert poll_interval(watermark(posts_per_hour=0.0), CONFIG) == 6 * 3600
+
+
+def test_lead_yield_shortens_the_interval_up_to_a_limit():
+    base = poll_interval(watermark(), CONFIG)
+    assert poll_interval(watermark(lead_yield=0.02), CONFIG) == base / 2
+    assert poll_interval(watermark(lead_yield=1.0), CONFIG) == base / 4
+
+
+def test_intervals_stretch_to_fit_the_request_budget():
+    # Quiet subreddits polled often: each poll is a small share of a
+    # combined listing, so stretching the interval saves requests.
+    names = [f"r{i}" for i in range(100)]
+    marks = {name: watermark(name, posts_per_hour=1.0) for name in names}
+    config = dict(CONFIG, target_posts_per_poll=0.1, poll_requests_per_hour=5)
+    unbudgeted = {name: poll_interval(marks[name], config) for name in names}
+    assert estimated_requests_per_hour(unbudgeted, marks) > 5
+
+    intervals = budgeted_poll_intervals(names, marks, config)
+    assert all(intervals[name] > unbudgeted[name] for name in names)
+    assert estimated_requests_per_hour(intervals, marks) <= 5 * 1.001
+
+
+def test_busy_subreddits_cannot_be_stretched_below_their_post_rate():
+    names = [f"r{i}" for i in range(10)]
+    marks = {name: watermark(name, posts_per_hour=800.0) for name in names}
+    config = dict(CONFIG, poll_requests_per_hour=50)
+    intervals = budgeted_poll_intervals(names, marks, config)
+    # Every listed post has to be paged through, whatever the interval.
+    assert estimated_requests_per_hour(intervals, marks) == pytest.approx(10 * 800 / 80)
+
+
+def test_due_subreddits():
+    marks = {
+        "fresh": watermark("fresh", posts_per_hour=10.0, checked_at=NOW - 60),
+        "stale": watermark("stale", posts_per_hour=10.0, checked_at=NOW - 3 * 3600),
+    }
+    due = select_due_subreddits(["fresh", "stale", "new"], marks, CONFIG, NOW)
+    assert due == ["stale", "new"]
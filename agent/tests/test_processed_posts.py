@@ -0,0 +1,56 @@
+import asyncio
+from src import agent_scraper
+from src.db.async_db import AsyncScraperDatabaseManager
+from src.db.db import get_pool_config
+from src.models.db_models import ICPModel
+from tests.fakes import FakePool, make_post
+
+ICP = ICPModel(id=7, userId="alice", name="Devs")
+
+
+class FakeProcessedConnection:
+    """Answers the ProcessedPost lookup from ``processed`` and records queries."""
+
+    def __init__(self, processed=(), fails=False):
+        self.processed = set(processed)
+        self.fails = fails
+        self.queries = []
+
+    async def fetch(self, query, icp_id, submission_ids):
+        self.queries.append((icp_id, submission_ids))
+        if self.fails:
+            raise ConnectionError("connection lost")
+        return [
+            {"submissionId": submission_id}
+            for submission_id in submission_ids
+            if submission_id in self.processed
+        ]
+
+
+def db_manager_with(conn) -> AsyncScraperDatabaseManager:
+    manager = AsyncScraperDatabaseManager.__new__(AsyncScraperDatabaseManager)
+    manager.pool_config = get_pool_config()
+    manager._pool = FakePool(conn)
+    return manager
+
+
+def test_processed_posts_are_looked_up_in_one_query():
+    conn = FakeProcessedConnection(processed={"b", "d"})
+    manager = db_manager_with(conn)
+    posts = [make_post(post_id, 1.0) for post_id in "abcde"]
+
+    unprocessed = asyncio.run(agent_scraper.filter_unprocessed_posts(posts, ICP, manager))
+    assert [post.id for post in unprocessed] == ["a", "c", "e"]
+    assert conn.queries == [(7, ["a", "b", "c", "d", "e"])]
+
+
+def test_empty_listing_skips_the_query():
+    conn = FakeProcessedConnection()
+    manager = db_manager_with(conn)
+    assert asyncio.run(manager.get_unprocessed_submission_ids(7, [])) == set()
+    assert conn.queries == []
+
+
+def test_lookup_errors_leave_every_post_to_the_claim():
+    manager = db_manager_with(FakeProcessedConnection(fails=True))
+    assert asyncio.run(manager.get_unprocessed_submission_ids(7, ["a", "b"])) == {"a", "b"}
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from src.embeddings.quantization import QuantizedVectors, normalize
+
+
+def unit_vectors(n, dim=64, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(n, dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("precision,tolerance", [("float32", 1e-6), ("float16", 1e-3), ("int8", 2e-2)])
+def test_rows_round_trip_within_precision(precision, tolerance):
+    slab = QuantizedVectors(precision, initial_capacity=2)
+    vectors = unit_vectors(5)
+    rows = [slab.add(vector) for vector in vectors]
+    np.testing.assert_allclose(slab.get_rows(rows), vectors, atol=tolerance)
+    np.testing.assert_allclose(slab.get(rows[3]), vectors[3], atol=tolerance)
+
+
+def test_int8_preserves_similarity_ranking():
+    slab = QuantizedVectors("int8")
+    vectors = unit_vectors(50, seed=1)
+    rows = [slab.add(vector) for vector in vectors]
+    query = vectors[0]
+    exact = vectors @ query
+    approx = slab.get_rows(rows) @ query
+    assert np.argmax(approx) == np.argmax(exact)
+    assert np.max(np.abs(approx - exact)) < 0.02
+
+
+def test_released_rows_are_reused():
+    slab = QuantizedVectors("float32")
+    first = slab.add(unit_vectors(1)[0])
+    slab.add(unit_vectors(1, seed=1)[0])
+    slab.release(first)
+    assert slab.add(unit_vectors(1, seed=2)[0]) == first
+
+
+def test_vectors_are_stored_normalized():
+    slab = QuantizedVectors("float32")
+    row = slab.add([3.0, 4.0])
+    np.testing.assert_allclose(slab.get(row), normalize([3.0, 4.0]))
+
+
+def test_dimension_mismatch_is_rejected():
+    slab = QuantizedVectors("float32")
+    slab.add([1.0, 0.0])
+    with pytest.raises(ValueError):
+        slab.add([1.0, 0.0, 0.0])
+
+
+def test_int8_rows_are_a_quarter_of_float32():
+    slab = QuantizedVectors("int8")
+    slab.add(unit_vectors(1)[0])
+    assert slab.bytes_per_vector == 64 + 4
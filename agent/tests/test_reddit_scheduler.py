@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from asyncprawcore import Requestor
+from src.reddit import client
+from src.reddit.client import (
+    RedditPriority,
+    RedditRequestScheduler,
+    ScheduledRequestor,
+    reddit_request_priority,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(client.time, "monotonic", fake)
+    return fake
+
+
+def test_tokens_refill_at_the_configured_rate_up_to_the_burst(clock):
+    scheduler = RedditRequestScheduler(requests_per_minute=60, burst=5)
+    scheduler.tokens = 0
+    clock.now += 2.5
+    scheduler._refill(clock.now)
+    assert scheduler.tokens == pytest.approx(2.5)
+    clock.now += 60
+    scheduler._refill(clock.now)
+    assert scheduler.tokens == 5
+
+
+def test_ratelimit_headers_spread_the_remaining_allowance_over_the_window(clock):
+    scheduler = RedditRequestScheduler(requests_per_minute=600, burst=10)
+    scheduler.update(200, {"x-ratelimit-remaining": "30", "x-ratelimit-reset": "300"})
+    assert scheduler.rate == pytest.approx(0.1)
+    assert scheduler.paused_until == 0.0
+
+    scheduler.update(200, {"x-ratelimit-remaining": "2", "x-ratelimit-reset": "1"})
+    assert scheduler.tokens <= 2
+    assert scheduler.rate == pytest.approx(2)
+
+    scheduler.update(200, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "40"})
+    assert scheduler.tokens == 0
+    assert scheduler.paused_until == clock.now + 40
+
+
+def test_pacing_never_exceeds_the_configured_rate(clock):
+    scheduler = RedditRequestScheduler(requests_per_minute=60, burst=10)
+    scheduler.update(200, {"x-ratelimit-remaining": "600", "x-ratelimit-reset": "60"})
+    assert scheduler.rate == pytest.approx(1)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = RedditRequestScheduler(requests_per_minute=6000, burst=1)
+    monkeypatch.setattr(client, "_request_scheduler", scheduler)
+    return scheduler
+
+
+def fake_requestor(monkeypatch, responses):
+    calls = []
+
+    async def request(self, *args, **kwargs):
+        calls.append(args)
+        return responses.pop(0)
+
+    monkeypatch.setattr(Requestor, "request", request)
+    return ScheduledRequestor.__new__(ScheduledRequestor), calls
+
+
+def test_a_429_empties_the_bucket_and_pauses_until_retry_after(monkeypatch, scheduler):
+    requestor, calls = fake_requestor(
+        monkeypatch, [SimpleNamespace(status=429, headers={"retry-after": "30"})]
+    )
+    before = client.time.monotonic()
+    response = asyncio.run(requestor.request("GET", "/r/python/new"))
+
+    assert response.status == 429
+    assert calls == [("GET", "/r/python/new")]
+    assert scheduler.tokens == 0
+    assert scheduler.paused_until >= before + 30
+
+
+def test_waiting_requests_are_granted_by_priority_then_fifo(scheduler):
+    scheduler.tokens = 0
+    granted = []
+
+    async def request(name, priority=None):
+        await scheduler.acquire(priority)
+        granted.append(name)
+
+    async def run():
+        with reddit_request_priority(RedditPriority.LOW):
+            backfill = asyncio.create_task(request("backfill"))
+        await asyncio.gather(
+            backfill,
+            request("poll-1"),
+            request("poll-2"),
+            request("seed", RedditPriority.HIGH),
+        )
+
+    asyncio.run(run())
+    assert granted == ["seed", "poll-1", "poll-2", "backfill"]
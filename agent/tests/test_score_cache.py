@@ -0,0 +1,66 @@
+import asyncio
+from src.lead_scoring import score_cache
+from src.lead_scoring.score_cache import ScoreCache, score_cache_key
+from tests.fakes import make_result
+
+
+def accessed_at(cache, key):
+    return cache._conn.execute(
+        "SELECT accessed_at FROM scores WHERE key = ?", (key,)
+    ).fetchone()[0]
+
+
+def test_key_depends_on_every_input():
+    base = score_cache_key("initial", "model", "hash", {"title": "a"})
+    assert base == score_cache_key("initial", "model", "hash", {"title": "a"})
+    assert base != score_cache_key("detailed", "model", "hash", {"title": "a"})
+    assert base != score_cache_key("initial", "other", "hash", {"title": "a"})
+    assert base != score_cache_key("initial", "model", "changed", {"title": "a"})
+    assert base != score_cache_key("initial", "model", "hash", {"title": "b"})
+
+
+def test_async_round_trip(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite3"))
+
+    async def run():
+        assert await cache.aget("k", "initial") is None
+        await cache.aput("k", "initial", make_result(70))
+        return await cache.aget("k", "initial")
+
+    assert asyncio.run(run()).final_score == 70
+    assert cache.stats()["initial_hits"] == 1
+    assert cache.stats()["initial_misses"] == 1
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite3"), ttl=-1)
+    cache.put("k", "initial", make_result())
+    assert cache.get("k", "initial") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_hits_are_touched_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(score_cache, "TOUCH_BATCH_SIZE", 3)
+    cache = ScoreCache(str(tmp_path / "cache.sqlite3"))
+    for key in ("a", "b", "c"):
+        cache.put(key, "initial", make_result())
+    written = {key: accessed_at(cache, key) for key in ("a", "b", "c")}
+
+    cache.get("a", "initial")
+    cache.get("b", "initial")
+    assert accessed_at(cache, "a") == written["a"]
+    cache.get("c", "initial")
+    assert all(accessed_at(cache, key) >= written[key] for key in ("a", "b", "c"))
+    assert cache._touched == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ScoreCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put("old", "initial", make_result())
+    cache.put("used", "initial", make_result())
+    cache.get("used", "initial")
+    cache.put("new", "initial", make_result())
+
+    assert cache.get("old", "initial") is None
+    assert cache.get("used", "initial") is not None
+    assert cache.get("new", "initial") is not None
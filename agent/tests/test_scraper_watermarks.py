@@ -0,0 +1,183 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from src import agent_scraper
+from src.models.db_models import ICPModel, SubredditWatermark
+from tests.fakes import FakeListing, make_post
+
+NOW = 1_700_000_000.0
+ICP = ICPModel(id=1, userId="alice", name="Devs")
+
+
+class FakeDbManager:
+    def __init__(self, claim_fails=False):
+        self.claim_fails = claim_fails
+        self.claimed = set()
+        self.released = []
+        self.saved_watermarks = {}
+        self.leads = []
+
+    async def mark_posts_processed(self, icp_id, submission_ids):
+        if self.claim_fails:
+            return None
+        claimed = set(submission_ids) - self.claimed
+        self.claimed |= claimed
+        return claimed
+
+    async def release_processed_posts(self, icp_id, submission_ids):
+        self.released += submission_ids
+        self.claimed -= set(submission_ids)
+        return True
+
+    async def set_subreddit_watermarks(self, watermarks):
+        self.saved_watermarks.update(
+            (watermark.subreddit, watermark) for watermark in watermarks
+        )
+        return True
+
+    async def queue_lead(self, post_data, user_id):
+        self.leads.append((post_data["submission_id"], user_id))
+
+    async def flush_pending_leads(self):
+        return 0
+
+
+def passing(posts):
+    return {post.id: (True, 80.0) for post in posts}
+
+
+def test_scoring_failure_releases_claims_and_reports_it(monkeypatch):
+    async def failing_score_posts(batch, icp, similarities):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(agent_scraper, "score_posts", failing_score_posts)
+    db = FakeDbManager()
+    posts = [make_post("a", NOW), make_post("b", NOW)]
+    leads, ok = asyncio.run(
+        agent_scraper.process_posts_in_batches(posts, ICP, db, passing(posts))
+    )
+    assert (leads, ok) == (0, False)
+    assert sorted(db.released) == ["a", "b"]
+    assert db.claimed == set()
+
+
+def test_claim_failure_is_reported(monkeypatch):
+    db = FakeDbManager(claim_fails=True)
+    posts = [make_post("a", NOW)]
+    assert asyncio.run(
+        agent_scraper.process_posts_in_batches(posts, ICP, db, passing(posts))
+    ) == (0, False)
+
+
+def test_failed_subreddit_keeps_its_watermark(monkeypatch):
+    previous = {
+        name: SubredditWatermark(
+            subreddit=name,
+            fullname=f"t3_{name}0",
+            created_utc=NOW - 600,
+            checked_at=NOW - 600,
+        )
+        for name in ("good", "bad")
+    }
+    listing = FakeListing(
+        [make_post("g1", NOW - 10, subreddit="good"), make_post("b1", NOW - 20, subreddit="bad")]
+    )
+
+    async def get_subreddit(name):
+        return listing
+
+    async def dispatch(posts, icps, db_manager):
+        if posts[0].subreddit.display_name == "bad":
+            return 0, False
+        return 1, True
+
+    monkeypatch.setattr(
+        agent_scraper,
+        "get_shared_reddit_client",
+        lambda: SimpleNamespace(get_subreddit=get_subreddit),
+    )
+    monkeypatch.setattr(agent_scraper, "dispatch_posts_to_icps", dispatch)
+    db = FakeDbManager()
+    plan = {"good": [ICP], "bad": [ICP]}
+    asyncio.run(
+        agent_scraper.process_subreddit_group(
+            ["good", "bad"], plan, db, previous, 1800, NOW
+        )
+    )
+    assert list(db.saved_watermarks) == ["good"]
+    assert db.saved_watermarks["good"].fullname == "t3_g1"
+
+
+def test_dispatch_reports_prefilter_failure(monkeypatch):
+    async def unprocessed(posts, icp, db_manager):
+        return posts
+
+    async def failing_prefilter(posts, icps):
+        raise RuntimeError("embeddings down")
+
+    async def can_add(user_id):
+        return True
+
+    monkeypatch.setattr(agent_scraper, "filter_unprocessed_posts", unprocessed)
+    monkeypatch.setattr(agent_scraper, "embeddings_prefilter_batch", failing_prefilter)
+    db = FakeDbManager()
+    db.can_user_add_lead = can_add
+    result = asyncio.run(
+        agent_scraper.dispatch_posts_to_icps([make_post("a", NOW)], [ICP], db)
+    )
+    assert result == (0, False)
+
+
+class FakeStream:
+    """Multireddit whose submission stream yields ``posts`` then pauses."""
+
+    def __init__(self, posts):
+        self.posts = posts
+        self.stream = self
+
+    async def submissions(self, pause_after=None):
+        for post in self.posts:
+            yield post
+        yield None
+
+
+def test_stream_dispatches_micro_batches_and_advances_watermarks(monkeypatch):
+    now = time.time()
+    previous = SubredditWatermark(
+        subreddit="python", fullname="t3_old", created_utc=now - 3600, checked_at=now - 3600
+    )
+    posts = [make_post(f"p{i}", now - 50 + i) for i in range(5)]
+    posts.append(make_post("q1", now - 30, subreddit="quiet"))
+    dispatched = []
+
+    async def get_subreddit(name):
+        return FakeStream(posts)
+
+    async def dispatch(batch, icps, db_manager):
+        dispatched.append([post.id for post in batch])
+        if batch[0].subreddit.display_name == "quiet":
+            return 0, False
+        return 1, True
+
+    monkeypatch.setattr(
+        agent_scraper,
+        "get_shared_reddit_client",
+        lambda: SimpleNamespace(get_subreddit=get_subreddit),
+    )
+    monkeypatch.setattr(agent_scraper, "dispatch_posts_to_icps", dispatch)
+    db = FakeDbManager()
+    plan = {"python": [ICP], "quiet": [ICP]}
+    asyncio.run(
+        agent_scraper.stream_multireddit_posts(
+            ["python", "quiet"], plan, db, {"python": previous}, 60, 4, batch_size=2
+        )
+    )
+
+    assert dispatched == [["p0", "p1"], ["p2", "p3"], ["p4"], ["q1"]]
+    watermark = db.saved_watermarks["python"]
+    assert watermark.fullname == "t3_p4"
+    assert watermark.checked_at >= now
+    assert watermark.posts_per_hour > previous.posts_per_hour
+    assert watermark.lead_yield > 0
+    # The quiet subreddit failed before it had a watermark, so none is kept.
+    assert "quiet" not in db.saved_watermarks
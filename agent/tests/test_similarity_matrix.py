@@ -0,0 +1,77 @@
+import asyncio
+import numpy as np
+import pytest
+from src import agent_scraper
+from src.embeddings.embedding_backend import HashedNgramEmbeddingBackend
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.models.db_models import ICPDataModel, ICPModel
+from tests.fakes import make_post
+
+POSTS = [
+    "Looking for a CRM to manage cold email outreach",
+    "How do I chase a client for a late invoice?",
+    "My sourdough starter smells like acetone",
+    "Freelancers: what do you use for invoicing?",
+]
+ICP_DESCRIPTIONS = [
+    "Agencies doing cold outreach who need a better CRM",
+    "Freelancers struggling with invoicing and late payments",
+]
+
+
+class CountingBackend(HashedNgramEmbeddingBackend):
+    def __init__(self):
+        super().__init__(dim=512, cache=EmbeddingCache(), post_cache=EmbeddingCache())
+        self.embedded = []
+
+    async def get_embeddings(self, texts, model=None):
+        self.embedded.extend(texts)
+        return await super().get_embeddings(texts, model)
+
+
+def cosine(a, b):
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def test_batched_matmul_matches_per_pair_cosine():
+    backend = CountingBackend()
+    matrix = asyncio.run(backend.similarity_matrix(POSTS, ICP_DESCRIPTIONS))
+    expected = np.array(
+        [
+            [cosine(backend.embed_one(post), backend.embed_one(icp)) for icp in ICP_DESCRIPTIONS]
+            for post in POSTS
+        ]
+    )
+    assert matrix.shape == (len(POSTS), len(ICP_DESCRIPTIONS))
+    np.testing.assert_allclose(matrix, expected * 100, rtol=1e-5, atol=1e-4)
+
+
+def test_repeated_texts_are_embedded_once_and_served_from_the_cache():
+    backend = CountingBackend()
+    asyncio.run(backend.similarity_matrix(POSTS + POSTS[:1], ICP_DESCRIPTIONS))
+    asyncio.run(backend.similarity_matrix(POSTS, ICP_DESCRIPTIONS))
+    assert sorted(backend.embedded) == sorted(POSTS + ICP_DESCRIPTIONS)
+
+
+def prefilter_with(monkeypatch, backend, posts, icps):
+    monkeypatch.setattr(agent_scraper, "get_embedding_backend", lambda: backend)
+    monkeypatch.setattr(agent_scraper, "get_icp_thresholds", lambda *args: {})
+    return asyncio.run(agent_scraper.embeddings_prefilter_batch(posts, icps))
+
+
+def test_each_post_is_embedded_once_and_scored_against_every_icp(monkeypatch):
+    posts = [make_post(f"p{i}", 1.0, title=text) for i, text in enumerate(POSTS)]
+    icps = [
+        ICPModel(id=i, userId="u", name=f"ICP {i}", data=ICPDataModel(description=text))
+        for i, text in enumerate(ICP_DESCRIPTIONS)
+    ]
+    backend = CountingBackend()
+    together = prefilter_with(monkeypatch, backend, posts, icps)
+
+    assert sorted(backend.embedded) == sorted(POSTS + ICP_DESCRIPTIONS)
+    for icp in icps:
+        alone = prefilter_with(monkeypatch, CountingBackend(), posts, [icp])
+        assert together[icp.id].keys() == alone[icp.id].keys()
+        for post in posts:
+            assert together[icp.id][post.id][0] == alone[icp.id][post.id][0]
+            assert together[icp.id][post.id][1] == pytest.approx(alone[icp.id][post.id][1])
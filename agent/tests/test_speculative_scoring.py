@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from src import agent_scraper
+from src.lead_scoring import lead_scoring_service, scoreing
+from src.lead_scoring.lead_scoring_service import (
+    PostToScore,
+    score_lead_intent_two_stage,
+    score_lead_intent_two_stage_batch,
+)
+from src.models.db_models import ICPDataModel, ICPModel
+from tests.fakes import make_post, make_result
+
+POSTS = [PostToScore(f"p{i}", f"Title {i}", f"Content {i}") for i in range(3)]
+
+
+class FakeStrongModel:
+    """score_lead_intent_detailed that records calls and cancellations."""
+
+    def __init__(self):
+        self.started = []
+        self.cancelled = []
+
+    async def score(self, post_title, post_content, icp_description):
+        self.started.append(post_title)
+        try:
+            await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            self.cancelled.append(post_title)
+            raise
+        return make_result(90)
+
+
+@pytest.fixture
+def strong(monkeypatch):
+    strong = FakeStrongModel()
+    monkeypatch.setattr(lead_scoring_service, "score_lead_intent_detailed", strong.score)
+    return strong
+
+
+def weak_scores(monkeypatch, scores):
+    async def initial(post_title, *args):
+        await asyncio.sleep(0)
+        return make_result(scores[post_title])
+
+    async def initial_batch(posts, *args):
+        await asyncio.sleep(0)
+        return {post.submission_id: make_result(scores[post.post_title]) for post in posts}
+
+    monkeypatch.setattr(lead_scoring_service, "score_lead_intent_initial", initial)
+    monkeypatch.setattr(lead_scoring_service, "score_lead_intent_initial_batch", initial_batch)
+
+
+def test_speculative_call_is_cancelled_when_the_weak_model_rejects(monkeypatch, strong):
+    weak_scores(monkeypatch, {"Title 0": 10})
+    result = asyncio.run(
+        score_lead_intent_two_stage("Title 0", "Content 0", "Agencies", "", speculative=True)
+    )
+    assert result is None
+    assert strong.started == ["Title 0"]
+    assert strong.cancelled == ["Title 0"]
+
+
+def test_speculative_call_is_reused_when_the_weak_model_accepts(monkeypatch, strong):
+    weak_scores(monkeypatch, {"Title 0": 80})
+    result = asyncio.run(
+        score_lead_intent_two_stage("Title 0", "Content 0", "Agencies", "", speculative=True)
+    )
+    assert result.final_score == 90
+    assert strong.started == ["Title 0"]
+    assert strong.cancelled == []
+
+
+def test_batch_cancels_rejected_and_reuses_accepted_speculative_calls(monkeypatch, strong):
+    weak_scores(monkeypatch, {"Title 0": 80, "Title 1": 10, "Title 2": 80})
+    results = asyncio.run(
+        score_lead_intent_two_stage_batch(
+            POSTS, "Agencies", "", weak_agent_threshold=35, speculative_ids={"p0", "p1"}
+        )
+    )
+    assert results["p1"] is None
+    assert results["p0"].final_score == 90 and results["p2"].final_score == 90
+    assert sorted(strong.started) == ["Title 0", "Title 1", "Title 2"]
+    assert strong.cancelled == ["Title 1"]
+
+
+def test_lexically_fast_tracked_posts_qualify_for_speculation(monkeypatch):
+    class FakeBackend:
+        model = "test-model"
+        prefilter_threshold = 50.0
+
+    monkeypatch.setattr(agent_scraper, "get_embedding_backend", FakeBackend)
+    monkeypatch.setattr(agent_scraper, "get_icp_thresholds", lambda *args: {})
+    icp = ICPModel(
+        id=1,
+        userId="alice",
+        name="Outreach",
+        data=ICPDataModel(keywords=["cold email", "outreach", "crm"]),
+    )
+    posts = [make_post("a", 1.0, title="Best CRM for cold email outreach?")]
+
+    results = asyncio.run(agent_scraper.embeddings_prefilter_batch(posts, [icp]))
+    passes, similarity = results[1]["a"]
+    assert passes
+    config = {"speculative_min_similarity": 60.0}
+    assert scoreing._is_speculative(similarity, config)
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import numpy as np
+from src.embeddings import vector_store
+from src.embeddings.embedding_cache import EmbeddingCache
+from src.embeddings.vector_store import MemmapVectorStore
+
+
+def vector(i, dim=4):
+    return np.full(dim, i, dtype=np.float32)
+
+
+def test_vectors_survive_reopening(tmp_path):
+    store = MemmapVectorStore(str(tmp_path))
+    store.append("a", vector(1))
+    store.append("b", vector(2))
+    store.delete("a")
+
+    reopened = MemmapVectorStore(str(tmp_path))
+    assert "a" not in reopened
+    np.testing.assert_array_equal(reopened.get("b"), vector(2))
+
+
+def test_compaction_drops_deleted_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "COMPACT_MIN_ROWS", 8)
+    store = MemmapVectorStore(str(tmp_path))
+    for i in range(8):
+        store.append(f"k{i}", vector(i))
+    for i in range(4):
+        store.delete(f"k{i}")
+
+    assert store.generation == 1
+    assert store._rows == 4
+    assert not (tmp_path / "vectors.bin").exists()
+    reopened = MemmapVectorStore(str(tmp_path))
+    assert len(reopened) == 4
+    for i in range(4, 8):
+        np.testing.assert_array_equal(reopened.get(f"k{i}"), vector(i))
+
+
+def test_overwritten_rows_count_as_dead(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "COMPACT_MIN_ROWS", 4)
+    store = MemmapVectorStore(str(tmp_path))
+    store.append("a", vector(1))
+    store.append("b", vector(2))
+    store.append("a", vector(3))
+    store.append("a", vector(4))
+    assert store._rows == 2
+    np.testing.assert_array_equal(store.get("a"), vector(4))
+
+
+def test_capped_store_keeps_the_newest_entries(tmp_path):
+    store = MemmapVectorStore(str(tmp_path), max_entries=10)
+    for i in range(12):
+        store.append(f"k{i}", vector(i))
+
+    assert len(store) == 10
+    assert "k0" not in store and "k1" not in store
+    reopened = MemmapVectorStore(str(tmp_path), max_entries=10)
+    np.testing.assert_array_equal(
+        reopened.get_many(["k2", "k11"]), np.stack([vector(2), vector(11)])
+    )
+    reopened.append("k12", vector(12))
+    np.testing.assert_array_equal(reopened.get("k12"), vector(12))
+
+
+def test_async_cache_writes_run_off_the_event_loop_thread(tmp_path, monkeypatch):
+    writer_threads = []
+    append_many = MemmapVectorStore.append_many
+
+    def recording_append_many(self, items):
+        writer_threads.append(threading.get_ident())
+        append_many(self, items)
+
+    monkeypatch.setattr(MemmapVectorStore, "append_many", recording_append_many)
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    vectors = asyncio.run(cache.aput_many("m", ["a", "b"], [vector(1), vector(2)]))
+
+    assert writer_threads and threading.get_ident() not in writer_threads
+    np.testing.assert_allclose(vectors[1], np.full(4, 0.5))
+    reopened = EmbeddingCache(cache_dir=str(tmp_path))
+    np.testing.assert_allclose(reopened.get("m", "b"), np.full(4, 0.5))
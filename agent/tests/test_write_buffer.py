@@ -0,0 +1,155 @@
+import asyncio
+from src.db.async_db import AsyncScraperDatabaseManager
+from src.db.db import get_pool_config
+from src.db.write_buffer import AsyncLeadWriteBuffer
+from tests.fakes import FakeLeadConnection, FakePool, make_lead
+
+
+def db_manager_with(conn) -> AsyncScraperDatabaseManager:
+    manager = AsyncScraperDatabaseManager.__new__(AsyncScraperDatabaseManager)
+    manager.pool_config = get_pool_config()
+    manager._pool = FakePool(conn)
+    return manager
+
+
+def charged_users(conn) -> dict:
+    query, args = conn.executed[0]
+    assert "UPDATE \"UsageTracking\"" in query
+    return dict(zip(args[0], args[1]))
+
+
+def test_quota_is_charged_to_the_owner_of_the_inserted_icp_row():
+    conn = FakeLeadConnection()
+    manager = db_manager_with(conn)
+    leads = [
+        (make_lead("abc", icp_id=1), "alice"),
+        (make_lead("abc", icp_id=2), "bob"),
+        (make_lead("def", icp_id=2), "bob"),
+    ]
+    inserted = asyncio.run(manager.write_leads(leads))
+    assert inserted == ["abc", "def"]
+    assert charged_users(conn) == {"alice": 1, "bob": 1}
+
+
+def test_leads_already_stored_are_not_charged():
+    conn = FakeLeadConnection(existing_submission_ids={"abc"})
+    manager = db_manager_with(conn)
+    leads = [(make_lead("abc", icp_id=1), "alice"), (make_lead("def", icp_id=2), "bob")]
+    assert asyncio.run(manager.write_leads(leads)) == ["def"]
+    assert charged_users(conn) == {"bob": 1}
+
+
+def test_buffer_flush_keeps_every_icp_row_and_its_user():
+    conn = FakeLeadConnection()
+    manager = db_manager_with(conn)
+    buffer = AsyncLeadWriteBuffer(manager, max_rows=10, max_age=60)
+
+    async def run():
+        await buffer.add_lead(make_lead("abc", icp_id=2), "bob")
+        await buffer.add_lead(make_lead("abc", icp_id=1), "alice")
+        assert buffer.pending_leads_for_user("alice") == 1
+        assert buffer.pending_leads_for_user("bob") == 1
+        return await buffer.flush()
+
+    assert asyncio.run(run()) == 1
+    assert charged_users(conn) == {"bob": 1}
+    assert len(buffer) == 0
+
+
+def test_buffer_flushes_when_full():
+    conn = FakeLeadConnection()
+    buffer = AsyncLeadWriteBuffer(db_manager_with(conn), max_rows=2, max_age=60)
+
+    async def run():
+        await buffer.add_lead(make_lead("a", icp_id=1), "alice")
+        assert len(buffer) == 1
+        await buffer.add_lead(make_lead("b", icp_id=1), "alice")
+
+    asyncio.run(run())
+    assert len(buffer) == 0
+    assert conn.submission_ids == {"a", "b"}
+
+
+class FlakyDbManager:
+    """write_leads that fails for batches holding a poison row, or for every
+    batch while ``down``."""
+
+    def __init__(self, poison=(), down=False):
+        self.poison = set(poison)
+        self.down = down
+        self.written = []
+        self.calls = 0
+
+    async def write_leads(self, leads):
+        self.calls += 1
+        submission_ids = [post_data["submission_id"] for post_data, _ in leads]
+        if self.down or self.poison.intersection(submission_ids):
+            return None
+        self.written += submission_ids
+        return submission_ids
+
+
+def queue(buffer, *submission_ids):
+    for submission_id in submission_ids:
+        buffer._rows.append((make_lead(submission_id, icp_id=1), "alice"))
+    buffer._oldest_at = 0.0
+
+
+def test_failed_flush_is_requeued_until_max_failures():
+    manager = FlakyDbManager(poison={"bad"})
+    buffer = AsyncLeadWriteBuffer(manager, max_rows=100, max_age=60, max_failures=3)
+    queue(buffer, "a", "bad", "b")
+    assert asyncio.run(buffer.flush()) == 0
+    assert asyncio.run(buffer.flush()) == 0
+    assert len(buffer) == 3
+
+
+def test_poison_row_is_isolated_and_dropped():
+    manager = FlakyDbManager(poison={"bad"})
+    buffer = AsyncLeadWriteBuffer(manager, max_rows=100, max_age=60, max_failures=1)
+    ids = [f"p{i}" for i in range(7)]
+    queue(buffer, *ids[:3], "bad", *ids[3:])
+    assert asyncio.run(buffer.flush()) == 7
+    assert sorted(manager.written) == ids
+    assert len(buffer) == 0
+    assert buffer._failures == 0
+
+
+def test_outage_requeues_instead_of_dropping():
+    manager = FlakyDbManager(down=True)
+    buffer = AsyncLeadWriteBuffer(manager, max_rows=100, max_age=60, max_failures=1)
+    queue(buffer, "a", "b", "c")
+    assert asyncio.run(buffer.flush()) == 0
+    assert len(buffer) == 3
+
+    manager.down = False
+    assert asyncio.run(buffer.flush()) == 3
+
+
+def test_timer_flushes_aged_rows_without_new_leads():
+    manager = FlakyDbManager()
+
+    async def run():
+        buffer = AsyncLeadWriteBuffer(manager, max_rows=100, max_age=0.05)
+        await buffer.add_lead(make_lead("a", icp_id=1), "alice")
+        assert manager.written == []
+        await asyncio.sleep(0.2)
+        assert len(buffer) == 0
+        await buffer.close()
+
+    asyncio.run(run())
+    assert manager.written == ["a"]
+
+
+def test_close_flushes_and_stops_the_timer():
+    manager = FlakyDbManager()
+
+    async def run():
+        buffer = AsyncLeadWriteBuffer(manager, max_rows=100, max_age=60)
+        await buffer.add_lead(make_lead("a", icp_id=1), "alice")
+        timer = buffer._timer
+        assert await buffer.close() == 1
+        await asyncio.sleep(0)
+        assert timer.cancelled()
+
+    asyncio.run(run())